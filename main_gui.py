@@ -5,6 +5,8 @@ import numpy as np
 import pandas as pd
 import sys
 import traceback
+import threading
+import queue
 
 # --- Setup de Path y Recursos ---
 project_root = os.path.dirname(os.path.abspath(__file__))
@@ -20,7 +22,16 @@ def resource_path(relative_path):
 
 try:
     from src.utils import PRETTY_NAMES, SELLMEIER_MODEL_1, SELLMEIER_MODEL_2
-    from src.data_io import get_available_transitions, load_emission_matrix_elements
+    from src.data_io import get_available_transitions, get_emission_matrix_elements, get_emission_spectrum, clear_spectrum_cache
+    from src.decimation import minmax_decimate
+    from src.preview import CrossSectionPreview
+    from src.export import EXPORT_FORMATS, export_results
+    from src.preprocessing import BASELINE_MODES
+    from src.decay import DECAY_MODELS
+    from src.ions import IONS, DEFAULT_ION, get_ion, slug_from_pretty
+    from src.registry import SampleRegistry, excitation_from_filename, merge_links
+    from src.physics_core import flatten_emission
+    from src.results import ResultSet
 except ImportError as e:
     messagebox.showerror("Error de Importación", f"No se pudo importar 'src'.\nDetalles:\n{e}")
     sys.exit()
@@ -31,10 +42,8 @@ class ResultsWindow(tk.Toplevel):
         self.title("FROPA - Reporte de Resultados")
         self.geometry("1100x700")
        
-        # --- Guardar referencias a los datos para exportación ---
-        self.jo_raw_data = jo
-        self.rad_raw_data = rad
-        self.cs_raw_data = cs
+        # --- Resultados en formato columnar: las tablas se crean bajo demanda ---
+        self.results = jo if isinstance(jo, ResultSet) else ResultSet.from_legacy(jo, rad, cs)
         self.conf = conf
         # --------------------------------------------------------------
         
@@ -49,17 +58,28 @@ class ResultsWindow(tk.Toplevel):
         header_frame = ttk.Frame(self)
         header_frame.pack(fill=tk.X, padx=10, pady=(5, 0))
 
-        # Botón de exportar en la esquina superior derecha
-        ttk.Button(header_frame, text="📥 Exportar Tablas Individuales (.txt)", 
-                   command=self.export_individual_tables).pack(side=tk.RIGHT)
+        # Exportación en segundo plano: formato + botón + progreso en la esquina superior derecha
+        self.export_fmt_var = tk.StringVar(value=EXPORT_FORMATS["txt"])
+        self.export_btn = ttk.Button(header_frame, text="📥 Exportar Tablas",
+                                     command=self.export_individual_tables)
+        self.export_btn.pack(side=tk.RIGHT)
+        ttk.Combobox(header_frame, textvariable=self.export_fmt_var, values=list(EXPORT_FORMATS.values()),
+                     state="readonly", width=30).pack(side=tk.RIGHT, padx=5)
+        self.export_progress = ttk.Progressbar(header_frame, length=160, mode="determinate")
+        self.export_progress.pack(side=tk.RIGHT, padx=5)
+        self.export_status = ttk.Label(header_frame, text="")
+        self.export_status.pack(side=tk.RIGHT, padx=5)
+        self.export_queue, self.export_thread = queue.Queue(), None
         
         nb = ttk.Notebook(self)
         nb.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
         # Siempre mostrar Judd-Ofelt y Fuerzas (son la base)
         t1 = ttk.Frame(nb); nb.add(t1, text="Parámetros Ωλ")
-        df_jo = pd.DataFrame(jo)[["Sample", "Ω2", "Ω4", "Ω6", "rms_S"]]
-        df_jo.columns = ["Muestra", "Ω2", "Ω4", "Ω6", "δ_rms (S)"]
+        res_set = self.results
+        df_jo = res_set.jo_frame()
+        cols = ["Sample", "Ω2", "Ω4", "Ω6", "rms_S"] + [f"δΩ{k}" for k in ("2", "4", "6") if res_set.has_uncertainty()]
+        df_jo = df_jo[cols].rename(columns={"Sample": "Muestra", "rms_S": "δ_rms (S)"})
         self.create_table(t1, df_jo)
 
         t2 = ttk.Frame(nb); nb.add(t2, text="Fuerzas de Oscilador")
@@ -74,15 +94,15 @@ class ResultsWindow(tk.Toplevel):
         canvas.pack(side="left", fill="both", expand=True)
         scrollbar_t2.pack(side="right", fill="y")
         
-        for res in jo:
+        for k, s_name in enumerate(res_set.samples):
             # Restauramos la etiqueta con los errores del ajuste
-            info_txt = f"Muestra: {res['Sample']} | δ_rms: {res['rms_f']:.4f} | Δ_RMS: {res['rms_perc']:.2f}%"
+            info_txt = f"Muestra: {s_name} | δ_rms: {res_set.rms[k, 1]:.4f} | Δ_RMS: {res_set.rms[k, 2]:.2f}%"
             lbl = ttk.Label(container_f, text=info_txt, font=('Arial', 10, 'bold'))
             lbl.pack(pady=(10,0), anchor="w", padx=10)
-            self.create_table(container_f, res['f_table'], height=11)
+            self.create_table(container_f, res_set.f_table(s_name), height=11)
 
         # CONDICIONAL: Solo mostrar si se seleccionó "Propiedades Radiativas"
-        if conf.get("do_rad") and rad:
+        if conf.get("do_rad") and res_set.rad_samples:
             t3 = ttk.Frame(nb); nb.add(t3, text="Prop. Radiativas")
             
             # --- IMPLEMENTACIÓN DE SCROLL GLOBAL ---
@@ -98,26 +118,24 @@ class ResultsWindow(tk.Toplevel):
             scrollbar_t3.pack(side="right", fill="y")
             # ---------------------------------------
             
-            for s_name, df in rad.items():
+            for s_name in res_set.rad_samples:
+                df = res_set.rad_frame(s_name)
                 if not df.empty:
                     # Añadimos el Label y la Tabla al 'container_rad' para que se muevan con el scroll
                     ttk.Label(container_rad, text=f"Muestra: {s_name}", font=('Arial', 10, 'bold')).pack(pady=(10, 0), padx=10, anchor="w")
                     
                     # Preparar nombres bonitos (Pretty Names)
-                    df_pretty = df.copy()
                     from src.utils import PRETTY_NAMES
-                    df_pretty['SLJ'] = df_pretty['SLJ'].map(PRETTY_NAMES).fillna(df_pretty['SLJ'])
-                    df_pretty["S'L'J'"] = df_pretty["S'L'J'"].map(PRETTY_NAMES).fillna(df_pretty["S'L'J'"])
+                    df['SLJ'] = df['SLJ'].map(PRETTY_NAMES).fillna(df['SLJ'])
+                    df["S'L'J'"] = df["S'L'J'"].map(PRETTY_NAMES).fillna(df["S'L'J'"])
                     
                     # Insertar la tabla en el contenedor con scroll
-                    self.create_table(container_rad, df_pretty)
+                    self.create_table(container_rad, df)
 
         # CONDICIONAL: Solo mostrar si se seleccionó "Sección Eficaz"
-        if conf.get("do_cs") and cs:
+        if conf.get("do_cs") and len(res_set.cs_sample):
             t4 = ttk.Frame(nb); nb.add(t4, text="Sección Eficaz")
-            df_cs = pd.DataFrame(cs)
-            cols = ['λ_ex (nm)', 'Glass', 'Level', 'E_exp (cm⁻¹)', 'Δλ_eff (nm)', 'σₑ (x10⁻²¹ cm²)', 'ΔG (x10⁻²⁸ cm³)']
-            self.create_table(t4, df_cs[cols])
+            self.create_table(t4, res_set.cs_frame())
             
         # # --- Panel de Botones Inferior ---
         # btn_frame = ttk.Frame(self, padding=10)
@@ -159,72 +177,203 @@ class ResultsWindow(tk.Toplevel):
         frame.grid_rowconfigure(0, weight=1)
     
     def export_individual_tables(self):
+        if self.export_thread is not None and self.export_thread.is_alive():
+            return
         target_dir = filedialog.askdirectory(title="Seleccionar carpeta para exportar resultados")
         if not target_dir:
             return
 
+        fmt = next(k for k, v in EXPORT_FORMATS.items() if v == self.export_fmt_var.get())
+        q = self.export_queue
+
+        def worker():
+            # El hilo nunca toca Tk: solo publica mensajes en la cola
+            try:
+                export_results(target_dir, self.results, fmt=fmt,
+                               progress_cb=lambda done, total, msg: q.put(("progress", done, total, msg)))
+                q.put(("done",))
+            except Exception as e:
+                q.put(("error", e))
+
+        self.export_btn.configure(state=tk.DISABLED)
+        self.export_progress["value"] = 0
+        self.export_thread = threading.Thread(target=worker, daemon=True)
+        self.export_thread.start()
+        self.after(50, self.poll_export)
+
+    def poll_export(self):
+        finished = False
+        while True:
+            try:
+                msg = self.export_queue.get_nowait()
+            except queue.Empty:
+                break
+            if msg[0] == "progress":
+                _, done, total, text = msg
+                self.export_progress["value"] = 100 * done / total
+                self.export_status.config(text=text)
+            elif msg[0] == "done":
+                finished = True
+                self.export_progress["value"] = 100
+                self.export_status.config(text="Exportación completada")
+                messagebox.showinfo("Éxito", "Tablas exportadas correctamente.", parent=self)
+            else:
+                finished = True
+                self.export_status.config(text="")
+                messagebox.showerror("Error", f"No se pudo exportar la data: {msg[1]}", parent=self)
+        if finished:
+            self.export_btn.configure(state=tk.NORMAL)
+        else:
+            self.after(50, self.poll_export)
+
+class SpectrumViewer(tk.Toplevel):
+    """Visor de los espectros vinculados con las bandas de usuario sombreadas."""
+    COLORS = ["#1f77b4", "#d62728", "#2ca02c", "#9467bd", "#ff7f0e", "#8c564b", "#e377c2", "#17becf"]
+    MARGIN_L, MARGIN_R, MARGIN_T, MARGIN_B = 70, 15, 15, 35
+
+    def __init__(self, parent, emission_files, user_bands):
+        super().__init__(parent)
+        self.title("FROPA - Espectros de Emisión")
+        self.geometry("1000x600")
         try:
-            from src.utils import PRETTY_NAMES
-
-            # 1. Exportar Parámetros Ωλ (Solo con rms_S)
-            df_jo = pd.DataFrame(self.jo_raw_data)[["Sample", "Ω2", "Ω4", "Ω6", "rms_S"]]
-            df_jo.columns = ["Muestra", "Omega2_x10-20", "Omega4_x10-20", "Omega6_x10-20", "rms_S_LineStrength"]
-            df_jo.to_csv(os.path.join(target_dir, "JO_Parameters.txt"), 
-                         sep='\t', index=False, float_format="%.4f")
-
-            # 2. Exportar Fuerzas de Oscilador (Incluyendo sus propios RMS al final)
-            for res in self.jo_raw_data:
-                safe_name = "".join(x for x in res['Sample'] if x.isalnum() or x in "._-")
-                f_path = os.path.join(target_dir, f"Oscillator_Strengths_{safe_name}.txt")
-                
-                with open(f_path, 'w', encoding='utf-8') as f:
-                    # Escribimos la tabla principal
-                    res['f_table'].to_csv(f, sep='\t', index=False, float_format="%.4f")
-                    # Añadimos los errores específicos de esta muestra al final
-                    f.write(f"\n# Indicadores de Calidad para {res['Sample']}:\n")
-                    f.write(f"rms_f_Oscillator_Strength (x10-6):\t{res['rms_f']:.4f}\n")
-                    f.write(f"RMS_Error_Total (%):\t{res['rms_perc']:.2f}\n")
-
-            # 3. Exportar Propiedades Radiativas (Ajustando espaciado manual)
-            if self.rad_raw_data:
-                for s_name, df in self.rad_raw_data.items():
-                    if not df.empty:
-                        safe_name = "".join(x for x in s_name if x.isalnum() or x in "._-")
-                        rad_path = os.path.join(target_dir, f"Radiative_Props_{safe_name}.txt")
-                        
-                        df_exp = df.copy()
-                        df_exp['SLJ'] = df_exp['SLJ'].map(PRETTY_NAMES).fillna(df_exp['SLJ'])
-                        df_exp["S'L'J'"] = df_exp["S'L'J'"].map(PRETTY_NAMES).fillna(df_exp["S'L'J'"])
-                        
-                        # Usamos to_string para que Pandas calcule el espaciado exacto por columnas
-                        # y luego lo guardamos como texto para que se vea alineado en cualquier editor
-                        content = df_exp.to_string(index=False, justify='left', float_format=lambda x: f"{x:.4f}")
-                        with open(rad_path, 'w', encoding='utf-8') as f:
-                            f.write(content)
-
-            # 4. Exportar Sección Eficaz (Alineación consistente)
-            if self.cs_raw_data:
-                df_cs = pd.DataFrame(self.cs_raw_data)
-                cols = ['λ_ex (nm)', 'Glass', 'Level', 'E_exp (cm⁻¹)', 'Δλ_eff (nm)', 'σₑ (x10⁻²¹ cm²)', 'ΔG (x10⁻²⁸ cm³)']
-                content_cs = df_cs[cols].to_string(index=False, justify='left', float_format=lambda x: f"{x:.4f}")
-                with open(os.path.join(target_dir, "Cross_Sections.txt"), 'w', encoding='utf-8') as f:
-                    f.write(content_cs)
-
-            messagebox.showinfo("Éxito", "Tablas exportadas con alineación corregida y asignación de errores correcta.")
-        
-        except Exception as e:
-            messagebox.showerror("Error", f"No se pudo exportar la data: {e}")
-        
+            self.iconbitmap(resource_path("icon.ico"))
+        except Exception:
+            pass
+
+        # Los arrays completos quedan en memoria; solo se decima la ventana visible
+        self.spectra = []
+        for s_name, path in emission_files.items():
+            df = get_emission_spectrum(path)
+            if df is None: continue
+            df = df.sort_values('wavelength_nm', kind='mergesort')
+            self.spectra.append((s_name, df['wavelength_nm'].to_numpy(dtype=float), df['intensity'].to_numpy(dtype=float)))
+        self.bands = user_bands
+        if self.spectra:
+            self.full_range = (min(x[0] for _, x, _ in self.spectra), max(x[-1] for _, x, _ in self.spectra))
+        else:
+            self.full_range = (0.0, 1.0)
+        self.view = list(self.full_range)
+        self._drag_x, self._redraw_job = None, None
+
+        top = ttk.Frame(self)
+        top.pack(fill=tk.X, padx=10, pady=(5, 0))
+        ttk.Label(top, text="Rueda: zoom | Arrastrar: desplazar | Doble clic: vista completa").pack(side=tk.LEFT)
+        ttk.Button(top, text="Vista completa", command=self.reset_view).pack(side=tk.RIGHT)
+
+        self.canvas = tk.Canvas(self, bg="white", highlightthickness=0)
+        self.canvas.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        self.canvas.bind("<Configure>", self.schedule_redraw)
+        self.canvas.bind("<MouseWheel>", self.on_wheel)
+        self.canvas.bind("<Button-4>", lambda e: self.zoom(e.x, 0.8))
+        self.canvas.bind("<Button-5>", lambda e: self.zoom(e.x, 1.25))
+        self.canvas.bind("<ButtonPress-1>", self.on_press)
+        self.canvas.bind("<B1-Motion>", self.on_drag)
+        self.canvas.bind("<Double-Button-1>", lambda e: self.reset_view())
+
+    # --- Conversión de coordenadas ---
+    def plot_width(self):
+        return max(self.canvas.winfo_width() - self.MARGIN_L - self.MARGIN_R, 10)
+
+    def x_to_px(self, x):
+        return self.MARGIN_L + (x - self.view[0]) / (self.view[1] - self.view[0]) * self.plot_width()
+
+    def px_to_x(self, px):
+        return self.view[0] + (px - self.MARGIN_L) / self.plot_width() * (self.view[1] - self.view[0])
+
+    # --- Interacción ---
+    def on_wheel(self, event):
+        self.zoom(event.x, 0.8 if event.delta > 0 else 1.25)
+
+    def zoom(self, px, factor):
+        x0 = self.px_to_x(px)
+        span = (self.view[1] - self.view[0]) * factor
+        full_span = self.full_range[1] - self.full_range[0]
+        span = min(max(span, full_span * 1e-6), full_span)
+        frac = (x0 - self.view[0]) / (self.view[1] - self.view[0])
+        self.set_view(x0 - frac * span, x0 + (1 - frac) * span)
+
+    def on_press(self, event):
+        self._drag_x = event.x
+
+    def on_drag(self, event):
+        if self._drag_x is None: return
+        dx = (event.x - self._drag_x) / self.plot_width() * (self.view[1] - self.view[0])
+        self._drag_x = event.x
+        self.set_view(self.view[0] - dx, self.view[1] - dx)
+
+    def set_view(self, a, b):
+        span = b - a
+        a = min(max(a, self.full_range[0]), self.full_range[1] - span)
+        self.view = [a, a + span]
+        self.schedule_redraw()
+
+    def reset_view(self):
+        self.view = list(self.full_range)
+        self.schedule_redraw()
+
+    def schedule_redraw(self, *args):
+        if self._redraw_job is not None: self.after_cancel(self._redraw_job)
+        self._redraw_job = self.after(15, self.redraw)
+
+    # --- Dibujo ---
+    def redraw(self):
+        self._redraw_job = None
+        c = self.canvas
+        c.delete("all")
+        w, h = c.winfo_width(), c.winfo_height()
+        y_top, y_bot = self.MARGIN_T, h - self.MARGIN_B
+        if not self.spectra:
+            c.create_text(w / 2, h / 2, text="No hay espectros vinculados.")
+            return
+
+        n_bins = int(self.plot_width())
+        traces = [(s_name, *minmax_decimate(x, y, self.view[0], self.view[1], n_bins)) for s_name, x, y in self.spectra]
+        y_vals = [yd for _, _, yd in traces if len(yd)]
+        y_min = min(float(yd.min()) for yd in y_vals) if y_vals else 0.0
+        y_max = max(float(yd.max()) for yd in y_vals) if y_vals else 1.0
+        if y_max <= y_min: y_max = y_min + 1.0
+        to_py = lambda v: y_bot - (v - y_min) / (y_max - y_min) * (y_bot - y_top)
+
+        # Bandas de usuario sombreadas por debajo de las trazas
+        for band in self.bands:
+            a, b = max(band['range_min'], self.view[0]), min(band['range_max'], self.view[1])
+            if a >= b: continue
+            c.create_rectangle(self.x_to_px(a), y_top, self.x_to_px(b), y_bot, fill="#fde9b8", outline="")
+            c.create_text((self.x_to_px(a) + self.x_to_px(b)) / 2, y_top + 8,
+                          text=f"{band['initial']} → {band['final']}", font=('Arial', 8))
+
+        for k, (s_name, xd, yd) in enumerate(traces):
+            if len(xd) < 2: continue
+            color = self.COLORS[k % len(self.COLORS)]
+            coords = np.column_stack([self.x_to_px(xd), to_py(yd)]).ravel().tolist()
+            c.create_line(*coords, fill=color)
+            c.create_text(w - self.MARGIN_R - 5, y_top + 20 + 14 * k, text=s_name, fill=color, anchor="e", font=('Arial', 9, 'bold'))
+
+        # Ejes y marcas
+        x_l, x_r = self.MARGIN_L, w - self.MARGIN_R
+        c.create_rectangle(x_l, y_top, x_r, y_bot, outline="black")
+        for t in np.linspace(self.view[0], self.view[1], 7):
+            px = self.x_to_px(t)
+            c.create_line(px, y_bot, px, y_bot + 4)
+            c.create_text(px, y_bot + 14, text=f"{t:.1f}", font=('Arial', 8))
+        c.create_text((x_l + x_r) / 2, h - 8, text="λ (nm)", font=('Arial', 9))
+        for t in np.linspace(y_min, y_max, 5):
+            py = to_py(t)
+            c.create_line(x_l - 4, py, x_l, py)
+            c.create_text(x_l - 6, py, text=f"{t:.3g}", anchor="e", font=('Arial', 8))
+
 # --- CLASE PRINCIPAL ---
 class JuddOfeltApp:
     def __init__(self, root):
         self.valid_samples = []      # Etiquetas extraídas del archivo de osciladores
         self.emission_files = {}     # Diccionario { 'Etiqueta': 'Ruta/archivo.txt' }
+        self.sellmeier_aliases = {}  # { 'Etiqueta': 'Fila de Sellmeier' } (manifiesto de espectros)
         self.cs_checkbox = None
         self.root = root
         self.root.title("FROPA – Fluorescence Radiative and Optical Parameter Analyzer v1.2.1")
         self.root.geometry("800x850")
         self.lambda_ex_var = tk.DoubleVar(value=980.0) # Valor por defecto
+        self.ion_var = tk.StringVar(value=DEFAULT_ION)
         try:
             self.root.iconbitmap(resource_path("icon.ico"))
         except Exception: pass
@@ -232,9 +381,14 @@ class JuddOfeltApp:
         self.calc_vars = {"rad":tk.BooleanVar(value=False), "cs":tk.BooleanVar(value=False)}
         self.em_source_var, self.sellmeier_model = tk.StringVar(value="internal"), tk.StringVar(value=SELLMEIER_MODEL_1)
         self.trans_vars, self.user_bands, self.results_win = {}, [], None
+        self.preview, self._preview_job = CrossSectionPreview(), None
+        self.project = None          # Último proyecto calculado (ver src/project.py)
+        self.watcher, self._watch_job, self._watch_stop = None, None, None
+        self.watch_queue = queue.Queue()   # Resultados de los sondeos del hilo de vigilancia
         self.calc_vars["rad"].trace("w", self.toggle_options)
         self.calc_vars["cs"].trace("w", self.toggle_options)
         self.em_source_var.trace("w", self.on_em_source_change)
+        self.ion_var.trace("w", self.on_em_source_change)
         mf = ttk.Frame(self.root, padding="10")
         mf.pack(fill=tk.BOTH, expand=True)
         self.setup_ui(mf)
@@ -267,25 +421,47 @@ class JuddOfeltApp:
         if not paths:
             return
 
-        for p in paths:
-            fname = os.path.basename(p)
-            # Buscamos si la etiqueta está contenida en el nombre del archivo
-            match = next((s for s in self.valid_samples if s in fname), None)
-            
-            if match:
-                self.emission_files[match] = p
-                self.log(f"Espectro vinculado: {fname} -> Muestra {match}")
-            else:
-                messagebox.showerror("Muestra No Identificada", 
-                    f"El archivo '{fname}' no coincide con ninguna muestra del archivo de osciladores.\n"
-                    f"Muestras esperadas: {', '.join(self.valid_samples)}")
-        
+        # Búsqueda exacta por tokens del nombre de archivo, en una sola pasada
+        # Si los nombres llevan λ_ex (p. ej. _980nm) se vinculan como series de excitación
+        by_ex = any(excitation_from_filename(os.path.basename(p)) is not None for p in paths)
+        links, unmatched = SampleRegistry(self.valid_samples, self.sellmeier_aliases).link_files(paths, by_ex, self.lambda_ex_var.get())
+        self.emission_files = merge_links(self.emission_files, links, self.lambda_ex_var.get())
+        self.log(f"Espectros vinculados: {len(links)}" + "".join(f"\n{os.path.basename(p)} -> Muestra {s}"
+                 for s, p in list(flatten_emission(links, self.lambda_ex_var.get()).items())[:20]))
+        if unmatched:
+            names = [os.path.basename(p) for p in unmatched]
+            messagebox.showerror("Muestra No Identificada",
+                f"{len(names)} archivo(s) no coinciden (o son ambiguos) con las muestras del archivo de osciladores:\n"
+                f"{', '.join(names[:20])}{' ...' if len(names) > 20 else ''}\n"
+                f"Muestras esperadas: {', '.join(self.valid_samples)}")
+        self.refresh_spectra_links()
+
+    def load_spectra_manifest(self):
+        """Vincula espectros (y filas de Sellmeier con otro nombre) desde un manifiesto Sample/File[/Sellmeier]."""
+        if not self.valid_samples:
+            return messagebox.showwarning("Faltan Datos", "Primero cargue el archivo de Fuerzas de Oscilador para identificar las muestras.")
+        path = filedialog.askopenfilename(title="Manifiesto de espectros (Sample, File[, Sellmeier])",
+                                          filetypes=[("Archivos de Texto", "*.txt")])
+        if not path: return
+        registry = SampleRegistry(self.valid_samples, self.sellmeier_aliases)
+        try:
+            links, unknown = registry.link_manifest(path)
+        except ValueError as e:
+            return messagebox.showerror("Error de Formato", str(e))
+        self.emission_files = merge_links(self.emission_files, links, self.lambda_ex_var.get())
+        self.sellmeier_aliases = registry.sellmeier_aliases
+        self.log(f"Manifiesto: {len(links)} espectros vinculados.")
+        if unknown:
+            messagebox.showwarning("Muestras Desconocidas", f"Muestras del manifiesto que no están en el archivo de osciladores:\n{', '.join(unknown[:20])}")
+        self.refresh_spectra_links()
+
+    def refresh_spectra_links(self):
         # Actualizar indicadores en la interfaz
         count = len(self.emission_files)
         self.lbl_spectra_count.config(text=f"Espectros vinculados: {count}")
         # Mostrar solo los nombres de archivos vinculados
         self.update_spectra_status()
-        nombres = [os.path.basename(f) for f in self.emission_files.values()]
+        nombres = [os.path.basename(f) for f in flatten_emission(self.emission_files, self.lambda_ex_var.get()).values()]
         if hasattr(self, 'spectra_list_lbl'):
             self.spectra_list_lbl.config(text="Archivos: " + ", ".join(nombres))    
     
@@ -303,6 +479,12 @@ class JuddOfeltApp:
         self.create_file_input_row(f1, "Fuerza de Oscilador (.txt):", self.path_vars["osc"], 0)
         self.create_file_input_row(f1, "Matriz Absorción (.txt):", self.path_vars["abs"], 1)
         self.create_file_input_row(f1, "Coef. Sellmeier (.txt):", self.path_vars["sell"], 2)
+        ttk.Button(f1, text="Generar osciladores desde absorción...",
+                   command=self.build_oscillators_from_absorption).grid(row=3, column=0, columnspan=3, sticky="ew", pady=(5, 0))
+        # Ion activo: define J del fundamental en S_ed y f_cal y la matriz de emisión interna
+        ttk.Label(f1, text="Ion:").grid(row=4, column=0, sticky="w", pady=(5, 0))
+        ttk.Combobox(f1, textvariable=self.ion_var, values=list(IONS), state="readonly",
+                     width=6).grid(row=4, column=1, sticky="w", pady=(5, 0))
         
         # Columna 2: Fuente de Emisión
         self.f2_container = ttk.LabelFrame(top_container, text="2. Fuente de Datos de Emisión", padding=5)
@@ -322,6 +504,18 @@ class JuddOfeltApp:
                                   bg="#27ae60", fg="white", command=self.run_analysis,
                                   width=2, height=1, relief="raised", cursor="hand2", bd=4)
         self.btn_play.pack(expand=True)
+        # Reparte las muestras entre varios procesos (mismos resultados que en serie)
+        self.parallel_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(f3_container, text="Multiproceso", variable=self.parallel_var).pack()
+        # Propagación analítica de Cov(Ω) a las tablas (columnas δ)
+        self.uncert_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(f3_container, text="Incertidumbres", variable=self.uncert_var).pack()
+        # Proyecto: configuración + resultados en un .npz; al reabrir solo se recalcula lo cambiado
+        ttk.Button(f3_container, text="Guardar proyecto...", command=self.save_project).pack(fill=tk.X, pady=(5, 0))
+        ttk.Button(f3_container, text="Abrir proyecto...", command=self.open_project).pack(fill=tk.X)
+        # Vigilancia de carpeta: vincula espectros nuevos y recalcula solo esas muestras
+        self.watch_btn = ttk.Button(f3_container, text="Vigilar carpeta...", command=self.toggle_watch)
+        self.watch_btn.pack(fill=tk.X)
 
         top_container.columnconfigure(0, weight=5)
         top_container.columnconfigure(1, weight=3)
@@ -397,6 +591,14 @@ class JuddOfeltApp:
         self.trans_f = ttk.Frame(self.rad_f)
         self.trans_f.pack(anchor="w", fill=tk.X, pady=(5,0))
 
+        # Curvas de decaimiento medidas (opcional): τ_meas, η y W_nr junto a la tabla radiativa
+        decay_f = ttk.Frame(self.rad_f)
+        decay_f.pack(anchor="w", fill=tk.X, pady=(5,0))
+        self.decay_manifest_var, self.decay_model_var = tk.StringVar(), tk.StringVar(value="single")
+        ttk.Button(decay_f, text="Curvas de decaimiento...", command=lambda: self.load_file(self.decay_manifest_var)).pack(side=tk.LEFT)
+        ttk.Combobox(decay_f, textvariable=self.decay_model_var, values=list(DECAY_MODELS), state="readonly", width=10).pack(side=tk.LEFT, padx=5)
+        ttk.Label(decay_f, textvariable=self.decay_manifest_var, foreground="blue").pack(side=tk.LEFT)
+
     def setup_cs_options(self, p):
         self.cs_f = ttk.LabelFrame(p, text="5. Configuración de Sección Eficaz (σₑ)", padding=10)
         
@@ -426,6 +628,7 @@ class JuddOfeltApp:
         ttk.Label(row1, text="Hasta:").pack(side=tk.LEFT)
         self.cs_final_combo = ttk.Combobox(row1, textvariable=self.cs_final_lvl, state="readonly", width=10)
         self.cs_final_combo.pack(side=tk.LEFT, padx=5)
+        self.cs_final_combo.bind("<<ComboboxSelected>>", self.schedule_preview)
         
         # Segunda fila de rango
         row2 = ttk.Frame(add_f)
@@ -438,6 +641,12 @@ class JuddOfeltApp:
         self.cs_max_entry.pack(side=tk.LEFT, padx=2)
         
         ttk.Button(row2, text="Añadir", command=self.add_band).pack(side=tk.RIGHT)
+        self.cs_min_entry.bind("<KeyRelease>", self.schedule_preview)
+        self.cs_max_entry.bind("<KeyRelease>", self.schedule_preview)
+
+        # Vista previa en vivo de la banda en edición
+        self.preview_text = tk.Text(left_col, height=3, font=('Consolas', 8), state=tk.DISABLED, bg="#f0f0f0", wrap=tk.NONE)
+        self.preview_text.pack(fill=tk.X, pady=(0, 5))
 
         # Listbox de bandas
         list_f = ttk.Frame(left_col)
@@ -455,6 +664,8 @@ class JuddOfeltApp:
         
         ttk.Label(right_col, text="Archivos de Espectro:", font=('Arial', 9, 'bold')).pack(anchor="w")
         ttk.Button(right_col, text="Cargar Espectros", command=self.load_emission_files).pack(fill=tk.X, pady=5)
+        ttk.Button(right_col, text="Manifiesto...", command=self.load_spectra_manifest).pack(fill=tk.X)
+        ttk.Button(right_col, text="Ver Espectros", command=self.show_spectra).pack(fill=tk.X)
         
         # Longitud de onda de excitación
         ex_f = ttk.Frame(right_col) # O en left_col, donde prefieras
@@ -462,6 +673,19 @@ class JuddOfeltApp:
         ttk.Label(ex_f, text="λ_ex (nm):").pack(side=tk.LEFT)
         ttk.Entry(ex_f, textvariable=self.lambda_ex_var, width=8).pack(side=tk.LEFT, padx=5)
         
+        # Preprocesado opcional: malla común + línea base + suavizado sobre todos los espectros
+        self.prep_var = tk.BooleanVar(value=False)
+        self.prep_baseline_var = tk.StringVar(value="linear")
+        self.prep_window_var = tk.IntVar(value=0)
+        ttk.Checkbutton(right_col, text="Preprocesar espectros", variable=self.prep_var).pack(anchor="w")
+        prep_f = ttk.Frame(right_col)
+        prep_f.pack(fill=tk.X)
+        ttk.Label(prep_f, text="Base:").pack(side=tk.LEFT)
+        ttk.Combobox(prep_f, textvariable=self.prep_baseline_var, values=list(BASELINE_MODES),
+                     state="readonly", width=7).pack(side=tk.LEFT, padx=2)
+        ttk.Label(prep_f, text="Suav.:").pack(side=tk.LEFT)
+        ttk.Spinbox(prep_f, from_=0, to=51, increment=2, textvariable=self.prep_window_var, width=4).pack(side=tk.LEFT, padx=2)
+
         self.lbl_spectra_count = ttk.Label(right_col, text="Cargados: 0", foreground="green")
         self.lbl_spectra_count.pack(anchor="w")
         
@@ -473,7 +697,9 @@ class JuddOfeltApp:
         cols_container.columnconfigure(1, weight=1)
 
     def update_spectra_status(self):
-        
+        # Los espectros que ya no están vinculados salen del registro de sesión
+        clear_spectrum_cache(keep=flatten_emission(self.emission_files, self.lambda_ex_var.get()).values())
+
         # Aseguramos que el widget existe antes de escribir
         if not hasattr(self, 'spectra_status_text'): return
         
@@ -502,6 +728,8 @@ class JuddOfeltApp:
         name_var = tk.StringVar(value="---")
         lbl_name = ttk.Label(p, textvariable=name_var, foreground="blue", width=15)
         lbl_name.grid(row=r, column=1, padx=5)
+        # La etiqueta sigue a la variable aunque la ruta se asigne desde otro sitio
+        v.trace_add("write", lambda *a: name_var.set(os.path.basename(v.get()) or "---"))
         
         def pick_file():
             path = filedialog.askopenfilename(filetypes=[("Archivos de Texto", "*.txt")])
@@ -531,6 +759,27 @@ class JuddOfeltApp:
         except Exception as e:
             messagebox.showerror("Error de Lectura", f"No se pudo procesar el archivo de osciladores:\n{e}")
 
+    def build_oscillators_from_absorption(self):
+        manifest = filedialog.askopenfilename(title="Manifiesto de absorción (Sample, Concentration, Thickness, File)",
+                                              filetypes=[("Archivos de Texto", "*.txt")])
+        if not manifest: return
+        bands = filedialog.askopenfilename(title="Tabla de bandas de absorción (Transition, range_min, range_max)",
+                                           filetypes=[("Archivos de Texto", "*.txt")])
+        if not bands: return
+        is_abs = messagebox.askyesno("Tipo de Espectro", "¿Los espectros están en absorbancia?\n(No = coeficiente de absorción α en cm⁻¹)")
+        out_path = filedialog.asksaveasfilename(title="Guardar archivo de Fuerzas de Oscilador", defaultextension=".txt",
+                                                filetypes=[("Archivos de Texto", "*.txt")])
+        if not out_path: return
+        try:
+            from src.absorption import build_oscillator_data, save_oscillator_table
+            wl, f_exp, s_names, labels = build_oscillator_data(manifest, bands, "absorbance" if is_abs else "alpha")
+            save_oscillator_table(out_path, wl, f_exp, s_names, labels)
+        except Exception as e:
+            return messagebox.showerror("Error de Absorción", f"No se pudieron calcular las fuerzas de oscilador:\n{e}")
+        self.path_vars["osc"].set(out_path)
+        self.extract_valid_samples(out_path)
+        self.log(f"f_exp calculado para {len(s_names)} muestras y {len(labels)} bandas.\nGuardado en: {os.path.basename(out_path)}")
+
     def create_dir_input_row(self, p, l, v, r):
         ttk.Label(p, text=l).grid(row=r, column=0, sticky="w", padx=5, pady=3)
         ttk.Entry(p, textvariable=v, width=60).grid(row=r, column=1, sticky="ew", padx=5)
@@ -588,7 +837,10 @@ class JuddOfeltApp:
         if self.calc_vars["cs"].get(): self.update_cs_combos()
 
     def get_current_em_matrix_path(self):
-        return resource_path(os.path.join('data_original','EmMatrixElements_Er.txt')) if self.em_source_var.get()=="internal" else self.path_vars["em_user"].get()
+        if self.em_source_var.get() != "internal": return self.path_vars["em_user"].get()
+        # Los datos internos dependen del ion (registro de iones); "" si no se distribuyen
+        fname = get_ion(self.ion_var.get()).em_matrix
+        return resource_path(os.path.join('data_original', fname)) if fname else ""
 
     def load_user_em_matrix(self): self.load_file(self.path_vars["em_user"]); self.on_em_source_change()
 
@@ -597,7 +849,7 @@ class JuddOfeltApp:
         self.trans_vars = {}
         if not self.calc_vars["rad"].get() or not fp or not os.path.exists(fp): return ttk.Label(self.trans_f, text="Seleccione fuente...").pack()
         try:
-            em_df = load_emission_matrix_elements(fp); available = get_available_transitions(em_df)
+            em_df = get_emission_matrix_elements(fp); available = get_available_transitions(em_df)
             if not available: raise ValueError("No se encontraron transiciones.")
             for i, (slug, name) in enumerate(available.items()):
                 var = tk.BooleanVar(value=True)
@@ -623,7 +875,7 @@ class JuddOfeltApp:
             self.cs_final_combo['values'] = []
             return
         try:
-            self.current_em_df_for_cs = load_emission_matrix_elements(em_path)
+            self.current_em_df_for_cs = get_emission_matrix_elements(em_path)
             initial_levels = get_available_transitions(self.current_em_df_for_cs)
             self.cs_init_combo['values'] = list(initial_levels.values())
             
@@ -639,12 +891,52 @@ class JuddOfeltApp:
     def update_final_levels_combo(self, *args):
         initial_pretty = self.cs_init_combo.get()
         if not initial_pretty or not hasattr(self, 'current_em_df_for_cs'): self.cs_final_combo['values'] = []; self.cs_final_lvl.set(''); return
-        slug = next((k for k,v in PRETTY_NAMES.items() if v==initial_pretty), None)
+        slug = slug_from_pretty(initial_pretty)
         if not slug: self.cs_final_combo['values'] = []; self.cs_final_lvl.set(''); return
         possible_finals = self.current_em_df_for_cs[self.current_em_df_for_cs['Initial_Name_Slug']==slug]
         self.cs_final_combo['values'] = [PRETTY_NAMES.get(s, s) for s in possible_finals['Final_Name_Slug'].unique()]
         if self.cs_final_lvl.get() not in self.cs_final_combo['values']: self.cs_final_lvl.set('')
 
+    def show_spectra(self):
+        if not self.emission_files:
+            return messagebox.showwarning("Faltan Datos", "Cargue primero los archivos de espectro.")
+        SpectrumViewer(self.root, flatten_emission(self.emission_files, self.lambda_ex_var.get()), self.user_bands)
+
+    def schedule_preview(self, *args):
+        # Debounce: solo se recalcula cuando el usuario deja de escribir
+        if self._preview_job is not None: self.root.after_cancel(self._preview_job)
+        self._preview_job = self.root.after(300, self.refresh_preview)
+
+    def set_preview_text(self, msg):
+        self.preview_text.config(state=tk.NORMAL)
+        self.preview_text.delete(1.0, tk.END)
+        self.preview_text.insert(tk.END, msg)
+        self.preview_text.config(state=tk.DISABLED)
+
+    def refresh_preview(self):
+        self._preview_job = None
+        initial, final = self.cs_init_combo.get(), self.cs_final_combo.get()
+        try:
+            r_min, r_max = float(self.cs_min_entry.get()), float(self.cs_max_entry.get())
+        except ValueError:
+            return self.set_preview_text("")
+        i_slug,f_slug = slug_from_pretty(initial), slug_from_pretty(final)
+        paths = {k: v.get() for k,v in self.path_vars.items()}
+        if not (i_slug and f_slug and r_min < r_max and self.emission_files and all(paths[k] for k in ["osc","abs","sell"])):
+            return self.set_preview_text("")
+        band_info = {"initial":initial, "final":final, "initial_slug":i_slug, "final_slug":f_slug, "range_min":r_min, "range_max":r_max}
+        try:
+            self.preview.update_inputs(paths['osc'], paths['abs'], paths['sell'], self.sellmeier_model.get(),
+                                       self.get_current_em_matrix_path(), self.emission_files, self.ion_var.get(),
+                                       self.sellmeier_aliases, self.lambda_ex_var.get())
+            rows = self.preview.evaluate(band_info)
+        except Exception as e:
+            return self.set_preview_text(f"Vista previa no disponible: {e}")
+        if not rows:
+            return self.set_preview_text("Sin datos en el rango indicado.")
+        lines = [f"{r['Glass']}: σₑ={r['σₑ (x10⁻²¹ cm²)']:.4f}  Δλ_eff={r['Δλ_eff (nm)']:.4f} nm  ΔG={r['ΔG (x10⁻²⁸ cm³)']:.4f}" for r in rows]
+        self.set_preview_text("\n".join(lines))
+
     def add_band(self):
         initial, final = self.cs_init_combo.get(), self.cs_final_combo.get()
         r_min_str, r_max_str = self.cs_min_entry.get(), self.cs_max_entry.get()
@@ -653,7 +945,7 @@ class JuddOfeltApp:
             r_min, r_max = float(r_min_str), float(r_max_str)
             if r_min >= r_max: raise ValueError("Rango mínimo debe ser menor al máximo.")
         except ValueError as e: return messagebox.showerror("Error de Formato", f"Rango inválido: {e}")
-        i_slug,f_slug = next((k for k,v in PRETTY_NAMES.items() if v==initial),None), next((k for k,v in PRETTY_NAMES.items() if v==final),None)
+        i_slug,f_slug = slug_from_pretty(initial), slug_from_pretty(final)
         if not i_slug or not f_slug: return messagebox.showerror("Error Interno", "No se encontraron slugs.")
         band_info = {"initial":initial, "final":final, "initial_slug":i_slug, "final_slug":f_slug, "range_min":r_min, "range_max":r_max}
         self.user_bands.append(band_info); self.bands_lb.insert(tk.END, f"{initial} → {final} ({r_min}-{r_max} nm)")
@@ -674,6 +966,8 @@ class JuddOfeltApp:
         em_path = self.get_current_em_matrix_path()
         sel_trans = [s for s,v in self.trans_vars.items() if v.get()]
         
+        if (do_rad or do_cs) and self.em_source_var.get() == "internal" and not em_path:
+            return messagebox.showerror("Error", f"No hay datos de emisión internos para {get_ion(self.ion_var.get()).name}; cargue un archivo propio.")
         if do_rad and (not os.path.exists(em_path) or not sel_trans): 
             return messagebox.showerror("Error", "Para Prop. Radiativas, elija fuente y seleccione transiciones.")
         
@@ -683,21 +977,37 @@ class JuddOfeltApp:
             if not self.emission_files: 
                 return messagebox.showerror("Error", "Cargue los archivos de espectro en la Sección 5.")
 
+        preprocess = None
+        if do_cs and self.prep_var.get():
+            try:
+                preprocess = {"baseline": self.prep_baseline_var.get(), "smooth_window": int(self.prep_window_var.get())}
+            except (tk.TclError, ValueError):
+                return messagebox.showerror("Error", "Ventana de suavizado inválida.")
+
         self.log("Iniciando Análisis...")
         self.root.config(cursor="watch")
         try:
-            from src.physics_core import run_full_analysis
-            # Se envía self.emission_files en lugar de la carpeta
-            jo, rad, cs = run_full_analysis(
-                paths['osc'], paths['abs'], paths['sell'], 
-                self.emission_files, 
-                self.sellmeier_model.get(), do_rad, em_path, sel_trans, do_cs, self.user_bands,
-                self.lambda_ex_var.get()
-            )
-            
-            self.log("¡Análisis completado!")
-            if self.results_win: self.results_win.destroy()
-            self.results_win = ResultsWindow(self.root, jo, rad, cs, {"do_rad":do_rad, "do_cs":do_cs})
+            from src.project import run_project
+            config = self.collect_config(paths, do_rad, em_path, sel_trans, do_cs, preprocess)
+            # Solo se recalculan las muestras cuyas entradas cambiaron desde la última ejecución
+            done = []
+            def on_sample(s_name, *_):
+                done.append(s_name)
+                self.log(f"Analizando... {len(done)} muestras listas (última: {s_name})")
+            # Diario reanudable: si la ejecución se interrumpe, al repetirla solo se calculan las muestras pendientes.
+            # Un diario por huella global, para que dos análisis distintos no se borren el diario entre sí
+            import tempfile, warnings
+            # Los avisos del motor (p. ej. bandas sin σₑ) pasan al registro de la ventana
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter("always")
+                self.project, recomputed = run_project(config, previous=self.project,
+                                                       n_workers=os.cpu_count() if self.parallel_var.get() else None,
+                                                       on_sample=on_sample,
+                                                       journal=os.path.join(tempfile.gettempdir(), "fropa_journal_{fingerprint}"))
+            for w in caught:
+                self.log(f"AVISO: {w.message}")
+            self.log(f"¡Análisis completado! Muestras recalculadas: {len(recomputed)}")
+            self.show_project_results()
         except Exception as e:
             self.log(f"ERROR: {e}")
             traceback.print_exc()
@@ -705,7 +1015,150 @@ class JuddOfeltApp:
         finally:
             self.root.config(cursor="")
 
+    def collect_config(self, paths, do_rad, em_path, sel_trans, do_cs, preprocess):
+        """Configuración del análisis (argumentos de run_full_analysis) más el estado de la ventana."""
+        return {"p_osc": paths['osc'], "p_abs": paths['abs'], "p_sell": paths['sell'],
+                "emission_dict": dict(self.emission_files), "sm": self.sellmeier_model.get(),
+                "do_rad_calc": do_rad, "p_em": em_path, "sel_trans_rad": sel_trans, "do_cs_calc": do_cs,
+                "user_bands": [dict(b) for b in self.user_bands], "lambda_ex": self.lambda_ex_var.get(),
+                "preprocess": preprocess, "uncertainty": self.uncert_var.get(), "ion": self.ion_var.get(),
+                "sellmeier_aliases": dict(self.sellmeier_aliases),
+                "gui": {"em_source": self.em_source_var.get(), "em_user": paths['em_user'],
+                        "decay_manifest": self.decay_manifest_var.get(), "decay_model": self.decay_model_var.get(),
+                        "prep": self.prep_var.get(), "prep_baseline": self.prep_baseline_var.get(),
+                        "prep_window": int(self.prep_window_var.get())}}
+
+    def show_project_results(self):
+        conf, results = self.project["config"], self.project["results"]["set"]
+        do_rad, do_cs = conf["do_rad_calc"], conf["do_cs_calc"]
+        decay = conf.get("gui", {}).get("decay_manifest")
+        if do_rad and results.rad_samples and decay:
+            from src.decay import fit_decay_manifest, attach_lifetimes_columnar
+            results = attach_lifetimes_columnar(results, fit_decay_manifest(decay, conf["gui"].get("decay_model", "single")))
+        self.preview.set_known_rates(results, conf)
+        if self.results_win: self.results_win.destroy()
+        self.results_win = ResultsWindow(self.root, results, None, None, {"do_rad":do_rad, "do_cs":do_cs})
+
+    def save_project(self):
+        if self.project is None:
+            return messagebox.showwarning("Sin Resultados", "Ejecute el análisis antes de guardar el proyecto.")
+        from src.project import save_project, PROJECT_EXT
+        path = filedialog.asksaveasfilename(title="Guardar proyecto", defaultextension=PROJECT_EXT,
+                                            filetypes=[("Proyecto FROPA", "*.npz")])
+        if not path: return
+        try:
+            self.log(f"Proyecto guardado en: {os.path.basename(save_project(path, self.project))}")
+        except Exception as e:
+            messagebox.showerror("Error", f"No se pudo guardar el proyecto:\n{e}")
+
+    def apply_config(self, conf):
+        """Restaura en la ventana la configuración de un proyecto."""
+        gui = conf.get("gui", {})
+        for key, name in (("osc", "p_osc"), ("abs", "p_abs"), ("sell", "p_sell")):
+            self.path_vars[key].set(conf[name])
+        self.path_vars["em_user"].set(gui.get("em_user", ""))
+        if os.path.exists(conf["p_osc"]): self.extract_valid_samples(conf["p_osc"])
+        self.sellmeier_model.set(conf["sm"]); self.ion_var.set(conf.get("ion") or DEFAULT_ION)
+        self.lambda_ex_var.set(conf["lambda_ex"]); self.uncert_var.set(bool(conf.get("uncertainty")))
+        self.decay_manifest_var.set(gui.get("decay_manifest", "")); self.decay_model_var.set(gui.get("decay_model", "single"))
+        self.prep_var.set(gui.get("prep", False)); self.prep_baseline_var.set(gui.get("prep_baseline", "linear"))
+        self.prep_window_var.set(gui.get("prep_window", 0))
+        self.em_source_var.set(gui.get("em_source", "internal"))
+        self.calc_vars["rad"].set(conf["do_rad_calc"]); self.calc_vars["cs"].set(conf["do_cs_calc"])
+        for slug, var in self.trans_vars.items(): var.set(slug in conf["sel_trans_rad"])
+        self.user_bands = [dict(b) for b in conf["user_bands"]]
+        self.bands_lb.delete(0, tk.END)
+        for b in self.user_bands:
+            self.bands_lb.insert(tk.END, f"{b['initial']} → {b['final']} ({b['range_min']}-{b['range_max']} nm)")
+        self.emission_files = dict(conf["emission_dict"])
+        self.sellmeier_aliases = dict(conf.get("sellmeier_aliases") or {})
+        self.update_spectra_status()
+
+    def open_project(self):
+        from src.project import load_project
+        path = filedialog.askopenfilename(title="Abrir proyecto", filetypes=[("Proyecto FROPA", "*.npz")])
+        if not path: return
+        try:
+            self.project = load_project(path)
+            self.apply_config(self.project["config"])
+            # Resultados guardados al instante; luego se recalcula lo que cambió en disco
+            self.show_project_results()
+            self.log(f"Proyecto cargado: {os.path.basename(path)}. Comprobando cambios en disco...")
+            self.root.after(100, self.refresh_project)
+        except Exception as e:
+            traceback.print_exc()
+            messagebox.showerror("Error", f"No se pudo abrir el proyecto:\n{e}")
+
+    def refresh_project(self):
+        from src.project import refresh_project
+        self.root.config(cursor="watch")
+        try:
+            self.project, recomputed = refresh_project(self.project, n_workers=os.cpu_count() if self.parallel_var.get() else None)
+            if recomputed:
+                self.show_project_results()
+                self.log(f"Muestras recalculadas por cambios en disco: {', '.join(recomputed)}")
+            else:
+                self.log("Proyecto al día: no hubo cambios en disco.")
+        except Exception as e:
+            self.log(f"ERROR al actualizar el proyecto: {e}")
+        finally:
+            self.root.config(cursor="")
+
+    def toggle_watch(self):
+        if self.watcher is not None:
+            if self._watch_job is not None: self.root.after_cancel(self._watch_job)
+            self._watch_stop.set()
+            self.watcher, self._watch_job, self._watch_stop = None, None, None
+            self.watch_btn.config(text="Vigilar carpeta...")
+            return self.log("Vigilancia de carpeta detenida.")
+        if self.project is None:
+            return messagebox.showwarning("Sin Resultados", "Ejecute el análisis (o abra un proyecto) antes de vigilar una carpeta.")
+        folder = filedialog.askdirectory(title="Carpeta de adquisición a vigilar")
+        if not folder: return
+        from src.watch import FolderWatcher, DEFAULT_INTERVAL
+        self.watcher = FolderWatcher(folder, self.project, n_workers=os.cpu_count() if self.parallel_var.get() else None)
+        self._watch_stop = threading.Event()
+        watcher, stop, q = self.watcher, self._watch_stop, self.watch_queue
+
+        def worker():
+            # Los sondeos (run_project) van en este hilo; nunca toca Tk, solo publica en la cola
+            def report(recomputed, w):
+                q.put((w, "data", recomputed, w.project, dict(w.config["emission_dict"]), len(w.rows)))
+            try:
+                watcher.run(DEFAULT_INTERVAL, stop, report)
+            except Exception as e:
+                q.put((watcher, "error", e))
+
+        threading.Thread(target=worker, daemon=True).start()
+        self.watch_btn.config(text="Detener vigilancia")
+        self.log(f"Vigilando {folder}...")
+        self.poll_watch()
+
+    def poll_watch(self):
+        self._watch_job = None
+        while True:
+            try:
+                msg = self.watch_queue.get_nowait()
+            except queue.Empty:
+                break
+            # Mensajes de una vigilancia ya detenida
+            if self.watcher is None or msg[0] is not self.watcher: continue
+            if msg[1] == "error":
+                self.log(f"ERROR en la vigilancia: {msg[2]}")
+                return self.toggle_watch()
+            _, _, recomputed, self.project, emission_files, n_rows = msg
+            self.emission_files = emission_files
+            self.update_spectra_status()
+            self.show_project_results()
+            self.log(f"Nuevos datos: {', '.join(recomputed)} ({n_rows} filas acumuladas).")
+        if self.watcher is not None:
+            self._watch_job = self.root.after(200, self.poll_watch)
+
 if __name__ == "__main__":
+    # En el ejecutable congelado (PyInstaller) los procesos del pool de "Multiproceso"
+    # vuelven a entrar por aquí: deben actuar como trabajadores y no abrir otra ventana
+    import multiprocessing
+    multiprocessing.freeze_support()
     app_root = tk.Tk()
     JuddOfeltApp(app_root)
     app_root.mainloop()
\ No newline at end of file
@@ -0,0 +1,147 @@
+"""
+Etapa de ingesta de espectros de absorción.
+
+A partir de espectros crudos (absorbancia o coeficiente de absorción), la
+concentración de iones y el espesor de cada muestra, integra todas las bandas
+de absorción de todas las muestras en una sola pasada vectorizada y devuelve
+f_exp con la misma estructura que load_oscillator_data, lista para
+calculate_S_ed_exp / perform_jo_fit.
+"""
+import os
+import numpy as np
+import pandas as pd
+from .constants import M, C, E, PI
+from .physics_core import _segment_gather, _segment_trapz
+
+# f = (m c² / π e² N) ∫ α(ν̃) dν̃   (cgs; N en iones/cm³, α en cm⁻¹, ν̃ en cm⁻¹)
+F_PREFACTOR = M * C**2 / (PI * E**2)
+LN10 = np.log(10.0)
+
+SPECTRUM_KINDS = ("absorbance", "alpha")
+
+
+def load_absorption_manifest(filepath):
+    """
+    Lee el manifiesto de absorción: columnas Sample, Concentration (iones/cm³),
+    Thickness (cm) y File (ruta relativa al manifiesto o absoluta).
+    Devuelve un DataFrame con rutas absolutas.
+    """
+    try:
+        df = pd.read_csv(filepath, sep=r'\s+', comment='#')
+        required = ['Sample', 'Concentration', 'Thickness', 'File']
+        missing = [c for c in required if c not in df.columns]
+        if missing:
+            raise ValueError(f"faltan columnas {missing}")
+        base = os.path.dirname(os.path.abspath(filepath))
+        df['File'] = [f if os.path.isabs(f) else os.path.join(base, f) for f in df['File']]
+        df['Sample'] = df['Sample'].astype(str)
+        return df
+    except Exception as e:
+        raise ValueError(f"Error en manifiesto de absorción: {e}")
+
+
+def load_absorption_bands(filepath):
+    """Lee la tabla de bandas de absorción: Transition, range_min, range_max (nm)."""
+    try:
+        df = pd.read_csv(filepath, sep=r'\s+', comment='#')
+        df.columns = ['Transition', 'range_min', 'range_max']
+        if (df['range_min'] >= df['range_max']).any():
+            raise ValueError("range_min debe ser menor que range_max en todas las bandas")
+        return df
+    except Exception as e:
+        raise ValueError(f"Error en tabla de bandas de absorción: {e}")
+
+
+def load_absorption_spectrum(filepath):
+    """Mismo formato que los espectros de emisión: dos columnas (nm, absorbancia o α)."""
+    try:
+        df = pd.read_csv(filepath, sep=r'\s+', names=['wavelength_nm', 'value'], comment='#').apply(pd.to_numeric, errors='coerce').dropna()
+        if df.empty: return None
+        return df.sort_values('wavelength_nm', kind='mergesort')
+    except Exception:
+        return None
+
+
+def integrate_absorption_bands(spectra, thickness_cm, concentration, bands, kind="absorbance", baseline=True):
+    """
+    Integra todas las bandas de todas las muestras a la vez.
+
+    spectra: lista de (wl_nm ordenado, valor) por muestra.
+    thickness_cm, concentration: arrays [muestras].
+    bands: DataFrame/lista con range_min y range_max (nm).
+    Devuelve (f_exp[bandas, muestras], baricentros_nm[bandas, muestras]).
+    """
+    if kind not in SPECTRUM_KINDS:
+        raise ValueError(f"Tipo de espectro desconocido: {kind}")
+    n_s = len(spectra)
+    r_min = np.asarray(bands['range_min'], dtype=float)
+    r_max = np.asarray(bands['range_max'], dtype=float)
+    n_b = len(r_min)
+    thickness_cm = np.asarray(thickness_cm, dtype=float)
+    concentration = np.asarray(concentration, dtype=float)
+
+    offsets = np.concatenate([[0], np.cumsum([len(wl) for wl, _ in spectra])]).astype(np.intp)
+    wl_all = np.concatenate([wl for wl, _ in spectra])
+    val_all = np.concatenate([v for _, v in spectra])
+    # α(λ) en cm⁻¹ para todas las muestras de una vez
+    per_point_L = np.repeat(thickness_cm, np.diff(offsets))
+    alpha_all = LN10 * val_all / per_point_L if kind == "absorbance" else val_all
+
+    lo = np.vstack([offsets[k] + np.searchsorted(wl, r_min, side='left') for k, (wl, _) in enumerate(spectra)]).ravel()
+    hi = np.vstack([offsets[k] + np.searchsorted(wl, r_max, side='right') for k, (wl, _) in enumerate(spectra)]).ravel()
+    idx, seg, starts, lengths = _segment_gather(lo, hi)
+    n_seg = n_s * n_b
+    x, a = wl_all[idx], alpha_all[idx]
+
+    if baseline and len(idx):
+        # Línea recta entre los extremos de cada banda
+        nonempty = lengths > 0
+        first, last = np.zeros(n_seg, dtype=np.intp), np.zeros(n_seg, dtype=np.intp)
+        first[nonempty] = starts[nonempty]
+        last[nonempty] = starts[nonempty] + lengths[nonempty] - 1
+        x0, x1, y0, y1 = x[first], x[last], a[first], a[last]
+        span = np.where(x1 > x0, x1 - x0, 1.0)
+        a = a - (y0[seg] + (y1 - y0)[seg] * (x - x0[seg]) / span[seg])
+
+    # ∫ α dν̃ = ∫ α(λ) · 10⁷/λ² dλ   (λ en nm)
+    int_nu = _segment_trapz(a * 1e7 / x**2, x, seg, n_seg)
+    int_lam = _segment_trapz(a, x, seg, n_seg)
+    mom_lam = _segment_trapz(a * x, x, seg, n_seg)
+
+    valid = lengths >= 2
+    N = np.repeat(concentration, n_b)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        f = np.where(valid, F_PREFACTOR * int_nu / N, np.nan)
+        bary = np.where(valid & (int_lam != 0), mom_lam / int_lam, np.nan)
+    return f.reshape(n_s, n_b).T, bary.reshape(n_s, n_b).T
+
+
+def build_oscillator_data(manifest_path, bands_path, kind="absorbance", baseline=True):
+    """
+    Pipeline completo: manifiesto + bandas -> (wavelengths_nm, f_exp, sample_names, band_labels),
+    con la misma forma que data_io.load_oscillator_data.
+    """
+    manifest = load_absorption_manifest(manifest_path)
+    bands = load_absorption_bands(bands_path)
+    spectra = []
+    for path in manifest['File']:
+        df = load_absorption_spectrum(path)
+        if df is None:
+            raise ValueError(f"No se pudo leer el espectro de absorción: {os.path.basename(path)}")
+        spectra.append((df['wavelength_nm'].to_numpy(dtype=float), df['value'].to_numpy(dtype=float)))
+
+    f_exp, bary = integrate_absorption_bands(spectra, manifest['Thickness'].to_numpy(dtype=float),
+                                             manifest['Concentration'].to_numpy(dtype=float), bands, kind, baseline)
+    if np.isnan(f_exp).any():
+        bad = [bands['Transition'].iloc[b] for b in np.unique(np.where(np.isnan(f_exp))[0])]
+        raise ValueError(f"Bandas fuera del rango de algún espectro: {', '.join(map(str, bad))}")
+    wavelengths_nm = np.nanmean(bary, axis=1)
+    return wavelengths_nm, f_exp, manifest['Sample'].tolist(), bands['Transition'].astype(str).tolist()
+
+
+def save_oscillator_table(filepath, wavelengths_nm, f_exp, sample_names, band_labels):
+    """Escribe f_exp con el formato del archivo de Fuerzas de Oscilador (Transition, Band, muestras...)."""
+    df = pd.DataFrame({'Transition': band_labels, 'Band': [f"{w:.2f}" for w in wavelengths_nm]})
+    for k, s_name in enumerate(sample_names):
+        df[s_name] = f_exp[:, k]
+    df.to_csv(filepath, sep='\t', index=False, float_format='%.5E')
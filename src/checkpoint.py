@@ -0,0 +1,107 @@
+"""
+Diario de ejecución para lotes largos reanudables.
+
+run_project(..., journal=CARPETA) registra cada muestra en cuanto termina
+(un results.ResultSet de una muestra y su n(λ)) como un .npz propio con el
+esquema de project.pack_results. Cada entrada se escribe en un temporal y se
+publica con os.replace, así que una interrupción a mitad de escritura nunca
+deja una entrada a medias: o está completa o no existe.
+
+Si la ruta contiene '{fingerprint}' (p. ej. 'fropa_journal_{fingerprint}'),
+run_project lo sustituye por el inicio de la huella global, de modo que dos
+análisis distintos nunca comparten diario. Al relanzar el mismo análisis, las muestras cuya entrada coincide con la huella
+actual de sus entradas (project.input_fingerprints) no se recalculan. Si cambia
+algo común a todas las muestras, el diario se vacía. El espacio en disco está
+acotado a un archivo por muestra pendiente de consolidar, y el diario se borra
+al terminar la ejecución completa.
+"""
+import hashlib
+import json
+import os
+import numpy as np
+
+JOURNAL_VERSION = 2
+# Campo de la ruta del diario que run_project sustituye por la huella global
+FINGERPRINT_FIELD = "{fingerprint}"
+_HEADER = "journal.json"
+_TMP = ".tmp"
+
+
+def _atomic_write(path, write):
+    """Escribe mediante write(archivo) en un temporal y lo publica de forma atómica."""
+    tmp = path + _TMP
+    with open(tmp, "wb") as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class RunJournal:
+    """
+    Diario de un análisis en CARPETA ligado a su huella global.
+    completed(huellas) carga las muestras ya terminadas; record(...) añade una.
+    """
+
+    def __init__(self, directory, global_fp):
+        self.directory = directory
+        self.global_fp = global_fp
+        os.makedirs(directory, exist_ok=True)
+        header = {"version": JOURNAL_VERSION, "global": global_fp}
+        try:
+            with open(os.path.join(directory, _HEADER), encoding="utf-8") as f:
+                current = json.load(f)
+        except (OSError, ValueError):
+            current = None
+        if current != header:
+            # Otro análisis (o un diario ilegible): se empieza de cero
+            self.clear()
+            os.makedirs(directory, exist_ok=True)
+            _atomic_write(os.path.join(directory, _HEADER), lambda f: f.write(json.dumps(header).encode()))
+        # Restos de escrituras interrumpidas
+        for name in os.listdir(directory):
+            if name.endswith(_TMP):
+                os.remove(os.path.join(directory, name))
+
+    def _entry_path(self, s_name):
+        return os.path.join(self.directory, hashlib.sha1(str(s_name).encode()).hexdigest()[:20] + ".npz")
+
+    def record(self, s_name, fingerprint, results):
+        """Registra los resultados {'set', 'n'} de una muestra terminada."""
+        from .project import pack_results
+        arrays, meta = pack_results(results)
+        meta.update(sample=s_name, fingerprint=fingerprint)
+        arrays["__header__"] = np.array(json.dumps(meta, ensure_ascii=False, default=str))
+        _atomic_write(self._entry_path(s_name), lambda f: np.savez_compressed(f, **arrays))
+
+    def completed(self, fingerprints):
+        """
+        {muestra: resultados} de las muestras de fingerprints ({muestra: huella})
+        con una entrada vigente. Las entradas obsoletas o ilegibles se descartan.
+        """
+        from .project import unpack_results
+        done = {}
+        for s_name, fp in fingerprints.items():
+            path = self._entry_path(s_name)
+            if not os.path.exists(path):
+                continue
+            try:
+                with np.load(path, allow_pickle=False) as data:
+                    meta = json.loads(str(data["__header__"]))
+                    if meta.get("sample") == s_name and meta.get("fingerprint") == fp:
+                        done[s_name] = unpack_results(data, meta)
+            except (OSError, ValueError, KeyError):
+                pass
+            if s_name not in done:
+                os.remove(path)
+        return done
+
+    def clear(self):
+        """Borra el diario completo."""
+        if not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            if name == _HEADER or name.endswith((".npz", _TMP)):
+                os.remove(os.path.join(self.directory, name))
+        if not os.listdir(self.directory):
+            os.rmdir(self.directory)
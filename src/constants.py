@@ -8,6 +8,7 @@ H = 6.62606885e-27  # g·cm²·s⁻¹ (Planck's constant)
 C = 29979245800.0   # cm·s⁻¹ (Speed of light)
 M = 9.10938215e-28  # g (Electron mass)
 E = 4.80320427e-10  # cm^3/2·g^1/2·s⁻¹ (Elementary charge)
+K_B = 1.380649e-16  # erg·K⁻¹ (Boltzmann constant)
 
-# Nivel fundamental para Er³⁺
+# Nivel fundamental para Er³⁺ (ion por defecto; el resto de iones está en ions.IONS)
 J_GROUND_ER = 15/2
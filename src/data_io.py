@@ -1,6 +1,17 @@
+import os
+from collections import OrderedDict
 import pandas as pd
 from .utils import SELLMEIER_MODEL_1 # Importamos la constante
 
+# Registro de sesión de matrices de emisión ya parseadas.
+# Clave: ruta absoluta -> (mtime, DataFrame). Compartido por la GUI y el motor de análisis.
+_EM_MATRIX_CACHE = {}
+# Espectros de emisión (ruta -> (mtime, DataFrame, bytes)), en orden de uso (LRU).
+# Se descartan los menos usados al superar SPECTRUM_CACHE_BYTES; un espectro
+# descartado simplemente se vuelve a leer del disco.
+SPECTRUM_CACHE_BYTES = 64 * 2**20
+_SPECTRUM_CACHE = OrderedDict()
+
 # def load_oscillator_data(filepath):
 #     try:
 #         osc_data = pd.read_csv(filepath, sep=r'\s+')
@@ -41,17 +52,50 @@ def load_abs_matrix_elements(filepath):
         raise ValueError(f"Error cargando matriz de absorción: {e}")
 
 def load_emission_matrix_elements(filepath):
-    from .utils import get_level_name_slug
+    from .ions import level_slugs
     try:
         df = pd.read_csv(filepath, delim_whitespace=True, header=None)
         df.columns = ['J_initial', 'L_initial', 'S_initial','J_final', 'L_final', 'S_final',
                       'wavenumber_cm_1', 'U2', 'U4', 'U6']
-        df['Initial_Name_Slug'] = df.apply(lambda r: get_level_name_slug(r['J_initial'], r['L_initial'], r['S_initial']), axis=1)
-        df['Final_Name_Slug'] = df.apply(lambda r: get_level_name_slug(r['J_final'], r['L_final'], r['S_final']), axis=1)
+        # Nombres de todas las filas de una vez, por indexación en la tabla de términos
+        df['Initial_Name_Slug'] = level_slugs(df['J_initial'], df['L_initial'], df['S_initial'])
+        df['Final_Name_Slug'] = level_slugs(df['J_final'], df['L_final'], df['S_final'])
         return df
     except Exception as e:
         raise ValueError(f"Error cargando matriz de emisión: {e}")
 
+def get_emission_matrix_elements(filepath):
+    """
+    Devuelve la matriz de emisión parseada desde el registro de sesión.
+    Solo se vuelve a leer el archivo si su fecha de modificación cambió.
+    El DataFrame devuelto es compartido: no debe modificarse en sitio.
+    """
+    key = os.path.abspath(filepath)
+    try:
+        mtime = os.path.getmtime(key)
+    except OSError as e:
+        raise ValueError(f"Error cargando matriz de emisión: {e}")
+    cached = _EM_MATRIX_CACHE.get(key)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    df = load_emission_matrix_elements(key)
+    _EM_MATRIX_CACHE[key] = (mtime, df)
+    return df
+
+def clear_emission_matrix_cache():
+    """Vacía los registros de matrices de emisión y de espectros (p. ej. al cerrar la sesión)."""
+    _EM_MATRIX_CACHE.clear()
+    clear_spectrum_cache()
+
+def clear_spectrum_cache(keep=None):
+    """
+    Vacía el registro de espectros. keep: rutas que se conservan (p. ej. los
+    espectros aún vinculados tras volver a vincular archivos).
+    """
+    keep = {os.path.abspath(p) for p in (keep or ())}
+    for key in [k for k in _SPECTRUM_CACHE if k not in keep]:
+        del _SPECTRUM_CACHE[key]
+
 # def get_available_transitions(em_matrix_df):
 #     from .utils import PRETTY_NAMES
 #     if em_matrix_df is None: return {}
@@ -114,4 +158,29 @@ def load_emission_spectrum(filepath):
         if df.empty: return None
         return df
     except Exception:
-        return None
\ No newline at end of file
+        return None
+
+def get_emission_spectrum(filepath):
+    """
+    Versión con registro de sesión de load_emission_spectrum (clave: ruta y mtime).
+    El registro está acotado a SPECTRUM_CACHE_BYTES (se descartan los menos usados).
+    Devuelve None si el archivo no existe o no se puede leer.
+    """
+    key = os.path.abspath(filepath)
+    try:
+        mtime = os.path.getmtime(key)
+    except OSError:
+        return None
+    cached = _SPECTRUM_CACHE.get(key)
+    if cached is not None and cached[0] == mtime:
+        _SPECTRUM_CACHE.move_to_end(key)
+        return cached[1]
+    _SPECTRUM_CACHE.pop(key, None)
+    df = load_emission_spectrum(key)
+    if df is not None:
+        _SPECTRUM_CACHE[key] = (mtime, df, int(df.memory_usage(index=True).sum()))
+        total = sum(entry[2] for entry in _SPECTRUM_CACHE.values())
+        # Siempre se conserva el último espectro leído, aunque supere el límite por sí solo
+        while total > SPECTRUM_CACHE_BYTES and len(_SPECTRUM_CACHE) > 1:
+            total -= _SPECTRUM_CACHE.popitem(last=False)[1][2]
+    return df
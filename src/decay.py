@@ -0,0 +1,254 @@
+"""
+Ajuste por lotes de curvas de decaimiento de fluorescencia.
+
+Todas las curvas se recortan desde el máximo, se les resta el fondo, se
+agrupan en bins si son muy largas y se apilan en una matriz con máscara.
+Los modelos (exponencial simple, doble o estirada) se ajustan a la vez con un
+Levenberg-Marquardt vectorizado sobre el lote completo. Con τ_meas y el τ_R de
+calculate_radiative_properties se obtienen η = τ_meas/τ_R y W_nr.
+"""
+import os
+import math
+import numpy as np
+import pandas as pd
+
+DECAY_MODELS = ("single", "double", "stretched")
+_gamma = np.frompyfunc(math.gamma, 1, 1)
+
+
+def load_decay_manifest(filepath):
+    """
+    Manifiesto de curvas: columnas Sample, Level (slug, p. ej. 4I13/2) y File
+    (ruta absoluta o relativa al manifiesto). Cada archivo tiene dos columnas:
+    tiempo (ms) e intensidad.
+    """
+    try:
+        df = pd.read_csv(filepath, sep=r'\s+', comment='#')
+        missing = [c for c in ['Sample', 'Level', 'File'] if c not in df.columns]
+        if missing:
+            raise ValueError(f"faltan columnas {missing}")
+        base = os.path.dirname(os.path.abspath(filepath))
+        df['File'] = [f if os.path.isabs(f) else os.path.join(base, f) for f in df['File']]
+        df['Sample'] = df['Sample'].astype(str)
+        return df
+    except Exception as e:
+        raise ValueError(f"Error en manifiesto de decaimientos: {e}")
+
+
+def load_decay_curve(filepath):
+    try:
+        df = pd.read_csv(filepath, sep=r'\s+', names=['t', 'I'], comment='#').apply(pd.to_numeric, errors='coerce').dropna()
+        if len(df) < 5: return None
+        df = df.sort_values('t', kind='mergesort')
+        return df['t'].to_numpy(dtype=float), df['I'].to_numpy(dtype=float)
+    except Exception:
+        return None
+
+
+def _prepare_curve(t, y, max_points, subtract_background=True, tail_frac=0.05):
+    """Recorta desde el pico, resta el fondo (cola), normaliza y agrupa en bins si hace falta."""
+    k0 = int(np.argmax(y))
+    t, y = t[k0:] - t[k0], y[k0:].astype(float)
+    if subtract_background:
+        n_tail = max(int(len(y) * tail_frac), 1)
+        y = y - np.median(y[-n_tail:])
+    peak = y[0] if y[0] > 0 else np.max(y)
+    if not peak > 0:
+        return None
+    y = y / peak
+    if len(y) > max_points:
+        k = int(np.ceil(len(y) / max_points))
+        n = len(y) // k * k
+        t, y = t[:n].reshape(-1, k).mean(axis=1), y[:n].reshape(-1, k).mean(axis=1)
+    return t, y
+
+
+def stack_curves(curves, max_points=2000, subtract_background=True):
+    """
+    Apila curvas de distinta longitud en matrices (B, N) con pesos 0/1 de relleno.
+    El fondo se estima con la mediana del 5 % final de cada curva, por lo que
+    conviene desactivarlo si las curvas no llegan a decaer por completo.
+    """
+    prepared = [_prepare_curve(t, y, max_points, subtract_background) if (t is not None) else None for t, y in curves]
+    n = max([len(p[0]) for p in prepared if p is not None] + [1])
+    T, Y, W = np.zeros((len(curves), n)), np.zeros((len(curves), n)), np.zeros((len(curves), n))
+    for b, p in enumerate(prepared):
+        if p is None: continue
+        m = len(p[0])
+        T[b, :m], Y[b, :m], W[b, :m] = p[0], p[1], 1.0
+    return T, Y, W
+
+
+def _initial_tau(T, Y, W):
+    """τ inicial por ajuste log-lineal ponderado (vectorizado) sobre la parte > 5 % del pico."""
+    w = W * (Y > 0.05)
+    ly = np.log(np.where(Y > 0.05, Y, 1.0))
+    sw, st, sy = w.sum(1), (w * T).sum(1), (w * ly).sum(1)
+    stt, sty = (w * T * T).sum(1), (w * T * ly).sum(1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = (sw * sty - st * sy) / (sw * stt - st**2)
+    span = np.where(W.any(1), (T * W).max(1), 1.0)
+    return np.where(np.isfinite(slope) & (slope < 0), -1.0 / slope, span / 3.0)
+
+
+def _model(name, T, theta):
+    """Devuelve (f, J) con J = ∂f/∂θ. Los tiempos se parametrizan como ln τ y β como logit."""
+    if name == "single":
+        A, tau = theta[:, :1], np.exp(theta[:, 1:2])
+        e = np.exp(-T / tau)
+        f = A * e
+        return f, np.stack([e, f * T / tau], axis=-1)
+    if name == "double":
+        # Amplitudes como ln A para que ninguna componente sea negativa
+        A1, t1, A2, t2 = np.exp(theta[:, :1]), np.exp(theta[:, 1:2]), np.exp(theta[:, 2:3]), np.exp(theta[:, 3:4])
+        f1, f2 = A1 * np.exp(-T / t1), A2 * np.exp(-T / t2)
+        return f1 + f2, np.stack([f1, f1 * T / t1, f2, f2 * T / t2], axis=-1)
+    A, tau, beta = theta[:, :1], np.exp(theta[:, 1:2]), 1.0 / (1.0 + np.exp(-theta[:, 2:3]))
+    r = T / tau
+    x = r**beta
+    e = np.exp(-x)
+    f = A * e
+    log_r = np.log(np.where(r > 0, r, 1.0))
+    return f, np.stack([e, f * beta * x, -f * x * log_r * beta * (1 - beta)], axis=-1)
+
+
+def fit_decays(T, Y, W, model="single", max_iter=200, tol=1e-10):
+    """
+    Levenberg-Marquardt por lotes. Devuelve un dict de arrays (B,):
+    tau_avg (mismas unidades que T), parámetros del modelo y R².
+    """
+    if model not in DECAY_MODELS:
+        raise ValueError(f"Modelo de decaimiento desconocido: {model}")
+    B = len(T)
+    tau0 = _initial_tau(T, Y, W)
+    if model == "single":
+        theta = np.column_stack([np.ones(B), np.log(tau0)])
+    elif model == "double":
+        theta = np.column_stack([np.log(0.5) * np.ones(B), np.log(tau0 / 3), np.log(0.5) * np.ones(B), np.log(tau0 * 2)])
+    else:
+        theta = np.column_stack([np.ones(B), np.log(tau0), np.full(B, np.log(0.8 / 0.2))])
+
+    # Límites de ln τ: entre el paso temporal más fino y 100 veces la duración de la curva
+    span = np.where(W.any(1), (T * W).max(1), 1.0)
+    dt = np.abs(T[:, 1] - T[:, 0]) if T.shape[1] > 1 else span
+    tau_idx = [1] if model != "double" else [1, 3]
+    ln_lo, ln_hi = np.log(np.maximum(dt, 1e-12) / 10), np.log(100 * span)
+
+    def clamp(th, rows):
+        for k in tau_idx:
+            th[:, k] = np.clip(th[:, k], ln_lo[rows], ln_hi[rows])
+        if model == "double":
+            th[:, [0, 2]] = np.clip(th[:, [0, 2]], -30.0, 5.0)
+        return th
+
+    def cost_of(th, rows):
+        with np.errstate(all='ignore'):
+            f, J = _model(model, T[rows], th)
+            r = (f - Y[rows]) * W[rows]
+            return (r**2).sum(1), r, J
+
+    theta = clamp(theta, np.arange(B))
+    cost, r, J = cost_of(theta, np.arange(B))
+    lam = np.full(B, 1e-3)
+    eye = np.eye(theta.shape[1])
+    active = np.arange(B)
+    for _ in range(max_iter):
+        if not len(active): break
+        Jw = J[active] * W[active, :, None]
+        JTJ = np.einsum('bnp,bnq->bpq', Jw, Jw)
+        g = np.einsum('bnp,bn->bp', Jw, r[active])
+        diag = np.einsum('bpp->bp', JTJ)[:, :, None] * eye
+        A = JTJ + lam[active, None, None] * (diag + 1e-12 * eye)
+        try:
+            delta = np.linalg.solve(A, -g[..., None])[..., 0]
+        except np.linalg.LinAlgError:
+            delta = np.zeros((len(active), theta.shape[1]))
+        new_theta = clamp(theta[active] + np.nan_to_num(delta), active)
+        new_cost, new_r, new_J = cost_of(new_theta, active)
+        better = np.isfinite(new_cost) & (new_cost < cost[active])
+        rel = np.where(better, (cost[active] - new_cost) / np.maximum(cost[active], 1e-300), 0.0)
+        upd = active[better]
+        theta[upd], r[upd], J[upd], cost[upd] = new_theta[better], new_r[better], new_J[better], new_cost[better]
+        lam[active] = np.clip(np.where(better, lam[active] / 3.0, lam[active] * 4.0), 1e-12, 1e12)
+        # Cada curva sale del lote cuando deja de mejorar
+        done = (better & (rel < tol)) | (lam[active] >= 1e10)
+        active = active[~done]
+
+    n_pts = W.sum(1)
+    y_mean = (Y * W).sum(1) / np.maximum(n_pts, 1)
+    ss_tot = (((Y - y_mean[:, None]) * W)**2).sum(1)
+    out = {"R2": 1 - cost / np.where(ss_tot > 0, ss_tot, np.nan)}
+    if model == "single":
+        out["tau1"] = np.exp(theta[:, 1])
+        out["tau_avg"] = out["tau1"]
+    elif model == "double":
+        a1, t1, a2, t2 = np.exp(theta[:, 0]), np.exp(theta[:, 1]), np.exp(theta[:, 2]), np.exp(theta[:, 3])
+        # Se ordenan las componentes para que τ1 sea la rápida
+        swap = t1 > t2
+        a1, a2 = np.where(swap, a2, a1), np.where(swap, a1, a2)
+        t1, t2 = np.where(swap, t2, t1), np.where(swap, t1, t2)
+        out.update({"A1": a1, "tau1": t1, "A2": a2, "tau2": t2,
+                    "tau_avg": (a1 * t1**2 + a2 * t2**2) / (a1 * t1 + a2 * t2)})
+    else:
+        tau, beta = np.exp(theta[:, 1]), 1.0 / (1.0 + np.exp(-theta[:, 2]))
+        out.update({"tau1": tau, "beta": beta,
+                    "tau_avg": tau / beta * _gamma(1.0 / beta).astype(float)})
+    out["tau_avg"] = np.where(n_pts >= 3, out["tau_avg"], np.nan)
+    out["converged"] = ~np.isin(np.arange(B), active)
+    return out
+
+
+def fit_decay_manifest(manifest_path, model="single", max_points=2000, subtract_background=True):
+    """Carga y ajusta todas las curvas del manifiesto. Devuelve un DataFrame (Sample, Level, τ_meas (ms), ...)."""
+    manifest = load_decay_manifest(manifest_path)
+    curves = []
+    for path in manifest['File']:
+        c = load_decay_curve(path)
+        curves.append(c if c is not None else (None, None))
+    T, Y, W = stack_curves(curves, max_points, subtract_background)
+    res = fit_decays(T, Y, W, model)
+    df = pd.DataFrame({'Sample': manifest['Sample'], 'Level': manifest['Level'].astype(str),
+                       'τ_meas (ms)': res['tau_avg'], 'R²': res['R2']})
+    if model == "double":
+        df['τ1 (ms)'], df['τ2 (ms)'] = res['tau1'], res['tau2']
+    elif model == "stretched":
+        df['β'] = res['beta']
+    return df
+
+
+def attach_lifetimes(rad_sum, decay_df):
+    """
+    Añade τ_meas, η y W_nr a las filas de la tabla radiativa cuyo nivel inicial
+    tenga una curva medida. Si hay varias curvas para el mismo nivel se promedian.
+    """
+    fits = decay_df.groupby(['Sample', 'Level'])['τ_meas (ms)'].mean()
+    out = {}
+    for s_name, df in rad_sum.items():
+        if df.empty:
+            out[s_name] = df; continue
+        df = df.copy()
+        tau_meas = np.array([fits.get((s_name, lvl), np.nan) for lvl in df['SLJ']])
+        tau_r = df['τ_R (ms)'].to_numpy(dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            df['τ_meas (ms)'] = tau_meas
+            df['η (%)'] = 100 * tau_meas / tau_r
+            df['W_nr (s⁻¹)'] = 1000 / tau_meas - 1000 / tau_r
+        out[s_name] = df
+    return out
+
+
+def attach_lifetimes_columnar(results, decay_df):
+    """
+    attach_lifetimes sobre un results.ResultSet: devuelve una copia con las mismas
+    columnas en rad_extra, calculadas sobre todas las filas radiativas a la vez.
+    """
+    from .results import RAD_VALUE_COLUMNS
+    fits = decay_df.groupby(['Sample', 'Level'])['τ_meas (ms)'].mean()
+    samples, initial, _ = results.rad_row_labels()
+    tau_meas = np.array([fits.get((s, lvl), np.nan) for s, lvl in zip(samples, initial)], dtype=float)
+    tau_r = results.rad_values[:, RAD_VALUE_COLUMNS.index('τ_R (ms)')].astype(float)
+    out = results.astype(results.dtype)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out.rad_extra.update({'τ_meas (ms)': tau_meas, 'η (%)': 100 * tau_meas / tau_r,
+                              'W_nr (s⁻¹)': 1000 / tau_meas - 1000 / tau_r})
+    return out
@@ -0,0 +1,41 @@
+"""
+Decimación min/max de espectros para su visualización interactiva.
+
+Para cada columna de píxeles se conservan el mínimo y el máximo (en su orden
+original), de modo que la traza dibujada es idéntica a la de resolución completa
+y el número de puntos enviados al lienzo solo depende del ancho de la ventana.
+"""
+import numpy as np
+
+
+def visible_slice(x, x_min, x_max):
+    """Índices [lo, hi) de los puntos de x (ordenado) dentro de la ventana visible, con un punto de margen."""
+    lo = max(int(np.searchsorted(x, x_min, side='left')) - 1, 0)
+    hi = min(int(np.searchsorted(x, x_max, side='right')) + 1, len(x))
+    return lo, hi
+
+
+def minmax_decimate(x, y, x_min, x_max, n_bins):
+    """
+    Devuelve (x_dec, y_dec) para la ventana [x_min, x_max] con a lo sumo 2*n_bins puntos.
+    x debe estar ordenado de forma creciente.
+    """
+    lo, hi = visible_slice(x, x_min, x_max)
+    xs, ys = x[lo:hi], y[lo:hi]
+    n = len(xs)
+    if n <= 2 * n_bins:
+        return xs, ys
+
+    # Bins de igual número de puntos; el último se rellena repitiendo el valor final
+    k = int(np.ceil(n / n_bins))
+    pad = (-n) % k
+    y_blk = np.concatenate([ys, np.full(pad, ys[-1])]).reshape(-1, k)
+    base = np.arange(y_blk.shape[0]) * k
+    i_min = np.minimum(base + np.argmin(y_blk, axis=1), n - 1)
+    i_max = np.minimum(base + np.argmax(y_blk, axis=1), n - 1)
+
+    # Se conserva el orden de aparición de min y max dentro de cada bin
+    first = np.minimum(i_min, i_max)
+    second = np.maximum(i_min, i_max)
+    idx = np.column_stack([first, second]).ravel()
+    return xs[idx], ys[idx]
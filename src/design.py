@@ -0,0 +1,238 @@
+"""
+Rejillas de diseño en el espacio (Ω2, Ω4, Ω6, n).
+
+A_ed es lineal en Ω y A_md no depende de Ω, así que para una matriz de emisión
+y unos niveles dados cada transición nivel -> nivel final se reduce a
+
+    A[t](Ω, n) = Σ_λ K[n, t, λ]·Ω_λ + A_md[n, t]
+
+con K y A_md precalculados una sola vez (factores ν³/(2J+1), χ_ed(n), χ_md(n),
+U² y S_md sumados sobre las filas J -> J' de la transición). Evaluar una rejilla
+de millones de puntos Ω es entonces una contracción tensorial por bloques.
+τ_R ≥ X es un semiespacio lineal en Ω (Σ K_T·Ω ≤ 1000/X − A_md,T), por lo que
+esa consulta no necesita calcular A ni β.
+
+Ω se expresa en 10⁻²⁰ cm², como en jo_res. Los índices de refracción pueden
+darse como valores constantes (sin dispersión) o como coeficientes de
+Sellmeier, en cuyo caso n se evalúa en la λ de cada fila como en
+calculate_radiative_properties.
+"""
+import numpy as np
+import pandas as pd
+
+DEFAULT_CHUNK = 200_000
+
+
+def omega_grid(o2, o4, o6):
+    """Puntos [G, 3] del producto cartesiano de los ejes Ω2, Ω4, Ω6 (orden C, Ω6 el más rápido)."""
+    axes = np.meshgrid(np.asarray(o2, dtype=float), np.asarray(o4, dtype=float), np.asarray(o6, dtype=float), indexing='ij')
+    return np.stack([a.ravel() for a in axes], axis=1)
+
+
+def _interp_regular(axes, table, points):
+    """
+    Interpolación multilineal de table [len(ax0), len(ax1), ..., ...] en points [P, D] (ejes crecientes).
+    Los puntos fuera del rango de algún eje dan NaN: nunca se extrapola.
+    """
+    points = np.atleast_2d(np.asarray(points, dtype=float))
+    P, D = points.shape
+    lo, frac = np.empty((P, D), dtype=np.intp), np.empty((P, D))
+    outside = np.zeros(P, dtype=bool)
+    for d, ax in enumerate(axes):
+        outside |= ~((points[:, d] >= ax[0]) & (points[:, d] <= ax[-1]))
+        if len(ax) == 1:
+            lo[:, d], frac[:, d] = 0, 0.0
+            continue
+        i = np.clip(np.searchsorted(ax, points[:, d], side='right') - 1, 0, len(ax) - 2)
+        lo[:, d] = i
+        frac[:, d] = (points[:, d] - ax[i]) / (ax[i + 1] - ax[i])
+    out = np.zeros((P,) + table.shape[D:])
+    for corner in range(2 ** D):
+        bits = [(corner >> d) & 1 for d in range(D)]
+        idx = tuple(np.minimum(lo[:, d] + bits[d], len(axes[d]) - 1) for d in range(D))
+        w = np.prod([frac[:, d] if bits[d] else 1 - frac[:, d] for d in range(D)], axis=0)
+        out += w.reshape((P,) + (1,) * (table.ndim - D)) * table[idx]
+    out[outside] = np.nan
+    return out
+
+
+class DesignBasis:
+    """
+    Bases por transición para una matriz de emisión, unos niveles iniciales y
+    una lista de índices de refracción.
+    n_values: lista de n constantes, o de listas de coeficientes de Sellmeier (con sm).
+    """
+
+    def __init__(self, em_df, sel_levels, n_values, sm=None):
+        from .constants import H, E, PI
+        from .kernels import get_backend
+        from .physics_core import _radiative_layout, calculate_refractive_index
+        sub, groups = _radiative_layout(em_df, list(sel_levels))
+        if sub.empty:
+            raise ValueError("Ninguno de los niveles seleccionados está en la matriz de emisión.")
+        self.dispersive = bool(len(n_values)) and np.ndim(n_values[0]) > 0
+        if self.dispersive and sm is None:
+            raise ValueError("Con coeficientes de Sellmeier hay que indicar el modelo (sm).")
+        self.n_values = [np.asarray(v, dtype=float) for v in n_values] if self.dispersive else np.asarray(n_values, dtype=float)
+        if not len(self.n_values):
+            raise ValueError("Se necesita al menos un índice de refracción.")
+
+        nu = sub['wavenumber_cm_1'].to_numpy(dtype=float)
+        J1 = sub['J_initial'].to_numpy(dtype=float)
+        U = sub[['U2', 'U4', 'U6']].to_numpy(dtype=float)
+        S_md = get_backend().smd_rows(*(sub[c].to_numpy(dtype=float) for c in
+                                        ['J_initial', 'L_initial', 'S_initial', 'J_final', 'L_final', 'S_final']))
+        t_const = (64*PI**4*nu**3)/(3*H*(2*J1+1))
+        if self.dispersive:
+            n = np.stack([np.atleast_1d(calculate_refractive_index(1e7/nu, c, sm)) for c in self.n_values])
+        else:
+            n = np.broadcast_to(self.n_values[:, None], (len(self.n_values), len(nu)))
+        # Por fila: K_row [M, R, 3] (Ω en 10⁻²⁰ cm²) y A_md_row [M, R]
+        K_row = (t_const*(n*(n**2+2)**2)/9)[:, :, None] * (E**2 * 1e-20 * U)[None]
+        A_md_row = t_const*(n**3)*S_md
+
+        # Suma de las filas J -> J' de cada transición nivel -> nivel final
+        self.levels, self.transitions, level_of, rows = [], [], [], []
+        for level_name, finals in groups:
+            for f_name, idx in finals:
+                self.transitions.append((level_name, f_name))
+                level_of.append(len(self.levels))
+                rows.append(idx)
+            self.levels.append(level_name)
+        self.level_of = np.array(level_of, dtype=np.intp)
+        self.K = np.stack([K_row[:, idx].sum(axis=1) for idx in rows], axis=1)           # [M, T, 3]
+        self.A_md = np.stack([A_md_row[:, idx].sum(axis=1) for idx in rows], axis=1)     # [M, T]
+        # Totales por nivel: A_T = Ω·K_T + A_md,T
+        L = len(self.levels)
+        self.K_T = np.zeros((len(self.n_values), L, 3))
+        self.A_md_T = np.zeros((len(self.n_values), L))
+        np.add.at(self.K_T, (slice(None), self.level_of), self.K)
+        np.add.at(self.A_md_T, (slice(None), self.level_of), self.A_md)
+
+    @property
+    def shape(self):
+        """(nº de índices de refracción, nº de transiciones, nº de niveles)."""
+        return len(self.n_values), len(self.transitions), len(self.levels)
+
+    def level_index(self, level):
+        try:
+            return self.levels.index(level)
+        except ValueError:
+            raise ValueError(f"Nivel no incluido en la rejilla: {level}") from None
+
+    # --- Evaluación exacta ---
+
+    def total_rates(self, omegas):
+        """A_T [G, M, L] (s⁻¹) para Ω [G, 3] en 10⁻²⁰ cm²."""
+        omegas = np.atleast_2d(np.asarray(omegas, dtype=float))
+        M, _, L = self.shape
+        return (omegas @ self.K_T.reshape(M*L, 3).T).reshape(len(omegas), M, L) + self.A_md_T[None]
+
+    def evaluate(self, omegas, chunk=DEFAULT_CHUNK):
+        """
+        A [G, M, T], β_R (%) [G, M, T], A_T [G, M, L] y τ_R (ms) [G, M, L] para
+        Ω [G, 3], por bloques de chunk puntos.
+        """
+        omegas = np.atleast_2d(np.asarray(omegas, dtype=float))
+        G, (M, T, L) = len(omegas), self.shape
+        out = {'A': np.empty((G, M, T)), 'β_R (%)': np.empty((G, M, T)),
+               'A_T (s⁻¹)': np.empty((G, M, L)), 'τ_R (ms)': np.empty((G, M, L))}
+        # Contracciones sobre λ como productos matriciales [g, 3] @ [3, M·T]
+        K, K_T = self.K.reshape(M*T, 3).T, self.K_T.reshape(M*L, 3).T
+        for s in range(0, G, chunk):
+            w = omegas[s:s + chunk]
+            A = (w @ K).reshape(len(w), M, T) + self.A_md[None]
+            A_T = (w @ K_T).reshape(len(w), M, L) + self.A_md_T[None]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                out['A'][s:s + chunk] = A
+                out['β_R (%)'][s:s + chunk] = 100*A/A_T[:, :, self.level_of]
+                out['A_T (s⁻¹)'][s:s + chunk] = A_T
+                out['τ_R (ms)'][s:s + chunk] = 1000/A_T
+        return out
+
+    def to_frame(self, omegas, m=0):
+        """Tabla con las columnas de calculate_radiative_properties para cada punto Ω (índice m de n)."""
+        res = self.evaluate(omegas)
+        omegas = np.atleast_2d(np.asarray(omegas, dtype=float))
+        G, T = len(omegas), len(self.transitions)
+        K = self.K[m][None] * omegas[:, None, :]
+        lvl = np.tile(self.level_of, G)
+        return pd.DataFrame({
+            'Ω2': np.repeat(omegas[:, 0], T), 'Ω4': np.repeat(omegas[:, 1], T), 'Ω6': np.repeat(omegas[:, 2], T),
+            'SLJ': [a for _ in range(G) for a, _ in self.transitions],
+            "S'L'J'": [b for _ in range(G) for _, b in self.transitions],
+            'A_ed': K.sum(axis=2).ravel(), 'A_md': np.tile(self.A_md[m], G),
+            'A': res['A'][:, m].ravel(), 'β_R (%)': res['β_R (%)'][:, m].ravel(),
+            'A_T (s⁻¹)': res['A_T (s⁻¹)'][:, m][np.repeat(np.arange(G), T), lvl],
+            'τ_R (ms)': res['τ_R (ms)'][:, m][np.repeat(np.arange(G), T), lvl],
+        })
+
+    # --- Consultas ---
+
+    def tau_at_least(self, omegas, level, tau_min_ms, chunk=DEFAULT_CHUNK):
+        """
+        Máscara [G, M] de los puntos Ω (y valores de n) con τ_R(level) ≥ tau_min_ms.
+        Es una desigualdad lineal en Ω, así que solo se calcula un producto escalar por punto.
+        """
+        k = self.level_index(level)
+        omegas = np.atleast_2d(np.asarray(omegas, dtype=float))
+        bound = 1000/float(tau_min_ms) - self.A_md_T[:, k]       # [M]
+        mask = np.empty((len(omegas), len(self.n_values)), dtype=bool)
+        for s in range(0, len(omegas), chunk):
+            mask[s:s + chunk] = omegas[s:s + chunk] @ self.K_T[:, k].T <= bound[None]
+        return mask
+
+    def omega_bounds(self, level, tau_min_ms, m=0):
+        """
+        (coeficientes k [3], límite b) del semiespacio k·Ω ≤ b que garantiza τ_R(level) ≥ tau_min_ms
+        para el índice m de n. b < 0 indica que A_md por sí sola ya impide alcanzar ese τ.
+        """
+        k = self.level_index(level)
+        return self.K_T[m, k].copy(), 1000/float(tau_min_ms) - self.A_md_T[m, k]
+
+    def tabulate(self, o2, o4, o6):
+        """Precalcula τ_R y β_R sobre la rejilla regular Ω2 × Ω4 × Ω6 (× n) para búsquedas interpoladas."""
+        return DesignTable(self, o2, o4, o6)
+
+
+class DesignTable:
+    """
+    τ_R [n2, n4, n6, M, L] y β_R [n2, n4, n6, M, T] tabulados sobre ejes regulares.
+    lookup interpola multilinealmente en Ω (y en n si los n son constantes crecientes).
+    """
+
+    def __init__(self, basis, o2, o4, o6):
+        self.basis = basis
+        self.axes = [np.asarray(a, dtype=float) for a in (o2, o4, o6)]
+        for ax in self.axes:
+            if len(ax) > 1 and np.any(np.diff(ax) <= 0):
+                raise ValueError("Los ejes de Ω deben ser estrictamente crecientes.")
+        res = basis.evaluate(omega_grid(*self.axes))
+        shape = tuple(len(a) for a in self.axes)
+        M, T, L = basis.shape
+        self.tau = res['τ_R (ms)'].reshape(shape + (M, L))
+        self.beta = res['β_R (%)'].reshape(shape + (M, T))
+        self.n_axis = None
+        if not basis.dispersive and (M == 1 or np.all(np.diff(basis.n_values) > 0)):
+            self.n_axis = basis.n_values
+
+    @property
+    def nbytes(self):
+        return self.tau.nbytes + self.beta.nbytes
+
+    def lookup(self, points, n=None):
+        """
+        τ_R [P, L] y β_R [P, T] interpolados en points [P, 3] (Ω en 10⁻²⁰ cm²).
+        n: valor de n (si los n tabulados son constantes crecientes) o None para
+        devolver todos los n tabulados ([P, M, L] y [P, M, T]). Los puntos fuera de
+        los ejes (o de n_axis) dan NaN; para ellos, usar basis.evaluate.
+        """
+        points = np.atleast_2d(np.asarray(points, dtype=float))
+        if n is None:
+            return _interp_regular(self.axes, self.tau, points), _interp_regular(self.axes, self.beta, points)
+        if self.n_axis is None:
+            raise ValueError("Solo se puede interpolar en n con índices constantes y crecientes.")
+        axes = self.axes + [self.n_axis]
+        full = np.column_stack([points, np.broadcast_to(float(n), len(points))])
+        # n es el cuarto eje de las tablas [n2, n4, n6, M, ...]
+        return _interp_regular(axes, self.tau, full), _interp_regular(axes, self.beta, full)
@@ -0,0 +1,208 @@
+"""
+Motor de exportación de resultados.
+
+Convierte jo_res / rad_sum / cs_res (o un results.ResultSet) en tablas y las escribe por bloques de filas
+en el formato elegido, informando el progreso mediante un callback. No usa Tk,
+por lo que puede ejecutarse en un hilo secundario sin bloquear la ventana.
+"""
+import csv
+import os
+import numpy as np
+import pandas as pd
+from .utils import PRETTY_NAMES
+
+EXPORT_FORMATS = {
+    "txt": "Texto alineado (.txt)",
+    "tsv": "Separado por tabuladores (.tsv)",
+    "csv": "CSV único consolidado (.csv)",
+    "npz": "Paquete binario columnar (.npz)",
+}
+
+CS_COLUMNS = ['λ_ex (nm)', 'Glass', 'Level', 'E_exp (cm⁻¹)', 'Δλ_eff (nm)', 'σₑ (x10⁻²¹ cm²)', 'ΔG (x10⁻²⁸ cm³)']
+CHUNK_ROWS = 5000
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+def safe_name(name):
+    return "".join(x for x in str(name) if x.isalnum() or x in "._-")
+
+
+def build_export_tables(jo, rad, cs):
+    """
+    Devuelve una lista de (clave, muestra, DataFrame, líneas_finales) con las
+    mismas tablas y columnas que la exportación individual original.
+    jo puede ser también un results.ResultSet (rad y cs se ignoran).
+    """
+    from .results import ResultSet
+    if isinstance(jo, ResultSet):
+        return jo.export_tables()
+    tables = []
+    df_jo = pd.DataFrame(jo)[["Sample", "Ω2", "Ω4", "Ω6", "rms_S"]]
+    df_jo.columns = ["Muestra", "Omega2_x10-20", "Omega4_x10-20", "Omega6_x10-20", "rms_S_LineStrength"]
+    if jo and "δΩ2" in jo[0]:
+        # Modo de incertidumbre analítica
+        for k in ("2", "4", "6"):
+            df_jo[f"dOmega{k}_x10-20"] = [res[f"δΩ{k}"] for res in jo]
+    tables.append(("JO_Parameters", None, df_jo, []))
+
+    for res in jo:
+        footer = [f"# Indicadores de Calidad para {res['Sample']}:",
+                  f"rms_f_Oscillator_Strength (x10-6):\t{res['rms_f']:.4f}",
+                  f"RMS_Error_Total (%):\t{res['rms_perc']:.2f}"]
+        tables.append(("Oscillator_Strengths", res['Sample'], res['f_table'], footer))
+
+    for s_name, df in (rad or {}).items():
+        if df.empty: continue
+        df_exp = df.copy()
+        df_exp['SLJ'] = df_exp['SLJ'].map(PRETTY_NAMES).fillna(df_exp['SLJ'])
+        df_exp["S'L'J'"] = df_exp["S'L'J'"].map(PRETTY_NAMES).fillna(df_exp["S'L'J'"])
+        tables.append(("Radiative_Props", s_name, df_exp, []))
+
+    if cs:
+        df_cs = pd.DataFrame(cs)
+        tables.append(("Cross_Sections", None, df_cs[CS_COLUMNS + [c for c in df_cs.columns if c.startswith('δ')]], []))
+    return tables
+
+
+def _format_column(values, decimals=4, na_rep=""):
+    """
+    Formatea una columna completa de una vez (floats con decimales fijos; NaN como
+    na_rep, vacío igual que to_csv). Devuelve (textos, es_numérica).
+    """
+    arr = np.asarray(values)
+    if arr.dtype.kind == 'f':
+        out = np.char.mod(f"%.{decimals}f", arr).astype(object)
+        out[np.isnan(arr)] = na_rep
+        return out, True
+    return np.array([str(v) for v in arr], dtype=object), arr.dtype.kind in 'iu'
+
+
+def _float_4(x):
+    return f"{x:.4f}"
+
+
+class _Progress:
+    def __init__(self, total, callback, cancel_event):
+        self.total, self.done = max(total, 1), 0
+        self.callback, self.cancel_event = callback, cancel_event
+
+    def step(self, n, msg):
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise ExportCancelled()
+        self.done += n
+        if self.callback: self.callback(self.done, self.total, msg)
+
+
+def _write_delimited(f, df, sep, progress, msg):
+    cols = [_format_column(df[c])[0] for c in df.columns]
+    f.write(sep.join(map(str, df.columns)) + "\n")
+    for start in range(0, len(df), CHUNK_ROWS):
+        stop = min(start + CHUNK_ROWS, len(df))
+        f.writelines(sep.join(str(col[i]) for col in cols) + "\n" for i in range(start, stop))
+        progress.step(stop - start, msg)
+
+
+def _write_aligned(f, df, progress, msg):
+    """
+    Texto alineado idéntico a DataFrame.to_string(index=False, justify='left'): cada
+    columna se formatea una sola vez, sus valores se justifican a la derecha entre sí
+    y la columna completa a la izquierda bajo su cabecera (las numéricas llevan un
+    espacio inicial en la cabecera, como en pandas). Las filas se escriben por bloques.
+    """
+    if df.empty:
+        f.write(df.to_string(index=False, justify='left', float_format=_float_4))
+        return
+    cols, heads = [], []
+    for c in df.columns:
+        values, numeric = _format_column(df[c], na_rep="NaN")
+        head = (" " if numeric else "") + str(c)
+        inner = max(len(v) for v in values)
+        width = max(len(head), inner)
+        cols.append([v.rjust(inner).ljust(width) for v in values])
+        heads.append(head.ljust(width))
+    f.write(" ".join(heads))
+    for start in range(0, len(df), CHUNK_ROWS):
+        stop = min(start + CHUNK_ROWS, len(df))
+        f.writelines("\n" + " ".join(col[i] for col in cols) for i in range(start, stop))
+        progress.step(stop - start, msg)
+
+
+def _export_per_file(target_dir, tables, fmt, progress):
+    ext = ".tsv" if fmt == "tsv" else ".txt"
+    for key, sample, df, footer in tables:
+        fname = key + (f"_{safe_name(sample)}" if sample is not None else "") + ext
+        msg = f"Escribiendo {fname}"
+        with open(os.path.join(target_dir, fname), 'w', encoding='utf-8') as f:
+            # Igual que la exportación original: Ωλ y osciladores con tabuladores, el resto alineado
+            if fmt == "txt" and key in ("Radiative_Props", "Cross_Sections"):
+                _write_aligned(f, df, progress, msg)
+            else:
+                _write_delimited(f, df, '\t', progress, msg)
+            if footer:
+                f.write("\n" + "\n".join(footer) + "\n")
+
+
+def _export_consolidated_csv(target_dir, tables, progress):
+    all_cols = []
+    for _, _, df, _ in tables:
+        all_cols += [c for c in df.columns if c not in all_cols]
+    with open(os.path.join(target_dir, "FROPA_Results.csv"), 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["Tabla", "Tabla_Muestra"] + all_cols)
+        for key, sample, df, _ in tables:
+            cols = {c: _format_column(df[c])[0] for c in df.columns}
+            sample_txt = "" if sample is None else str(sample)
+            for start in range(0, len(df), CHUNK_ROWS):
+                stop = min(start + CHUNK_ROWS, len(df))
+                writer.writerows([key, sample_txt] + [cols[c][i] if c in cols else "" for c in all_cols]
+                                 for i in range(start, stop))
+                progress.step(stop - start, f"Escribiendo {key} {sample_txt}".strip())
+
+
+def _export_npz(target_dir, tables, progress):
+    """
+    Un único .npz sin objetos pickle: cada tabla se guarda como columnas
+    '<tabla>/c<j>' más '<tabla>/__columns__' con los nombres originales.
+    """
+    arrays = {}
+    for key, sample, df, _ in tables:
+        name = key + (f"_{safe_name(sample)}" if sample is not None else "")
+        arrays[f"{name}/__columns__"] = np.array([str(c) for c in df.columns])
+        for j, c in enumerate(df.columns):
+            col = df[c].to_numpy()
+            arrays[f"{name}/c{j}"] = col.astype(float) if col.dtype.kind in 'fiu' else col.astype(str)
+        progress.step(len(df), f"Empaquetando {name}")
+    np.savez_compressed(os.path.join(target_dir, "FROPA_Results.npz"), **arrays)
+
+
+def load_npz_tables(path):
+    """Reconstruye los DataFrames de un paquete exportado con formato 'npz'."""
+    tables = {}
+    with np.load(path, allow_pickle=False) as data:
+        for k in data.files:
+            if not k.endswith("/__columns__"): continue
+            name = k[:-len("/__columns__")]
+            cols = data[k].tolist()
+            tables[name] = pd.DataFrame({c: data[f"{name}/c{j}"] for j, c in enumerate(cols)})
+    return tables
+
+
+def export_results(target_dir, jo, rad=None, cs=None, fmt="txt", progress_cb=None, cancel_event=None):
+    """
+    Exporta los resultados en el formato indicado (ver EXPORT_FORMATS).
+    jo, rad, cs: salida clásica de run_full_analysis, o un ResultSet en jo.
+    progress_cb(hechas, total, mensaje) se invoca tras cada bloque de filas.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Formato de exportación desconocido: {fmt}")
+    tables = build_export_tables(jo, rad, cs)
+    progress = _Progress(sum(len(df) for _, _, df, _ in tables), progress_cb, cancel_event)
+    if fmt in ("txt", "tsv"):
+        _export_per_file(target_dir, tables, fmt, progress)
+    elif fmt == "csv":
+        _export_consolidated_csv(target_dir, tables, progress)
+    else:
+        _export_npz(target_dir, tables, progress)
@@ -0,0 +1,129 @@
+"""
+Registro de iones lantánidos trivalentes.
+
+Para cada ion se guarda su término fundamental (y por tanto J del fundamental,
+que entra en 2J+1 de S_ed y f_cal), la lista de niveles habituales (orden de los
+niveles en rate_equations) y, si se distribuye con el programa, el archivo de
+elementos de matriz de emisión en data_original. Los slugs
+('4I15/2', '3H4') y nombres bonitos ('⁴I₁₅/₂', '³H₄') de todos los términos
+²ˢ⁺¹L_J posibles se precalculan una vez al importar el módulo en tablas
+indexadas por (2S+1, L, 2J), de modo que una matriz de emisión completa se
+nombra con una sola indexación, aunque mezcle iones.
+"""
+from collections import namedtuple
+import numpy as np
+
+L_LETTERS = "SPDFGHIKLMNOQ"
+MAX_MULT, MAX_L, MAX_TWO_J = 8, len(L_LETTERS) - 1, 40
+
+_SUP = str.maketrans("0123456789", "⁰¹²³⁴⁵⁶⁷⁸⁹")
+_SUB = str.maketrans("0123456789", "₀₁₂₃₄₅₆₇₈₉")
+
+Ion = namedtuple("Ion", ["symbol", "name", "ground", "ground_J", "levels", "em_matrix"])
+
+
+def _slug(mult, L, two_J):
+    J_txt = f"{two_J}/2" if two_J % 2 else f"{two_J // 2}"
+    return f"{mult}{L_LETTERS[L]}{J_txt}"
+
+
+def _pretty(mult, L, two_J):
+    J_txt = f"{str(two_J).translate(_SUB)}/₂" if two_J % 2 else str(two_J // 2).translate(_SUB)
+    return f"{str(mult).translate(_SUP)}{L_LETTERS[L]}{J_txt}"
+
+
+# Tablas precalculadas [2S+1, L, 2J] -> texto
+_M, _L, _J = np.meshgrid(np.arange(MAX_MULT + 1), np.arange(MAX_L + 1), np.arange(MAX_TWO_J + 1), indexing='ij')
+SLUG_TABLE = np.array([_slug(m, l, j) for m, l, j in zip(_M.ravel(), _L.ravel(), _J.ravel())],
+                      dtype=object).reshape(_M.shape)
+PRETTY_TABLE = np.array([_pretty(m, l, j) for m, l, j in zip(_M.ravel(), _L.ravel(), _J.ravel())],
+                        dtype=object).reshape(_M.shape)
+# Mapeos slug <-> nombre bonito para todos los términos (multiplicidad >= 1)
+PRETTY_OF_SLUG = dict(zip(SLUG_TABLE[1:].ravel(), PRETTY_TABLE[1:].ravel()))
+SLUG_OF_PRETTY = {v: k for k, v in PRETTY_OF_SLUG.items()}
+
+
+def _indices(J, L, S):
+    mult = np.rint(2 * np.asarray(S, dtype=float) + 1).astype(int)
+    L_int = np.rint(np.asarray(L, dtype=float)).astype(int)
+    two_J = np.rint(2 * np.asarray(J, dtype=float)).astype(int)
+    if (np.any((mult < 1) | (mult > MAX_MULT)) or np.any((L_int < 0) | (L_int > MAX_L))
+            or np.any((two_J < 0) | (two_J > MAX_TWO_J))):
+        raise ValueError("Números cuánticos fuera del rango del registro de términos.")
+    return mult, L_int, two_J
+
+
+def level_slugs(J, L, S):
+    """Slugs de arrays de (J, L, S) en una sola indexación (p. ej. 7.5, 6, 1.5 -> '4I15/2')."""
+    return SLUG_TABLE[_indices(J, L, S)]
+
+
+def level_pretty_names(J, L, S):
+    return PRETTY_TABLE[_indices(J, L, S)]
+
+
+def pretty_name(slug):
+    """Nombre bonito de un slug; si no es un término reconocible se devuelve tal cual."""
+    return PRETTY_OF_SLUG.get(slug, slug)
+
+
+def slug_from_pretty(pretty):
+    return SLUG_OF_PRETTY.get(pretty)
+
+
+def parse_slug(slug):
+    """'4I15/2' -> (J, L, S) = (7.5, 6, 1.5)."""
+    mult, letter, J_txt = int(slug[0]), slug[1], slug[2:]
+    J = int(J_txt[:-2]) / 2 if J_txt.endswith("/2") else float(J_txt)
+    return J, L_LETTERS.index(letter), (mult - 1) / 2
+
+
+def _ion(symbol, name, ground, levels, em_matrix=None):
+    return Ion(symbol, name, ground, parse_slug(ground)[0], tuple([ground] + list(levels)), em_matrix)
+
+
+# Niveles habituales (fundamental primero), en orden aproximado de energía
+IONS = {ion.symbol: ion for ion in [
+    _ion("Pr", "Pr³⁺", "3H4", ["3H5", "3H6", "3F2", "3F3", "3F4", "1G4", "1D2", "3P0", "3P1", "1I6", "3P2"]),
+    _ion("Nd", "Nd³⁺", "4I9/2", ["4I11/2", "4I13/2", "4I15/2", "4F3/2", "4F5/2", "2H9/2", "4F7/2", "4S3/2",
+                                "4F9/2", "2H11/2", "4G5/2", "2G7/2", "4G7/2", "4G9/2", "2K13/2", "2G9/2", "4D3/2"]),
+    _ion("Sm", "Sm³⁺", "6H5/2", ["6H7/2", "6H9/2", "6H11/2", "6H13/2", "6F1/2", "6F3/2", "6F5/2", "6F7/2",
+                                "6F9/2", "6F11/2", "4G5/2", "4F3/2", "4G7/2", "4I9/2", "6P5/2", "6P3/2"]),
+    _ion("Eu", "Eu³⁺", "7F0", ["7F1", "7F2", "7F3", "7F4", "7F5", "7F6", "5D0", "5D1", "5D2", "5D3", "5L6"]),
+    _ion("Tb", "Tb³⁺", "7F6", ["7F5", "7F4", "7F3", "7F2", "7F1", "7F0", "5D4", "5D3", "5G6", "5L10"]),
+    _ion("Dy", "Dy³⁺", "6H15/2", ["6H13/2", "6H11/2", "6F11/2", "6H9/2", "6F9/2", "6H7/2", "6F7/2", "6H5/2",
+                                  "6F5/2", "6F3/2", "4F9/2", "4I15/2", "4G11/2", "4M21/2", "4K17/2", "6P7/2"]),
+    _ion("Ho", "Ho³⁺", "5I8", ["5I7", "5I6", "5I5", "5I4", "5F5", "5S2", "5F4", "5F3", "5F2", "3K8", "5G6", "5F1", "5G5"]),
+    _ion("Er", "Er³⁺", "4I15/2", ["4I13/2", "4I11/2", "4I9/2", "4F9/2", "4S3/2", "2H11/2", "4F7/2", "4F5/2",
+                                  "4F3/2", "2H9/2", "4G11/2", "4G9/2", "2K15/2", "2G7/2"], "EmMatrixElements_Er.txt"),
+    _ion("Tm", "Tm³⁺", "3H6", ["3F4", "3H5", "3H4", "3F3", "3F2", "1G4", "1D2", "1I6", "3P0", "3P1", "3P2"]),
+    _ion("Yb", "Yb³⁺", "2F7/2", ["2F5/2"]),
+]}
+DEFAULT_ION = "Er"
+
+
+def get_ion(symbol):
+    """Ion del registro por símbolo ('Er', 'Nd', ...). Acepta también un Ion ya resuelto."""
+    if isinstance(symbol, Ion):
+        return symbol
+    try:
+        return IONS[symbol or DEFAULT_ION]
+    except KeyError:
+        raise ValueError(f"Ion desconocido: {symbol}. Disponibles: {', '.join(IONS)}")
+
+
+def ion_for_sample(ion, s_name):
+    """ion puede ser un símbolo común o un dict {muestra: símbolo} (lotes con iones mezclados)."""
+    if isinstance(ion, dict):
+        return get_ion(ion.get(s_name, DEFAULT_ION))
+    return get_ion(ion)
+
+
+def check_emission_matrix(em_df, ion):
+    """
+    Comprueba que una matriz de emisión corresponde al ion: su fundamental debe
+    aparecer como nivel final y nunca como nivel inicial.
+    """
+    ion = get_ion(ion)
+    if ion.ground not in set(em_df['Final_Name_Slug']) or ion.ground in set(em_df['Initial_Name_Slug']):
+        raise ValueError(f"La matriz de emisión no corresponde a {ion.name} (fundamental {pretty_name(ion.ground)}).")
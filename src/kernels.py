@@ -0,0 +1,269 @@
+"""
+Núcleos de cálculo intercambiables.
+
+Los bucles internos de physics_core (suma de Sellmeier, A_ed/A_md fila a fila
+con S_md, integrales trapezoidales) se despachan a un backend elegido en tiempo
+de ejecución:
+
+* 'numpy': implementación de referencia, siempre disponible.
+* 'numba': los mismos núcleos compilados JIT y fusionados (n(λ), S_md y A en
+  una sola pasada por fila). Solo se registra si numba está instalado.
+
+El backend se elige con set_backend() o la variable de entorno FROPA_BACKEND.
+En ambos casos, antes de activar un backend distinto del de referencia se
+ejecuta self_check(), que compara ambos sobre datos aleatorios y mide la
+aceleración; con FROPA_BACKEND, si no lo supera se avisa y se sigue con numpy.
+
+Uso:  python -m src.kernels   (informe del auto-chequeo)
+"""
+import os
+import time
+import warnings
+from types import SimpleNamespace
+import numpy as np
+from .constants import H, C, M, E, PI
+
+MU_B_SQ = ((E * H) / (4 * PI * M * C))**2
+A_CONST = 64 * PI**4 / (3 * H)
+SELF_CHECK_RTOL = 1e-12
+
+BACKENDS = {}
+_active = {"name": "numpy"}
+
+
+def split_sellmeier(coeffs_list, model_type):
+    """(base, B[], C[]) a partir de la lista de coeficientes según el modelo de Sellmeier."""
+    from .utils import SELLMEIER_MODEL_1
+    coeffs = np.asarray(coeffs_list, dtype=float)
+    base, loop = (1.0, coeffs) if model_type == SELLMEIER_MODEL_1 else (coeffs[0], coeffs[1:])
+    return float(base), np.ascontiguousarray(loop[0::2]), np.ascontiguousarray(loop[1::2])
+
+
+# ---------------------------------------------------------------------------
+# Backend de referencia (NumPy)
+# ---------------------------------------------------------------------------
+
+def _np_sellmeier_n(wl_nm, base, B, Cc):
+    wl = np.asarray(wl_nm, dtype=float)
+    sum_term = 0.0
+    # Mismo orden de suma que el bucle original, término a término
+    for b, c in zip(B, Cc):
+        sum_term = sum_term + b / (1 - c / wl**2)
+    return np.sqrt(base + sum_term)
+
+
+def _np_smd_rows(J1, L1, S1, J2, L2, S2):
+    """S_md de muchas filas a la vez; mismas reglas de selección que physics_core.SMD."""
+    J1, L1, S1, J2, L2, S2 = (np.asarray(a, dtype=float) for a in (J1, L1, S1, J2, L2, S2))
+    allowed = (S1 == S2) & (L1 == L2) & ~((J1 == 0) & (J2 == 0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        g = 1 + (J1*(J1+1) + S1*(S1+1) - L1*(L1+1)) / (2*J1*(J1+1))
+        same = np.where(J1 == 0, 0.0, g**2 * J1 * (J1+1) * (2*J1+1))
+        down = ((S1+L1+1)**2 - J1**2) * (J1**2 - (L1-S1)**2) / (4*J1)
+        up = ((S1+L1+1)**2 - (J1+1)**2) * ((J1+1)**2 - (L1-S1)**2) / (4*(J1+1))
+    elem = np.select([J2 == J1, J2 == J1 - 1, J2 == J1 + 1], [same, down, up], 0.0)
+    return np.where(allowed, MU_B_SQ * elem, 0.0)
+
+
+def _np_radiative_rows(nu, J1, L1, S1, J2, L2, S2, U, omegas, base, B, Cc):
+    """
+    A_ed y A_md de cada fila J -> J' de la matriz de emisión (s⁻¹).
+    Mismas operaciones, en el mismo orden, que el bucle original por fila.
+    """
+    nu = np.asarray(nu, dtype=float)
+    n = _np_sellmeier_n(1e7 / nu, base, B, Cc)
+    t_const = (64*PI**4*nu**3)/(3*H*(2*np.asarray(J1, dtype=float)+1))
+    U = np.asarray(U, dtype=float)
+    S_ed = E**2 * (omegas[0]*U[:, 0] + omegas[1]*U[:, 1] + omegas[2]*U[:, 2])
+    A_ed = (t_const*((n*(n**2+2)**2)/9))*S_ed
+    A_md = t_const*(n**3)*_np_smd_rows(J1, L1, S1, J2, L2, S2)
+    return A_ed, A_md
+
+
+def _np_trapz(y, x):
+    return np.trapz(y, x=x)
+
+
+BACKENDS["numpy"] = SimpleNamespace(name="numpy", sellmeier_n=_np_sellmeier_n, smd_rows=_np_smd_rows,
+                                    radiative_rows=_np_radiative_rows, trapz=_np_trapz)
+
+
+# ---------------------------------------------------------------------------
+# Backend JIT opcional (Numba)
+# ---------------------------------------------------------------------------
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+if numba is not None:
+    @numba.njit(cache=True)
+    def _nb_n_scalar(wl, base, B, Cc):
+        s = 0.0
+        for k in range(B.shape[0]):
+            s += B[k] / (1 - Cc[k] / wl**2)
+        return np.sqrt(base + s)
+
+    @numba.njit(cache=True)
+    def _nb_sellmeier_n_1d(wl, base, B, Cc):
+        out = np.empty(wl.shape[0])
+        for i in range(wl.shape[0]):
+            out[i] = _nb_n_scalar(wl[i], base, B, Cc)
+        return out
+
+    @numba.njit(cache=True)
+    def _nb_smd_scalar(J1, L1, S1, J2, L2, S2):
+        if S1 != S2 or L1 != L2 or (J1 == 0 and J2 == 0):
+            return 0.0
+        if J2 == J1:
+            if J1 == 0:
+                return 0.0
+            g = 1 + (J1*(J1+1) + S1*(S1+1) - L1*(L1+1)) / (2*J1*(J1+1))
+            elem = g**2 * J1 * (J1+1) * (2*J1+1)
+        elif J2 == J1 - 1:
+            elem = ((S1+L1+1)**2 - J1**2) * (J1**2 - (L1-S1)**2) / (4*J1)
+        elif J2 == J1 + 1:
+            elem = ((S1+L1+1)**2 - (J1+1)**2) * ((J1+1)**2 - (L1-S1)**2) / (4*(J1+1))
+        else:
+            return 0.0
+        return MU_B_SQ * elem
+
+    @numba.njit(cache=True)
+    def _nb_smd_rows_1d(J1, L1, S1, J2, L2, S2):
+        out = np.empty(J1.shape[0])
+        for i in range(J1.shape[0]):
+            out[i] = _nb_smd_scalar(J1[i], L1[i], S1[i], J2[i], L2[i], S2[i])
+        return out
+
+    @numba.njit(cache=True)
+    def _nb_radiative_rows_1d(nu, J1, L1, S1, J2, L2, S2, U, omegas, base, B, Cc):
+        # Núcleo fusionado: n(λ), S_ed, S_md y A en una sola pasada por fila
+        R = nu.shape[0]
+        A_ed, A_md = np.empty(R), np.empty(R)
+        for i in range(R):
+            n = _nb_n_scalar(1e7 / nu[i], base, B, Cc)
+            t_const = (64*PI**4*nu[i]**3)/(3*H*(2*J1[i]+1))
+            S_ed = E**2 * (omegas[0]*U[i, 0] + omegas[1]*U[i, 1] + omegas[2]*U[i, 2])
+            A_ed[i] = (t_const*((n*(n**2+2)**2)/9))*S_ed
+            A_md[i] = t_const*(n**3)*_nb_smd_scalar(J1[i], L1[i], S1[i], J2[i], L2[i], S2[i])
+        return A_ed, A_md
+
+    @numba.njit(cache=True)
+    def _nb_trapz_1d(y, x):
+        s = 0.0
+        for i in range(1, y.shape[0]):
+            s += (x[i] - x[i-1]) * (y[i] + y[i-1]) / 2.0
+        return s
+
+    def _f64(a):
+        return np.ascontiguousarray(a, dtype=np.float64)
+
+    def _nb_sellmeier_n(wl_nm, base, B, Cc):
+        wl = _f64(wl_nm)
+        return _nb_sellmeier_n_1d(wl.ravel(), float(base), _f64(B), _f64(Cc)).reshape(wl.shape)
+
+    def _nb_smd_rows(J1, L1, S1, J2, L2, S2):
+        return _nb_smd_rows_1d(*(_f64(a).ravel() for a in (J1, L1, S1, J2, L2, S2)))
+
+    def _nb_radiative_rows(nu, J1, L1, S1, J2, L2, S2, U, omegas, base, B, Cc):
+        return _nb_radiative_rows_1d(*(_f64(a).ravel() for a in (nu, J1, L1, S1, J2, L2, S2)),
+                                     _f64(U).reshape(-1, 3), _f64(omegas), float(base), _f64(B), _f64(Cc))
+
+    def _nb_trapz(y, x):
+        return _nb_trapz_1d(_f64(y), _f64(x))
+
+    BACKENDS["numba"] = SimpleNamespace(name="numba", sellmeier_n=_nb_sellmeier_n, smd_rows=_nb_smd_rows,
+                                        radiative_rows=_nb_radiative_rows, trapz=_nb_trapz)
+
+
+# ---------------------------------------------------------------------------
+# Selección y auto-chequeo
+# ---------------------------------------------------------------------------
+
+def available_backends():
+    return list(BACKENDS)
+
+
+def get_backend():
+    """Backend activo (espacio de nombres con sellmeier_n, smd_rows, radiative_rows y trapz)."""
+    return BACKENDS[_active["name"]]
+
+
+def _random_inputs(n_rows, n_points, seed=0):
+    rng = np.random.default_rng(seed)
+    J1 = rng.integers(1, 16, n_rows) / 2
+    L = rng.integers(0, 7, n_rows).astype(float)
+    S = rng.integers(1, 4, n_rows) / 2
+    J2 = J1 + rng.integers(-2, 2, n_rows)
+    same = rng.random(n_rows) < 0.5
+    rows = (rng.uniform(2000, 25000, n_rows), J1, L, S, np.abs(J2), np.where(same, L, L + 1), S,
+            rng.uniform(0, 1.5, (n_rows, 3)), np.array([5e-20, 1.5e-20, 1e-20]), 1.0,
+            np.array([2.15, 2.6]), np.array([109667.9, -115084.3]))
+    wl = np.sort(rng.uniform(400, 2000, n_points))
+    return rows, wl, rng.random(n_points)
+
+
+def self_check(n_rows=20000, n_points=200000, repeats=3, rtol=SELF_CHECK_RTOL):
+    """
+    Compara cada backend con el de referencia sobre datos aleatorios y mide tiempos.
+    Devuelve {backend: {'max_rel': error relativo máximo, 'speedup': t_numpy/t_backend, 'ok': bool}}.
+    """
+    rows, wl, y = _random_inputs(n_rows, n_points)
+    ref = BACKENDS["numpy"]
+
+    def run(be):
+        return (be.radiative_rows(*rows), be.sellmeier_n(wl, rows[9], rows[10], rows[11]),
+                be.smd_rows(*rows[1:7]), be.trapz(y, wl))
+
+    def timed(be):
+        run(be)   # calentamiento (compilación JIT)
+        t0 = time.perf_counter()
+        for _ in range(repeats): out = run(be)
+        return out, (time.perf_counter() - t0) / repeats
+
+    ref_out, t_ref = timed(ref)
+    ref_flat = np.concatenate([np.ravel(a) for a in (*ref_out[0], *ref_out[1:])])
+    report = {}
+    for name, be in BACKENDS.items():
+        out, t = timed(be) if name != "numpy" else (ref_out, t_ref)
+        flat = np.concatenate([np.ravel(a) for a in (*out[0], *out[1:])])
+        scale = np.maximum(np.abs(ref_flat), np.finfo(float).tiny)
+        max_rel = float(np.max(np.abs(flat - ref_flat) / scale))
+        report[name] = {"max_rel": max_rel, "speedup": t_ref / t if t > 0 else np.inf, "ok": max_rel <= rtol}
+    return report
+
+
+def set_backend(name, check=True):
+    """Activa un backend. Los backends distintos de 'numpy' deben pasar self_check() primero."""
+    if name not in BACKENDS:
+        raise ValueError(f"Backend no disponible: {name}. Disponibles: {', '.join(BACKENDS)}")
+    if check and name != "numpy":
+        result = self_check(n_rows=2000, n_points=20000, repeats=1)[name]
+        if not result["ok"]:
+            raise ValueError(f"El backend '{name}' no coincide con el de referencia (error relativo {result['max_rel']:.2e}).")
+    _active["name"] = name
+    return BACKENDS[name]
+
+
+def _backend_from_env():
+    """
+    Backend pedido en FROPA_BACKEND, también verificado con self_check() (los procesos
+    del pool vuelven a importar el módulo). Si no lo supera se sigue con 'numpy'.
+    """
+    name = os.environ.get("FROPA_BACKEND")
+    if name not in BACKENDS or name == "numpy":
+        return
+    try:
+        set_backend(name)
+    except ValueError as e:
+        warnings.warn(f"FROPA_BACKEND={name} no se activa: {e} Se usa 'numpy'.", RuntimeWarning)
+
+
+_backend_from_env()
+
+
+if __name__ == "__main__":
+    print(f"Backends disponibles: {', '.join(available_backends())} (activo: {_active['name']})")
+    for name, r in self_check().items():
+        print(f"{name:>6}: error relativo máx. {r['max_rel']:.2e}  aceleración x{r['speedup']:.1f}  {'OK' if r['ok'] else 'FALLO'}")
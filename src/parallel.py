@@ -0,0 +1,114 @@
+"""
+Ejecución del bucle por muestra en un pool de procesos.
+
+Los arrays comunes a todas las muestras (longitudes de onda, f_exp, matriz U²
+de absorción y la parte numérica de la matriz de emisión) se copian una sola vez
+a memoria compartida; cada proceso se conecta a ellos al arrancar y las tareas
+solo transportan el índice de la muestra, su nombre y sus coeficientes de
+Sellmeier. Los resultados se devuelven en el orden original de las muestras.
+
+El pool siempre arranca sus procesos con 'spawn' (el único método disponible en
+Windows), así que el comportamiento es el mismo en Linux, macOS y Windows; el
+punto de entrada del ejecutable congelado llama a multiprocessing.freeze_support().
+"""
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context, shared_memory
+
+# Estado de cada proceso del pool (se rellena en _init_worker)
+_WORKER = {}
+
+
+def _to_shared(arrays):
+    """Copia cada array a un bloque de memoria compartida. Devuelve (bloques, descriptores)."""
+    blocks, specs = [], {}
+    for key, arr in arrays.items():
+        arr = np.ascontiguousarray(arr)
+        shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+        np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+        blocks.append(shm)
+        specs[key] = (shm.name, arr.shape, arr.dtype.str)
+    return blocks, specs
+
+
+def _from_shared(specs):
+    """Vistas (solo lectura) sobre los bloques compartidos. Los bloques se guardan para que no se liberen."""
+    views, blocks = {}, []
+    for key, (name, shape, dtype) in specs.items():
+        shm = shared_memory.SharedMemory(name=name)
+        view = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+        view.flags.writeable = False
+        views[key] = view
+        blocks.append(shm)
+    return views, blocks
+
+
+def _init_worker(specs, band_labels, em_columns, em_text, sm, do_rad_calc, sel_trans_rad, user_bands, ion, backend, columnar, covariance):
+    from .kernels import set_backend
+    # Mismo backend de núcleos que el proceso principal (ya verificado allí)
+    set_backend(backend, check=False)
+    views, blocks = _from_shared(specs)
+    em_mx = None
+    if em_columns:
+        # Se reconstruye la matriz de emisión una vez por proceso, con columnas y tipos originales
+        em_mx = pd.DataFrame({c: np.array(views[f'em:{c}']) if c in em_columns['num'] else em_text[c]
+                              for c in em_columns['all']})
+    _WORKER.update(views=views, blocks=blocks, band_labels=band_labels, em_mx=em_mx, sm=sm,
+                   do_rad_calc=do_rad_calc, sel_trans_rad=sel_trans_rad, user_bands=user_bands, ion=ion,
+                   columnar=columnar, covariance=covariance)
+
+
+def _run_task(task):
+    from .physics_core import analyze_sample
+    from .ions import ion_for_sample
+    i, s_name, coeffs, has_em = task
+    w, v = _WORKER, _WORKER['views']
+    return analyze_sample(i, s_name, coeffs, np.array(v['wl']), np.array(v['f_exp'][:, i]), np.array(v['abs_mx']),
+                          w['band_labels'], w['em_mx'], w['sm'], w['do_rad_calc'], w['sel_trans_rad'],
+                          w['user_bands'] if has_em else None, ion_for_sample(w['ion'], s_name).ground_J, w['columnar'],
+                          w['covariance'])
+
+
+def analyze_samples_parallel(tasks, wl, f_exp, abs_mx, band_labels, em_mx, sm,
+                             do_rad_calc, sel_trans_rad, user_bands, n_workers=None, ion=None, columnar=False,
+                             covariance=False):
+    """
+    Equivalente en paralelo de aplicar physics_core.analyze_sample a cada tarea
+    (i, s_name, coeffs, em_f). Devuelve la lista de salidas en el orden de tasks
+    (en formato columnar si columnar=True).
+    """
+    return list(iter_samples_parallel(tasks, wl, f_exp, abs_mx, band_labels, em_mx, sm,
+                                      do_rad_calc, sel_trans_rad, user_bands, n_workers, ion, columnar, covariance))
+
+
+def iter_samples_parallel(tasks, wl, f_exp, abs_mx, band_labels, em_mx, sm,
+                          do_rad_calc, sel_trans_rad, user_bands, n_workers=None, ion=None, columnar=False,
+                          covariance=False):
+    """
+    Como analyze_samples_parallel, pero entrega cada salida (en el orden de tasks) en
+    cuanto está lista; la memoria compartida se libera al agotar o cerrar el generador.
+    """
+    from .kernels import get_backend
+    n_workers = min(n_workers or os.cpu_count() or 1, len(tasks))
+    arrays = {'wl': np.asarray(wl, dtype=float), 'f_exp': np.asarray(f_exp, dtype=float),
+              'abs_mx': np.asarray(abs_mx, dtype=float)}
+    em_columns, em_text = {}, {}
+    if em_mx is not None:
+        num_cols = [c for c in em_mx.columns if em_mx[c].dtype.kind in 'fiu']
+        arrays.update({f'em:{c}': em_mx[c].to_numpy() for c in num_cols})
+        em_columns = {'num': num_cols, 'all': list(em_mx.columns)}
+        em_text = {c: em_mx[c].tolist() for c in em_mx.columns if c not in num_cols}
+
+    blocks, specs = _to_shared(arrays)
+    try:
+        with ProcessPoolExecutor(max_workers=n_workers, mp_context=get_context("spawn"), initializer=_init_worker,
+                                 initargs=(specs, band_labels, em_columns, em_text, sm,
+                                           do_rad_calc, sel_trans_rad, user_bands, ion, get_backend().name, columnar, covariance)) as pool:
+            work = [(i, s_name, coeffs, em_f is not None) for i, s_name, coeffs, em_f in tasks]
+            yield from pool.map(_run_task, work, chunksize=max(1, len(work) // (4 * n_workers)))
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
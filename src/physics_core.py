@@ -1,55 +1,39 @@
 import numpy as np
 import pandas as pd
 import os
+import warnings
 from .constants import H, C, M, PI, J_GROUND_ER
 
+def _emission_rows(omegas, coeffs, em_df, sm):
+    """A_ed y A_md de cada fila J -> J' de em_df con el backend de núcleos activo."""
+    from .kernels import get_backend, split_sellmeier
+    cols = ['wavenumber_cm_1', 'J_initial', 'L_initial', 'S_initial', 'J_final', 'L_final', 'S_final']
+    args = [em_df[c].to_numpy(dtype=float) for c in cols]
+    U = em_df[['U2', 'U4', 'U6']].to_numpy(dtype=float)
+    return get_backend().radiative_rows(*args, U, np.asarray(omegas, dtype=float), *split_sellmeier(coeffs, sm))
+
 def _calculate_A_rad_specific(initial_slug, final_slug, omegas, coeffs, em_df, sm):
     """
     Función interna para calcular A(J->J') para UNA SOLA transición específica bajo demanda.
     """
-    from .constants import H, E, PI
-    
     # Encuentra todas las contribuciones J-J' para la transición de nivel a nivel
     trans_group = em_df[(em_df['Initial_Name_Slug'] == initial_slug) & (em_df['Final_Name_Slug'] == final_slug)]
     if trans_group.empty:
         return 0
 
-    A_ed_total, A_md_total = 0, 0
-    J_init = trans_group['J_initial'].iloc[0]
-
-    for _, row in trans_group.iterrows():
-        nu, U_sq = row['wavenumber_cm_1'], row[['U2', 'U4', 'U6']].to_numpy()
-        n = calculate_refractive_index(1e7 / nu, coeffs, sm)
-        t_const = (64 * PI**4 * nu**3) / (3 * H * (2 * J_init + 1))
-        
-        S_ed = E**2 * np.sum(omegas * U_sq)
-        A_ed_total += (t_const * ((n * (n**2 + 2)**2) / 9)) * S_ed
-        
-        # S_md = SMD(row['J_initial'], row['L_initial'], row['S_initial'],
-        #            row['J_final'], row['L_final'], row['S_final'], nu)
-        S_md = SMD(row['J_initial'], row['L_initial'], row['S_initial'],
-                   row['J_final'], row['L_final'], row['S_final'])
-        A_md_total += t_const * (n**3) * S_md
-        
-    return A_ed_total + A_md_total
+    A_ed, A_md = _emission_rows(omegas, coeffs, trans_group, sm)
+    # Acumulación fila a fila, en el mismo orden que el bucle original
+    return sum(A_ed.tolist(), 0) + sum(A_md.tolist(), 0)
 
 def calculate_refractive_index(wavelength_nm, coeffs_list, model_type):
-    from .utils import SELLMEIER_MODEL_1
+    from .kernels import get_backend, split_sellmeier
     is_scalar, wl_arr = np.isscalar(wavelength_nm), np.atleast_1d(wavelength_nm)
-    sum_term = 0.0
-    if model_type == SELLMEIER_MODEL_1:
-        base, loop_coeffs = 1.0, coeffs_list
-    else:
-        base, loop_coeffs = coeffs_list[0], coeffs_list[1:]
-    for i in range(0, len(loop_coeffs), 2):
-        B, C = loop_coeffs[i], loop_coeffs[i + 1]
-        sum_term += B / (1 - C / wl_arr**2)
-    result = np.sqrt(base + sum_term)
+    result = get_backend().sellmeier_n(wl_arr, *split_sellmeier(coeffs_list, model_type))
     return result[0] if is_scalar else result
 
-def calculate_S_ed_exp(wavelengths, f_exp, n_values):
+def calculate_S_ed_exp(wavelengths, f_exp, n_values, J_ground=J_GROUND_ER):
     from .constants import H, C, M, PI
-    J_ground = 15/2; wl_cm = np.array(wavelengths) * 1e-7
+    wl_cm = np.array(wavelengths) * 1e-7
     num = 3*H*wl_cm*(2*J_ground+1)*9*np.array(n_values)*np.array(f_exp)
     den = 8*PI**2*M*C*(np.array(n_values)**2+2)**2
     with np.errstate(divide='ignore', invalid='ignore'): S_ed = num/den
@@ -60,18 +44,25 @@ def calculate_S_ed_exp(wavelengths, f_exp, n_values):
 #     rms = np.sqrt(np.sum((S_ed_exp - np.dot(abs_matrix_elements, omegas))**2) / (len(S_ed_exp) - 3))
 #     return omegas, rms
 
-def perform_jo_fit(S_ed_exp, abs_matrix_elements, wavelengths_nm, n_values):
+def perform_jo_fit(S_ed_exp, abs_matrix_elements, wavelengths_nm, n_values, J_ground=J_GROUND_ER, full=False):
+    """
+    Ajuste por mínimos cuadrados de Ω2, Ω4, Ω6. Devuelve (Ω, rms_S, f_cal); con full=True
+    añade (residuos S_ed, UᵀU) para obtener Cov(Ω) sin repetir el ajuste (ver uncertainty).
+    """
     omegas, _, _, _ = np.linalg.lstsq(abs_matrix_elements, S_ed_exp, rcond=None)
     S_ed_calc = np.dot(abs_matrix_elements, omegas)
     
     wl_cm = wavelengths_nm * 1e-7
     num_f = 8 * PI**2 * M * C * (n_values**2 + 2)**2
-    den_f = 3 * H * wl_cm * (2 * J_GROUND_ER + 1) * 9 * n_values
+    den_f = 3 * H * wl_cm * (2 * J_ground + 1) * 9 * n_values
     f_cal = S_ed_calc * (num_f / den_f)
     
     # Calculamos ambos RMS aquí
     rms_S = np.sqrt(np.sum((S_ed_exp - S_ed_calc)**2) / (len(S_ed_exp) - 3))
     
+    if full:
+        U = np.asarray(abs_matrix_elements, dtype=float)
+        return omegas, rms_S, f_cal, (S_ed_exp - S_ed_calc, U.T @ U)
     return omegas, rms_S, f_cal
 
 # def SMD(J1, L1, S1, J2, L2, S2, ν):
@@ -114,132 +105,705 @@ def SMD(J1, L1, S1, J2, L2, S2):
 
     return mu_B_sq * matrix_element_sq
 
-def calculate_radiative_properties(omegas, coeffs, em_df, sm, sel_levels):
-    from .constants import H, E, PI
-    results = []
+RAD_COLUMNS = ['SLJ', "S'L'J'", 'A_ed', 'A_md', 'A', 'β_R (%)', 'A_T (s⁻¹)', 'τ_R (ms)']
+_LAYOUT_CACHE = {}
+
+def _radiative_layout(em_df, sel_levels):
+    """
+    Filas de em_df de los niveles pedidos y su agrupación nivel -> nivel final.
+    No depende de la muestra, así que se calcula una vez por matriz de emisión.
+    """
+    key = (id(em_df), tuple(sel_levels))
+    cached = _LAYOUT_CACHE.get(key)
+    if cached is not None and cached[0] is em_df:
+        return cached[1]
+    sub = em_df[em_df['Initial_Name_Slug'].isin(sel_levels)].reset_index(drop=True)
+    groups = []
     for level_name in sel_levels:
-        trans = em_df[em_df['Initial_Name_Slug'] == level_name]
+        trans = sub[sub['Initial_Name_Slug'] == level_name]
         if trans.empty: continue
-        groups = trans.groupby('Final_Name_Slug')
+        groups.append((level_name, [(f_name, group.index.to_numpy()) for f_name, group in trans.groupby('Final_Name_Slug')]))
+    _LAYOUT_CACHE.clear()  # solo se conserva la matriz más reciente
+    _LAYOUT_CACHE[key] = (em_df, (sub, groups))
+    return sub, groups
+
+def radiative_arrays(omegas, coeffs, em_df, sm, sel_levels):
+    """
+    Propiedades radiativas como columnas (listas de slugs y arrays float), sin
+    construir DataFrames; None si no hay transiciones. Mismos valores que
+    calculate_radiative_properties.
+    """
+    sub, groups = _radiative_layout(em_df, sel_levels)
+    if sub.empty: return None
+    # Todas las filas J -> J' de los niveles pedidos en una sola llamada al núcleo
+    rows_ed, rows_md = _emission_rows(omegas, coeffs, sub, sm)
+    cols = {c: [] for c in RAD_COLUMNS}
+    for level_name, finals in groups:
         A_total, temp_calcs = 0, []
-        for f_name, group in groups:
-            A_ed, A_md = 0, 0
-            J_init = group['J_initial'].iloc[0]
-            for _, row in group.iterrows():
-                nu, U_sq = row['wavenumber_cm_1'], row[['U2', 'U4', 'U6']].to_numpy()
-                n = calculate_refractive_index(1e7/nu, coeffs, sm)
-                t_const = (64*PI**4*nu**3)/(3*H*(2*J_init+1))
-                S_ed = E**2 * np.sum(omegas * U_sq)
-                A_ed += (t_const*((n*(n**2+2)**2)/9))*S_ed
-                # S_md = SMD(row['J_initial'],row['L_initial'],row['S_initial'],row['J_final'],row['L_final'],row['S_final'],nu)
-                S_md_val = SMD(row['J_initial'],row['L_initial'],row['S_initial'],row['J_final'],row['L_final'],row['S_final'])
-                A_md += t_const*(n**3)*S_md_val
+        for f_name, idx in finals:
+            A_ed = sum(rows_ed[idx].tolist(), 0)
+            A_md = sum(rows_md[idx].tolist(), 0)
             A_trans = A_ed + A_md
-            temp_calcs.append({'SLJ': level_name, "S'L'J'": f_name, 'A_ed': A_ed, 'A_md': A_md, 'A': A_trans})
+            temp_calcs.append((f_name, A_ed, A_md, A_trans))
             A_total += A_trans
         if A_total > 0:
-            for calc in temp_calcs:
-                results.append({**calc, 'β_R (%)':(calc['A']/A_total)*100, 'A_T (s⁻¹)':A_total, 'τ_R (ms)':(1/A_total)*1000})
-    if results:
-        df = pd.DataFrame(results)
-        cols = ['SLJ', "S'L'J'", 'A_ed', 'A_md', 'A', 'β_R (%)', 'A_T (s⁻¹)', 'τ_R (ms)']
-        return df.reindex(columns=[col for col in cols if col in df.columns])
-    return pd.DataFrame()
+            for f_name, A_ed, A_md, A_trans in temp_calcs:
+                for c, v in zip(RAD_COLUMNS, (level_name, f_name, A_ed, A_md, A_trans, (A_trans/A_total)*100,
+                                              A_total, (1/A_total)*1000)):
+                    cols[c].append(v)
+    if not cols['SLJ']: return None
+    return {c: (v if c in ('SLJ', "S'L'J'") else np.array(v, dtype=float)) for c, v in cols.items()}
+
+def calculate_radiative_properties(omegas, coeffs, em_df, sm, sel_levels):
+    cols = radiative_arrays(omegas, coeffs, em_df, sm, sel_levels)
+    return pd.DataFrame(cols, columns=RAD_COLUMNS) if cols is not None else pd.DataFrame()
 
 def calculate_emission_cross_section(em_spectrum_df, band_info, A_rad, coeffs, sm):
-    from .constants import C, PI
-    band = em_spectrum_df[(em_spectrum_df['wavelength_nm']>=band_info['range_min'])&(em_spectrum_df['wavelength_nm']<=band_info['range_max'])].copy()
+    band = em_spectrum_df[(em_spectrum_df['wavelength_nm']>=band_info['range_min'])&(em_spectrum_df['wavelength_nm']<=band_info['range_max'])]
     if band.empty or len(band)<2:
         print(f"DEBUG: Rango {band_info['range_min']}-{band_info['range_max']} nm fuera del rango del espectro de emisión.")
         return None
-    
-    band['n'] = calculate_refractive_index(band['wavelength_nm'], coeffs, sm)
-    band['lambda_cm'] = band['wavelength_nm']*1e-7
-    den_int = np.trapz(band['lambda_cm']*band['intensity']*(band['n']**2), x=band['lambda_cm'])
+    wl_nm = band['wavelength_nm'].to_numpy(dtype=float)
+    n_vals = calculate_refractive_index(wl_nm, coeffs, sm)
+    return cross_section_from_arrays(wl_nm, band['intensity'].to_numpy(dtype=float), n_vals, A_rad, band_info)
+
+def cross_section_from_arrays(wl_nm, intensity, n_vals, A_rad, band_info):
+    """
+    Núcleo de Füchtbauer-Ladenburg sobre arrays ya recortados a la banda.
+    Lo usan calculate_emission_cross_section y la vista previa en vivo (que
+    reutiliza n(λ) precalculado sobre el espectro completo).
+    """
+    from .constants import C, PI
+    from .kernels import get_backend
+    if len(wl_nm) < 2: return None
+    trapz = get_backend().trapz
+    lam_cm = wl_nm*1e-7
+    den_int = trapz(lam_cm*intensity*(n_vals**2), lam_cm)
     if den_int==0: return None
-    max_idx = band['intensity'].idxmax()
-    max_I, max_lam_cm = band.loc[max_idx, 'intensity'], band.loc[max_idx, 'lambda_cm']
+    max_idx = np.argmax(intensity)
+    max_I, max_lam_cm = intensity[max_idx], lam_cm[max_idx]
     num = A_rad*(max_lam_cm**5)*max_I; den = 8*PI*C*den_int
     sigma = num/den
     if not np.isfinite(sigma): return None
-    E_exp, int_I_nm = 1/max_lam_cm, np.trapz(band['intensity'], x=band['wavelength_nm'])
+    E_exp, int_I_nm = 1/max_lam_cm, trapz(intensity, wl_nm)
     d_lam = int_I_nm/max_I if max_I>0 else 0; d_G = sigma*(d_lam*1e-7)
     return {'Level': f"{band_info['initial']} → {band_info['final']}", 'E_exp (cm⁻¹)':E_exp, 'Δλ_eff (nm)':d_lam, 'σₑ (x10⁻²¹ cm²)':sigma*1e21, 'ΔG (x10⁻²⁸ cm³)':d_G*1e28}
 
+def calculate_emission_cross_section_matrix(grid_nm, matrix, band_info, A_rad, coeffs_list, sm):
+    """
+    Füchtbauer-Ladenburg para varias muestras que comparten la malla grid_nm.
+    matrix: intensidades [muestras, λ]; A_rad: array [muestras]; coeffs_list: Sellmeier por fila.
+    Cada fila se integra sobre su propio tramo medido dentro de la banda (NaN fuera
+    de su rango en la malla común), igual que la ruta cruda con un espectro corto.
+    Devuelve una lista (una entrada por fila) de dicts como calculate_emission_cross_section,
+    con None en las filas sin al menos 2 puntos medidos en la banda o sin σₑ válida.
+    """
+    from .constants import C, PI
+    lo = np.searchsorted(grid_nm, band_info['range_min'], side='left')
+    hi = np.searchsorted(grid_nm, band_info['range_max'], side='right')
+    if hi - lo < 2:
+        return [None] * len(matrix)
+
+    wl_nm = grid_nm[lo:hi]
+    lam_cm = wl_nm*1e-7
+    I = matrix[:, lo:hi]
+    ok = ~np.isnan(I)
+    # Solo cuentan los tramos entre dos puntos medidos de la fila
+    pair = ok[:, 1:] & ok[:, :-1]
+    I = np.where(ok, I, 0.0)
+    def trapz(y, x):
+        return np.where(pair, np.diff(x) * (y[:, 1:] + y[:, :-1]) / 2.0, 0.0).sum(axis=1)
+    # n(λ) una vez por juego de coeficientes (varias filas pueden ser la misma muestra a distinto λ_ex)
+    n_of = {}
+    for coeffs in coeffs_list:
+        if id(coeffs) not in n_of: n_of[id(coeffs)] = calculate_refractive_index(wl_nm, coeffs, sm)
+    n = np.vstack([n_of[id(coeffs)] for coeffs in coeffs_list])
+    den_int = trapz(lam_cm*I*n**2, lam_cm)
+    max_idx = np.argmax(np.where(ok, I, -np.inf), axis=1)
+    rows = np.arange(len(I))
+    max_I, max_lam_cm = I[rows, max_idx], lam_cm[max_idx]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sigma = np.asarray(A_rad)*(max_lam_cm**5)*max_I/(8*PI*C*den_int)
+        d_lam = np.where(max_I > 0, trapz(I, wl_nm)/max_I, 0)
+    d_G = sigma*(d_lam*1e-7)
+
+    level = f"{band_info['initial']} → {band_info['final']}"
+    covered = ok.sum(axis=1) >= 2
+    out = []
+    for k in range(len(I)):
+        if not covered[k] or den_int[k]==0 or not np.asarray(A_rad)[k] > 0 or not np.isfinite(sigma[k]):
+            out.append(None); continue
+        out.append({'Level': level, 'E_exp (cm⁻¹)':1/max_lam_cm[k], 'Δλ_eff (nm)':d_lam[k],
+                    'σₑ (x10⁻²¹ cm²)':sigma[k]*1e21, 'ΔG (x10⁻²⁸ cm³)':d_G[k]*1e28})
+    return out
+
+def emission_cross_section_spectrum(grid_nm, matrix, band_info, A_rad, coeffs_list, sm):
+    """
+    σₑ(λ) completo por Füchtbauer-Ladenburg (cm²) para varias muestras sobre una malla común:
+    σₑ(λ) = A·λ⁵·I(λ) / (8πc ∫ λ·I·n² dλ); en el máximo de I(λ) reproduce el σₑ de pico.
+    Devuelve (λ_banda_nm, σₑ[muestras, λ]); las filas sin datos válidos quedan en NaN.
+    """
+    from .constants import C, PI
+    lo = np.searchsorted(grid_nm, band_info['range_min'], side='left')
+    hi = np.searchsorted(grid_nm, band_info['range_max'], side='right')
+    wl_nm = np.asarray(grid_nm[lo:hi], dtype=float)
+    I = np.atleast_2d(matrix)[:, lo:hi]
+    if len(wl_nm) < 2:
+        return wl_nm, np.full(I.shape, np.nan)
+    lam_cm = wl_nm*1e-7
+    n = np.vstack([calculate_refractive_index(wl_nm, coeffs, sm) for coeffs in coeffs_list])
+    den_int = np.trapz(lam_cm*I*n**2, x=lam_cm, axis=1)
+    A_rad = np.asarray(A_rad, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sigma = (A_rad/(8*PI*C*den_int))[:, None]*lam_cm**5*I
+    sigma[~((den_int != 0) & (A_rad > 0))] = np.nan
+    return wl_nm, sigma
+
+def _cell_widths(x):
+    """Ancho de celda de cada punto (mitad del intervalo a cada lado), para integrar máscaras."""
+    edges = np.concatenate([[x[0]], (x[1:] + x[:-1]) / 2, [x[-1]]])
+    return np.diff(edges)
+
+def calculate_gain_spectra(wl_nm, sigma_e, sigma_a, P_grid, window_nm=None):
+    """
+    Sección eficaz de ganancia G(λ, P) = P·σₑ − (1−P)·σₐ en toda la malla
+    (muestras x P x λ) por broadcasting.
+
+    sigma_e, sigma_a: arrays [muestras, λ] o [λ] en cm² sobre wl_nm.
+    P_grid: fracciones de inversión de población (0..1).
+    window_nm: (λ_min, λ_max) opcional para medir el rizado G_max − G_min.
+    Devuelve un dict con 'G' [muestras, P, λ] y, por cada (muestra, P):
+    pico de ganancia y su λ, ancho de banda con G > 0, ancho a media altura
+    y la planitud (desviación relativa std/media de G dentro de la banda con G > 0).
+    """
+    wl_nm = np.asarray(wl_nm, dtype=float)
+    se, sa = np.atleast_2d(sigma_e).astype(float), np.atleast_2d(sigma_a).astype(float)
+    se, sa = np.broadcast_arrays(se, sa)
+    P = np.atleast_1d(np.asarray(P_grid, dtype=float))
+    if np.any((P < 0) | (P > 1)):
+        raise ValueError("Las fracciones de inversión P deben estar entre 0 y 1.")
+
+    G = P[None, :, None]*se[:, None, :] - (1 - P)[None, :, None]*sa[:, None, :]
+    Gz = np.nan_to_num(G, nan=-np.inf)
+    k_peak = np.argmax(Gz, axis=-1)
+    G_peak = np.take_along_axis(G, k_peak[..., None], axis=-1)[..., 0]
+
+    w = _cell_widths(wl_nm) if len(wl_nm) > 1 else np.zeros_like(wl_nm)
+    positive = Gz > 0
+    half = (Gz >= 0.5*G_peak[..., None]) & positive
+    bw = positive @ w
+    Gp = np.where(positive, G, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = (Gp @ w)/bw
+        std = np.sqrt(np.maximum((Gp**2 @ w)/bw - mean**2, 0))
+        flatness = np.where(bw > 0, std/mean, np.nan)
+    out = {
+        'P': P, 'wavelength_nm': wl_nm, 'G': G,
+        'G_peak': G_peak, 'λ_peak (nm)': wl_nm[k_peak] if len(wl_nm) else np.full(G_peak.shape, np.nan),
+        'bandwidth_G>0 (nm)': bw, 'bandwidth_FWHM (nm)': half @ w,
+        'flatness': flatness,
+    }
+    if window_nm is not None:
+        in_win = (wl_nm >= window_nm[0]) & (wl_nm <= window_nm[1])
+        if not in_win.any():
+            raise ValueError(f"La ventana {window_nm} nm no contiene puntos del espectro.")
+        Gw = G[..., in_win]
+        out['ripple'] = Gw.max(axis=-1) - Gw.min(axis=-1)
+    return out
+
+def gain_metrics_to_frame(sample_names, gain):
+    """Tabla larga (Sample, P, métricas) a partir del dict de calculate_gain_spectra."""
+    S, n_P = gain['G_peak'].shape
+    return pd.DataFrame({
+        'Sample': np.repeat(sample_names, n_P), 'P': np.tile(gain['P'], S),
+        'G_peak (x10⁻²¹ cm²)': gain['G_peak'].ravel()*1e21, 'λ_peak (nm)': gain['λ_peak (nm)'].ravel(),
+        'Δλ_G>0 (nm)': gain['bandwidth_G>0 (nm)'].ravel(), 'Δλ_FWHM (nm)': gain['bandwidth_FWHM (nm)'].ravel(),
+        'Planitud': gain['flatness'].ravel(),
+        **({'Rizado (x10⁻²¹ cm²)': gain['ripple'].ravel()*1e21} if 'ripple' in gain else {}),
+    })
+
+MCCUMBER_DIRECTIONS = ("e2a", "a2e")
+
+def mccumber_convert(wl_nm, sigma, T, epsilon_cm=None, direction="e2a"):
+    """
+    Relación de McCumber σₐ(λ) = σₑ(λ)·exp[(hc/λ − ε)/kT] para todas las filas a la vez.
+
+    sigma: [muestras, λ] (o [λ]) en cualquier unidad; T en K (escalar o por muestra).
+    epsilon_cm: energía libre neta ε en cm⁻¹ (escalar o por muestra). Si es None
+    se toma la energía del máximo de cada espectro de entrada.
+    direction: 'e2a' (σₑ -> σₐ) o 'a2e' (σₐ -> σₑ).
+    Devuelve (σ convertida [muestras, λ], ε usada [muestras]).
+    """
+    from .constants import H, C, K_B
+    if direction not in MCCUMBER_DIRECTIONS:
+        raise ValueError(f"Dirección de McCumber desconocida: {direction}")
+    wl_nm = np.asarray(wl_nm, dtype=float)
+    sigma = np.atleast_2d(np.asarray(sigma, dtype=float))
+    T = np.broadcast_to(np.asarray(T, dtype=float), (len(sigma),))
+    if np.any(T <= 0):
+        raise ValueError("La temperatura debe ser positiva (K).")
+    nu_cm = 1e7/wl_nm
+    if epsilon_cm is None:
+        epsilon_cm = nu_cm[np.argmax(np.nan_to_num(sigma, nan=-np.inf), axis=1)]
+    epsilon_cm = np.broadcast_to(np.asarray(epsilon_cm, dtype=float), (len(sigma),))
+
+    x = (nu_cm[None, :] - epsilon_cm[:, None])*(H*C/K_B)/T[:, None]
+    if direction == "a2e": x = -x
+    # Se acota el exponente: en las colas lejanas el factor de McCumber diverge
+    return sigma*np.exp(np.clip(x, -700, 700)), epsilon_cm
+
+def mccumber_absorption_spectra(grid_nm, matrix, band_info, A_rad, coeffs_list, sm, T, epsilon_cm=None):
+    """
+    σₑ(λ) de Füchtbauer-Ladenburg y σₐ(λ) de McCumber para una banda de emisión
+    (p. ej. ⁴I₁₃/₂ → ⁴I₁₅/₂) de todas las muestras sobre una malla común.
+    Devuelve (λ_banda_nm, σₑ[muestras, λ], σₐ[muestras, λ], ε[muestras]) en cm² y cm⁻¹.
+    """
+    wl_nm, sigma_e = emission_cross_section_spectrum(grid_nm, matrix, band_info, A_rad, coeffs_list, sm)
+    if epsilon_cm is None and len(wl_nm):
+        # ε ≈ energía del máximo de emisión (E_exp de la tabla de secciones eficaces)
+        I = np.atleast_2d(matrix)[:, np.searchsorted(grid_nm, wl_nm[0]):][:, :len(wl_nm)]
+        epsilon_cm = 1e7/wl_nm[np.argmax(I, axis=1)]
+    sigma_a, eps = mccumber_convert(wl_nm, sigma_e, T, epsilon_cm, "e2a")
+    return wl_nm, sigma_e, sigma_a, eps
+
+def _segment_gather(lo, hi):
+    """
+    Índices concatenados de los segmentos [lo, hi) y el id de segmento de cada índice.
+    Los segmentos pueden solaparse (p. ej. dos bandas sobre el mismo espectro).
+    """
+    lengths = np.maximum(np.asarray(hi) - np.asarray(lo), 0)
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]]).astype(np.intp)
+    seg = np.repeat(np.arange(len(lengths)), lengths)
+    idx = np.arange(lengths.sum(), dtype=np.intp) - np.repeat(starts, lengths) + np.repeat(np.asarray(lo, dtype=np.intp), lengths)
+    return idx, seg, starts, lengths
+
+def _segment_trapz(y, x, seg, n_seg):
+    """Regla del trapecio por segmento sobre arrays concatenados (equivale a np.trapz en cada uno)."""
+    if len(y) < 2:
+        return np.zeros(n_seg)
+    same = seg[1:] == seg[:-1]
+    contrib = np.where(same, (x[1:] - x[:-1]) * (y[1:] + y[:-1]) / 2.0, 0.0)
+    return np.bincount(seg[:-1], weights=contrib, minlength=n_seg)
+
+def _segment_argmax(y, seg, starts, lengths):
+    """Posición (en el array concatenado) del primer máximo de cada segmento no vacío."""
+    n_seg = len(lengths)
+    first = np.zeros(n_seg, dtype=np.intp)
+    nonempty = lengths > 0
+    if not nonempty.any():
+        return first
+    seg_max = np.full(n_seg, -np.inf)
+    seg_max[nonempty] = np.maximum.reduceat(y, starts[nonempty])
+    pos = np.where(y == seg_max[seg], np.arange(len(y)), len(y))
+    first[nonempty] = np.minimum.reduceat(pos, starts[nonempty])
+    return first
+
+def _band_segments(spectra, r_min, r_max):
+    """
+    Concatena los espectros (wl_nm ordenado, intensidad) y devuelve los segmentos
+    [espectro × banda] de los rangos [r_min, r_max]: (wl, I, idx, seg, starts, lengths).
+    """
+    offsets = np.concatenate([[0], np.cumsum([len(wl) for wl, _ in spectra])]).astype(np.intp)
+    wl_all = np.concatenate([wl for wl, _ in spectra])
+    I_all = np.concatenate([I for _, I in spectra])
+    lo = np.vstack([offsets[k] + np.searchsorted(wl, r_min, side='left') for k, (wl, _) in enumerate(spectra)]).ravel()
+    hi = np.vstack([offsets[k] + np.searchsorted(wl, r_max, side='right') for k, (wl, _) in enumerate(spectra)]).ravel()
+    return (wl_all, I_all) + _segment_gather(lo, hi)
+
+def band_integrals(spectra, ranges):
+    """
+    ∫ I dλ (λ en nm, regla del trapecio) de cada espectro en cada rango (λ_min, λ_max),
+    con las mismas reducciones por segmento que calculate_cross_sections_batched.
+    spectra: lista de (wl_nm ordenado, intensidad). Devuelve (integrales [S, B],
+    nº de puntos [S, B]); los rangos con menos de 2 puntos dan NaN.
+    """
+    n_s, n_b = len(spectra), len(ranges)
+    if n_s == 0 or n_b == 0:
+        return np.zeros((n_s, n_b)), np.zeros((n_s, n_b), dtype=np.intp)
+    r = np.asarray(ranges, dtype=float).reshape(n_b, 2)
+    wl_all, I_all, idx, seg, starts, lengths = _band_segments(spectra, r[:, 0], r[:, 1])
+    integral = _segment_trapz(I_all[idx], wl_all[idx], seg, n_s * n_b)
+    integral = np.where(lengths >= 2, integral, np.nan)
+    return integral.reshape(n_s, n_b), lengths.reshape(n_s, n_b)
+
+def calculate_cross_sections_batched(s_names, spectra, user_bands, a_rad, coeffs_list, sm, lambda_ex, skipped=None):
+    """
+    Sección eficaz de todas las (muestra, banda) en una sola pasada.
+    spectra: lista de (wl_nm ordenado, intensidad) por muestra; a_rad: array [muestras, bandas].
+    n(λ) se evalúa una vez por espectro (y se reutiliza entre espectros de la misma
+    muestra con la misma malla); los límites de banda, las integrales y la
+    búsqueda de picos se resuelven como reducciones por segmento.
+    lambda_ex: escalar común o una λ_ex por espectro (series de excitación).
+    skipped: lista opcional a la que se añaden las (muestra, λ_ex, banda) con A_rad que
+    quedan sin σₑ (menos de 2 puntos en la banda o integral nula), para avisar una sola vez.
+    Devuelve cs_res en el mismo orden que el bucle muestra -> banda.
+    """
+    from .constants import C, PI
+    n_s, n_b = len(spectra), len(user_bands)
+    if n_s == 0 or n_b == 0:
+        return []
+    a_rad = np.asarray(a_rad, dtype=float).reshape(n_s, n_b)
+
+    r_min = np.array([b['range_min'] for b in user_bands], dtype=float)
+    r_max = np.array([b['range_max'] for b in user_bands], dtype=float)
+    wl_all, I_all, idx, seg, starts, lengths = _band_segments(spectra, r_min, r_max)
+    n_of = {}
+    for (wl, _), coeffs in zip(spectra, coeffs_list):
+        key = (id(coeffs), wl.tobytes())
+        if key not in n_of: n_of[key] = np.atleast_1d(calculate_refractive_index(wl, coeffs, sm))
+    n_all = np.concatenate([n_of[(id(coeffs), wl.tobytes())] for (wl, _), coeffs in zip(spectra, coeffs_list)])
+    lam_ex = list(lambda_ex) if np.ndim(lambda_ex) else [lambda_ex] * n_s
+
+    n_seg = n_s * n_b
+    x_nm, I, n = wl_all[idx], I_all[idx], n_all[idx]
+    lam_cm = x_nm*1e-7
+
+    den_int = _segment_trapz(lam_cm*I*n**2, lam_cm, seg, n_seg)
+    int_I_nm = _segment_trapz(I, x_nm, seg, n_seg)
+    peak = _segment_argmax(I, seg, starts, lengths)
+    valid = lengths >= 2
+    max_I = np.where(valid, I[np.minimum(peak, len(I) - 1)] if len(I) else 0.0, 0.0)
+    max_lam_cm = np.where(valid, lam_cm[np.minimum(peak, len(I) - 1)] if len(I) else 1.0, 1.0)
+
+    A = a_rad.ravel()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sigma = A*(max_lam_cm**5)*max_I/(8*PI*C*den_int)
+        d_lam = np.where(max_I > 0, int_I_nm/max_I, 0)
+    d_G = sigma*(d_lam*1e-7)
+
+    cs_res = []
+    for k in range(n_seg):
+        s, b = divmod(k, n_b)
+        if not A[k] > 0: continue
+        band_info = user_bands[b]
+        if not valid[k] or den_int[k]==0 or not np.isfinite(sigma[k]):
+            if skipped is not None: skipped.append((s_names[s], lam_ex[s], band_info))
+            continue
+        cs_res.append({'Level': f"{band_info['initial']} → {band_info['final']}", 'E_exp (cm⁻¹)':1/max_lam_cm[k],
+                       'Δλ_eff (nm)':d_lam[k], 'σₑ (x10⁻²¹ cm²)':sigma[k]*1e21, 'ΔG (x10⁻²⁸ cm³)':d_G[k]*1e28,
+                       'Glass':s_names[s], 'λ_ex (nm)': lam_ex[s]})
+    return cs_res
+
+def _band_rate(band, omegas, coeffs, rad_cols, em_mx, sm):
+    """A_rad de la banda: se toma de la tabla radiativa si existe; si no, se calcula bajo demanda."""
+    A_rad_specific = 0
+    if rad_cols is not None:
+        for slj, slj_f, a in zip(rad_cols['SLJ'], rad_cols["S'L'J'"], rad_cols['A']):
+            if slj == band['initial_slug'] and slj_f == band['final_slug']:
+                A_rad_specific = a
+                break
+    if A_rad_specific == 0:
+        A_rad_specific = _calculate_A_rad_specific(band['initial_slug'], band['final_slug'], omegas, coeffs, em_mx, sm)
+    return A_rad_specific
+
+def jo_entry(raw, wl, band_labels):
+    """Entrada de jo_res (dict con su f_table) a partir de la salida columnar de analyze_sample."""
+    from .ions import pretty_name
+    omegas = raw["Ω"]
+    return {
+        "Sample": raw["Sample"],
+        "Ω2": omegas[0], "Ω4": omegas[1], "Ω6": omegas[2],
+        "rms_S": raw["rms_S"], "rms_f": raw["rms_f"], "rms_perc": raw["rms_perc"],
+        "f_table": pd.DataFrame({
+            # Columna 1: Nombre bonito de la transición
+            "Transición": [pretty_name(b) for b in band_labels],
+            # Columna 2: Longitud de onda experimental
+            "λ (nm)": wl.astype(float).round(2),
+            "f_exp (x10⁻⁶)": raw["f_exp"],
+            "f_cal (x10⁻⁶)": raw["f_cal"]
+        }),
+        **({"cov_Ω": raw["cov_Ω"]} if "cov_Ω" in raw else {})
+    }
+
+def analyze_sample(i, s_name, coeffs, wl, f_exp_col, abs_mx, band_labels, em_mx, sm,
+                   do_rad_calc, sel_trans_rad, cs_bands=None, J_ground=J_GROUND_ER, columnar=False, covariance=False):
+    """
+    Ajuste JO, propiedades radiativas y A_rad de las bandas de emisión de UNA muestra.
+    cs_bands: bandas de usuario si la muestra tiene espectro de emisión, o None.
+    J_ground: J del nivel fundamental del ion de la muestra (ver ions.IONS).
+    Devuelve (entrada de jo_res, DataFrame radiativo o None, lista de A_rad o None).
+    Con columnar=True no se crea ningún DataFrame: la entrada JO lleva arrays
+    (Ω, f_exp, f_cal) y la parte radiativa es un dict de columnas (ver results.ResultSet).
+    covariance: añade 'cov_Ω' (uncertainty.covariance_from_fit) con los residuos y UᵀU de este ajuste.
+    No depende de estado global, por lo que puede ejecutarse en otro proceso.
+    """
+    n_vals = calculate_refractive_index(wl, coeffs, sm)
+    s_ed_exp_val = calculate_S_ed_exp(wl, f_exp_col, n_vals, J_ground)
+    omegas, rms_S_val, f_cal_sample, fit_info = perform_jo_fit(s_ed_exp_val, abs_mx, wl, n_vals, J_ground, full=True)
+
+    diff_f = f_exp_col - f_cal_sample
+    rms_f_val = np.sqrt(np.sum(diff_f**2) / (len(wl) - 3))
+    f_rms_total = np.sqrt(np.sum(f_exp_col**2) / len(wl))
+    delta_rms_perc = (rms_f_val / f_rms_total) * 100
+
+    jo = {"Sample": s_name, "Ω": np.array([omegas[0]*1e20, omegas[1]*1e20, omegas[2]*1e20]),
+          "rms_S": rms_S_val*1e20, "rms_f": rms_f_val*1e6, "rms_perc": delta_rms_perc,
+          "f_exp": f_exp_col*1e6, "f_cal": f_cal_sample*1e6}
+    if covariance:
+        from .uncertainty import covariance_from_fit
+        jo["cov_Ω"] = covariance_from_fit(*fit_info)
+
+    rad_cols = None
+    if do_rad_calc and em_mx is not None:
+        rad_cols = radiative_arrays(omegas, coeffs, em_mx, sm, sel_trans_rad)
+
+    a_rads = None
+    if cs_bands and em_mx is not None:
+        a_rads = [_band_rate(band, omegas, coeffs, rad_cols, em_mx, sm) for band in cs_bands]
+    if columnar:
+        return jo, rad_cols, a_rads
+    rad_df = None
+    if do_rad_calc and em_mx is not None:
+        rad_df = pd.DataFrame(rad_cols, columns=RAD_COLUMNS) if rad_cols is not None else pd.DataFrame()
+    return jo_entry(jo, wl, band_labels), rad_df, a_rads
+
+def emission_series(emission_dict, lambda_ex):
+    """
+    Normaliza emission_dict a {muestra: {λ_ex: ruta}} ordenado por λ_ex. Cada valor
+    puede ser una ruta (espectro excitado a lambda_ex) o un dict {λ_ex: ruta} con la
+    serie de excitación de la muestra (p. ej. 488, 532, 808 y 980 nm).
+    """
+    series = {}
+    for s_name, val in (emission_dict or {}).items():
+        if isinstance(val, dict):
+            entries = {float(l): p for l, p in val.items() if p}
+        else:
+            entries = {float(lambda_ex): val} if val else {}
+        if entries:
+            series[s_name] = dict(sorted(entries.items()))
+    return series
+
+def flatten_emission(emission_dict, lambda_ex):
+    """{etiqueta: ruta} con una entrada por espectro: 'muestra' o 'muestra @ λ nm' si la muestra tiene serie."""
+    flat = {}
+    for s_name, entries in emission_series(emission_dict, lambda_ex).items():
+        for l, p in entries.items():
+            flat[s_name if len(entries) == 1 else f"{s_name} @ {l:g} nm"] = p
+    return flat
+
+def sample_coeffs(sell_co, s_name, sellmeier_aliases=None):
+    """
+    Coeficientes de Sellmeier de una muestra (None si no figura en el archivo).
+    sellmeier_aliases: {muestra: fila de Sellmeier} cuando los nombres difieren (ver registry).
+    Sin alias se mantiene la correspondencia histórica TZGE -> TZGNE antes del nombre exacto.
+    """
+    alias = (sellmeier_aliases or {}).get(s_name)
+    if alias is not None:
+        return sell_co.get(alias)
+    return sell_co.get(s_name.replace('TZGE', 'TZGNE'), sell_co.get(s_name))
+
+def matrices_by_ion(p_abs, p_em, symbols):
+    """
+    Matrices U² de absorción y de emisión de cada ion del lote: {símbolo: (abs_mx, em_mx o None)}.
+    p_abs, p_em: una ruta (lotes de un solo ion) o un dict {símbolo: ruta}. Una misma
+    ruta no puede servir a muestras de iones distintos, y cada matriz de emisión se
+    comprueba contra su ion (ver ions.check_emission_matrix).
+    """
+    from . import data_io
+    from .ions import check_emission_matrix
+
+    def path_for(paths, symbol, what):
+        if isinstance(paths, dict):
+            return paths.get(symbol)
+        if paths and len(symbols) > 1:
+            raise ValueError(f"Muestras de iones distintos ({', '.join(sorted(symbols))}) comparten la matriz de "
+                             f"{what}; indíquela por ion como {{símbolo: ruta}}.")
+        return paths
+
+    mats = {}
+    for symbol in symbols:
+        abs_mx = data_io.load_abs_matrix_elements(path_for(p_abs, symbol, "absorción"))
+        if abs_mx is None:
+            raise ValueError("Error cargando archivos principales.")
+        em_path = path_for(p_em, symbol, "emisión")
+        em_mx = data_io.get_emission_matrix_elements(em_path) if em_path and os.path.exists(em_path) else None
+        if em_mx is not None:
+            check_emission_matrix(em_mx, symbol)
+        mats[symbol] = (abs_mx, em_mx)
+    return mats
+
+def _warn_skipped_bands(skipped):
+    """
+    Un único aviso (RuntimeWarning) con las (muestra, λ_ex, banda) con A_rad que se quedan
+    sin σₑ: la banda no tiene 2 puntos medidos en el espectro o su integral es nula.
+    La GUI lo recoge en su registro.
+    """
+    if not skipped: return
+    listed = ", ".join(f"{s_name} @ {l:g} nm ({band['range_min']}-{band['range_max']} nm)" for s_name, l, band in skipped[:20])
+    warnings.warn(f"σₑ sin calcular en {len(skipped)} banda(s), fuera del espectro de emisión o con integral nula: "
+                  f"{listed}{' ...' if len(skipped) > 20 else ''}", RuntimeWarning)
+
+def _iter_sample_outputs(tasks, mats, symbol_of, wl, f_exp, band_labels, sm, do_rad_calc, sel_trans_rad,
+                         user_bands, ion, n_workers, raw, uncertainty):
+    """
+    Salidas de analyze_sample por tarea, en el orden de tasks y a medida que se calculan
+    (serie o pool de procesos). Con iones mezclados cada grupo usa las matrices de su ion.
+    """
+    from .ions import ion_for_sample
+    def run(group, abs_mx, em_mx):
+        if n_workers and n_workers > 1 and len(group) > 1:
+            from .parallel import iter_samples_parallel
+            return iter_samples_parallel(group, wl, f_exp, abs_mx, band_labels, em_mx, sm,
+                                         do_rad_calc, sel_trans_rad, user_bands, n_workers, ion, raw, uncertainty)
+        return (analyze_sample(i, s_name, coeffs, wl, f_exp[:, i], abs_mx, band_labels, em_mx, sm,
+                               do_rad_calc, sel_trans_rad, user_bands if em_f else None,
+                               ion_for_sample(ion, s_name).ground_J, raw, uncertainty)
+                for i, s_name, coeffs, em_f in group)
+
+    if len(mats) == 1:
+        return run(tasks, *next(iter(mats.values())))
+    done = {}
+    for symbol, (abs_mx, em_mx) in mats.items():
+        group = [t for t in tasks if symbol_of[t[1]] == symbol]
+        done.update(zip((t[1] for t in group), run(group, abs_mx, em_mx)))
+    return (done[t[1]] for t in tasks)
+
+def _stream_cross_sections(s_name, coeffs, em_f, a_rads, read, user_bands, sm, skipped):
+    """
+    σₑ de todas las (λ_ex, banda) de una muestra en una sola pasada sobre sus espectros
+    crudos; read(ruta) devuelve (wl_nm, intensidad) o None. A_rad se reutiliza en toda la serie.
+    """
+    lams, spectra = [], []
+    for l, p in em_f.items():
+        spectrum = read(p)
+        if spectrum is None: continue
+        lams.append(l); spectra.append(spectrum)
+    return calculate_cross_sections_batched([s_name]*len(spectra), spectra, user_bands,
+                                            [a_rads]*len(spectra), [coeffs]*len(spectra), sm, lams, skipped)
+
+def _preprocessed_cross_sections(cs_jobs, user_bands, sm, preprocess, skipped):
+    """
+    σₑ de todos los espectros a la vez sobre la malla común preprocesada.
+    cs_jobs: (muestra, coeficientes, {λ_ex: ruta}, A_rad por banda). Filas agrupadas por λ_ex.
+    """
+    from .preprocessing import get_processed_matrix
+    # Un espectro por (muestra, λ_ex), agrupados por λ_ex
+    cs_spectra = sorted(((l, k, p) for k, job in enumerate(cs_jobs) for l, p in job[2].items()), key=lambda e: e[0])
+    if not cs_spectra:
+        return []
+    grid, names, matrix = get_processed_matrix({(cs_jobs[k][0], l): p for l, k, p in cs_spectra}, preprocess)
+    row_of = {key: r for r, key in enumerate(names)}
+    jobs = [(l, cs_jobs[k]) for l, k, _ in cs_spectra if (cs_jobs[k][0], l) in row_of]
+    rows = [row_of[(job[0], l)] for l, job in jobs]
+    per_band = []
+    for b, band in enumerate(user_bands):
+        a_vec = np.array([job[3][b] for _, job in jobs], dtype=float)
+        per_band.append(calculate_emission_cross_section_matrix(grid, matrix[rows], band, a_vec, [job[1] for _, job in jobs], sm))
+    cs_res = []
+    for k, (l, (s_name, _, _, a_rads)) in enumerate(jobs):
+        for b, band in enumerate(user_bands):
+            analysis = per_band[b][k]
+            if analysis:
+                analysis.update({'Glass':s_name, 'λ_ex (nm)': l})
+                cs_res.append(analysis)
+            elif a_rads[b] > 0:
+                skipped.append((s_name, l, band))
+    return cs_res
+
 def run_full_analysis(p_osc, p_abs, p_sell, emission_dict, sm,
                       do_rad_calc, p_em, sel_trans_rad,
-                      do_cs_calc, user_bands, lambda_ex):
+                      do_cs_calc, user_bands, lambda_ex, preprocess=None, osc_data=None, n_workers=None,
+                      uncertainty=False, ion=None, samples=None, sellmeier_aliases=None,
+                      columnar=False, dtype=np.float64, prefetch=None, on_sample=None):
+    """
+    Ajuste JO, propiedades radiativas y σₑ de todas las muestras (o del subconjunto samples).
+    Devuelve (jo_res, rad_sum, cs_res), o un results.ResultSet en dtype si columnar.
+    emission_dict: {muestra: ruta} a lambda_ex o {muestra: {λ_ex: ruta}} (series de excitación).
+    ion: símbolo o {muestra: símbolo}; con iones mezclados p_abs y p_em van por ion (ver matrices_by_ion).
+    preprocess: None para σₑ sobre los espectros crudos, leídos con prefetch espectros de
+    adelanto (ver pipeline), o opciones de preprocessing para la malla común.
+    n_workers > 1 reparte las muestras en un pool de procesos; uncertainty añade las
+    columnas δ (ver uncertainty.attach_uncertainties); on_sample(muestra, jo, rad, filas σₑ)
+    se llama al terminar cada muestra, en el orden original.
+    """
     from . import data_io
-    from .utils import PRETTY_NAMES
-    wl, f_exp, s_names, band_labels = data_io.load_oscillator_data(p_osc)
-    abs_mx = data_io.load_abs_matrix_elements(p_abs)
+    from .ions import ion_for_sample
+    from .pipeline import Prefetcher, read_spectrum, DEFAULT_PREFETCH
+    wl, f_exp, s_names, band_labels = osc_data if osc_data is not None else data_io.load_oscillator_data(p_osc)
     sell_co = data_io.load_sellmeier_coeffs(p_sell, sm)
     
-    if wl is None or abs_mx is None or sell_co is None: 
+    if wl is None or sell_co is None: 
         raise ValueError("Error cargando archivos principales.")
         
-    jo_res, rad_sum, cs_res = [], {}, []
-    em_mx = data_io.load_emission_matrix_elements(p_em) if (do_rad_calc or do_cs_calc) and p_em and os.path.exists(p_em) else None
-
-    abs_trans_names = [
-        '⁴I₁₅/₂ → ⁴I₁₁/₂', '⁴I₁₅/₂ → ⁴I₉/₂', '⁴I₁₅/₂ → ⁴F₉/₂', 
-        '⁴I₁₅/₂ → ⁴S₃/₂', '⁴I₁₅/₂ → ²H₁₁/₂', '⁴I₁₅/₂ → ⁴F₇/₂', 
-        '⁴I₁₅/₂ → ⁴F₅/₂', '⁴I₁₅/₂ → ⁴F₃/₂', '⁴I₁₅/₂ → ²H₉/₂',
-        '⁴I₁₅/₂ → ⁴G₁₁/₂', '⁴I₁₅/₂ → ²G₇/₂' 
-    ]
-
-    for i, s_name in enumerate(s_names):
-        coeffs = sell_co.get(s_name.replace('TZGE','TZGNE'), sell_co.get(s_name))
-        if coeffs is None: continue
-        
-        n_vals = calculate_refractive_index(wl, coeffs, sm)
-        s_ed_exp_val = calculate_S_ed_exp(wl, f_exp[:, i], n_vals)
-        omegas, rms_S_val, f_cal_sample = perform_jo_fit(s_ed_exp_val, abs_mx, wl, n_vals)
-        
-        diff_f = f_exp[:, i] - f_cal_sample
-        rms_f_val = np.sqrt(np.sum(diff_f**2) / (len(wl) - 3))
-        f_rms_total = np.sqrt(np.sum(f_exp[:, i]**2) / len(wl))
-        delta_rms_perc = (rms_f_val / f_rms_total) * 100
-
-        jo_res.append({
-            "Sample": s_name, 
-            "Ω2": omegas[0]*1e20, "Ω4": omegas[1]*1e20, "Ω6": omegas[2]*1e20,
-            "rms_S": rms_S_val*1e20, "rms_f": rms_f_val*1e6, "rms_perc": delta_rms_perc,
-            "f_table": pd.DataFrame({
-                # Columna 1: Nombre bonito de la transición
-                "Transición": [PRETTY_NAMES.get(b, b) for b in band_labels],
-                # Columna 2: Longitud de onda experimental
-                "λ (nm)": wl.astype(float).round(2),
-                "f_exp (x10⁻⁶)": f_exp[:, i]*1e6,
-                "f_cal (x10⁻⁶)": f_cal_sample*1e6
-            })
-        })
-        
-        if do_rad_calc and em_mx is not None:
-            rad_sum[s_name] = calculate_radiative_properties(omegas, coeffs, em_mx, sm, sel_trans_rad)
-
-        # --- Lógica de Sección Eficaz con Diccionario ---
-        if do_cs_calc and em_mx is not None and user_bands:
-            # Buscamos la ruta en el diccionario usando la etiqueta de la muestra
-            em_f = emission_dict.get(s_name)
-            
-            if em_f and os.path.exists(em_f):
-                em_spectrum_df = data_io.load_emission_spectrum(em_f)
-                if em_spectrum_df is not None:
-                    for band in user_bands:
-                        A_rad_specific = 0
-                        rad_props_df = rad_sum.get(s_name, pd.DataFrame())
-                        if not rad_props_df.empty:
-                            trans_data = rad_props_df[(rad_props_df['SLJ'] == band['initial_slug']) & (rad_props_df["S'L'J'"] == band['final_slug'])]
-                            if not trans_data.empty:
-                                A_rad_specific = trans_data['A'].iloc[0]
-                        
-                        if A_rad_specific == 0:
-                            A_rad_specific = _calculate_A_rad_specific(band['initial_slug'], band['final_slug'], omegas, coeffs, em_mx, sm)
-
-                        if A_rad_specific > 0:
-                            analysis = calculate_emission_cross_section(em_spectrum_df, band, A_rad_specific, coeffs, sm)
-                            if analysis:
-                                analysis.update({'Glass':s_name, 'λ_ex (nm)': lambda_ex})
-                                cs_res.append(analysis)
-    return jo_res, rad_sum, cs_res
\ No newline at end of file
+    jo_res, rad_sum, cs_res, cs_jobs = [], {}, [], []
+    selected = [(i, s_name, sample_coeffs(sell_co, s_name, sellmeier_aliases)) for i, s_name in enumerate(s_names)
+                if samples is None or s_name in samples]
+    dropped = [s_name for _, s_name, coeffs in selected if coeffs is None]
+    if dropped:
+        print(f"AVISO: No se encontraron coeficientes de Sellmeier para {', '.join(dropped)}. Se omiten.")
+    selected = [t for t in selected if t[2] is not None]
+    symbol_of = {s_name: ion_for_sample(ion, s_name).symbol for _, s_name, _ in selected}
+    # Matrices U² de cada ion presente en el lote
+    mats = matrices_by_ion(p_abs, p_em if (do_rad_calc or do_cs_calc) else None,
+                           set(symbol_of.values()) or {ion_for_sample(ion, None).symbol})
+
+    series = emission_series(emission_dict, lambda_ex)
+    tasks = []
+    for i, s_name, coeffs in selected:
+        # Espectros existentes de la muestra (solo si hay σₑ que calcular para su ion)
+        em_f = series.get(s_name, {}) if (do_cs_calc and mats[symbol_of[s_name]][1] is not None and user_bands) else {}
+        em_f = {l: p for l, p in em_f.items() if os.path.exists(p)}
+        tasks.append((i, s_name, coeffs, em_f or None))
+
+    # La propagación de incertidumbres trabaja sobre las tablas clásicas
+    raw = columnar and not uncertainty
+    outputs = _iter_sample_outputs(tasks, mats, symbol_of, wl, f_exp, band_labels, sm, do_rad_calc, sel_trans_rad,
+                                   user_bands, ion, n_workers, raw, uncertainty)
+
+    # Los espectros de las muestras siguientes se leen en segundo plano mientras se calcula la actual
+    prefetch = DEFAULT_PREFETCH if prefetch is None else prefetch
+    paths = [p for *_, em_f in tasks if em_f for p in em_f.values()]
+    stream = preprocess is None
+    # Con la malla preprocesada las σₑ se calculan al final; si no hay σₑ, cada muestra sale ya con sus δ
+    unc_per_sample = uncertainty and (stream or not paths)
+    skipped = []  # (muestra, λ_ex, banda) sin σₑ, avisadas una sola vez al final
+    prefetcher = Prefetcher(paths, read_spectrum if stream else data_io.get_emission_spectrum, prefetch) if paths and prefetch else None
+    read = prefetcher.get if prefetcher else read_spectrum
+    try:
+        # Se fusiona en el orden original de las muestras
+        for (i, s_name, coeffs, em_f), (jo, rad_df, a_rads) in zip(tasks, outputs):
+            abs_mx, em_mx = mats[symbol_of[s_name]]
+            jo_res.append(jo)
+            if rad_df is not None or (raw and do_rad_calc and em_mx is not None):
+                rad_sum[s_name] = rad_df
+            cs_rows = []
+            if a_rads is not None:
+                cs_jobs.append((s_name, coeffs, em_f, a_rads))
+                if stream:
+                    cs_rows = _stream_cross_sections(s_name, coeffs, em_f, a_rads, read, user_bands, sm, skipped)
+                    cs_res.extend(cs_rows)
+            if unc_per_sample:
+                # La propagación es independiente por muestra: cada una sale ya completa, con sus columnas δ
+                from .uncertainty import attach_uncertainties
+                rad_one = {s_name: rad_sum[s_name]} if s_name in rad_sum else {}
+                attach_uncertainties([(i, s_name, coeffs)], [jo], rad_one, cs_rows, wl, f_exp, abs_mx, em_mx, sm,
+                                     user_bands, {s_name: a_rads} if a_rads is not None else None, ion)
+                rad_sum.update(rad_one)
+            if on_sample is not None:
+                on_sample(s_name, jo, rad_sum.get(s_name), cs_rows)
+        if prefetcher and not stream:
+            prefetcher.drain()
+    finally:
+        if prefetcher:
+            prefetcher.close()
+
+    if stream:
+        # cs_res queda agrupado por λ_ex (orden estable: muestras y bandas dentro de cada λ_ex)
+        cs_res.sort(key=lambda row: row['λ_ex (nm)'])
+    else:
+        cs_res = _preprocessed_cross_sections(cs_jobs, user_bands, sm, preprocess, skipped)
+    _warn_skipped_bands(skipped)
+
+    if uncertainty and not unc_per_sample:
+        from .uncertainty import attach_uncertainties
+        a_rads = {job[0]: job[3] for job in cs_jobs}
+        for symbol, (abs_mx, em_mx) in mats.items():
+            group = [k for k, t in enumerate(tasks) if symbol_of[t[1]] == symbol]
+            attach_uncertainties([tasks[k][:3] for k in group], [jo_res[k] for k in group], rad_sum, cs_res,
+                                 wl, f_exp, abs_mx, em_mx, sm, user_bands, a_rads, ion)
+    if columnar:
+        from .results import ResultSet
+        if raw:
+            return ResultSet.from_columns(wl, band_labels, jo_res, rad_sum, cs_res, dtype)
+        return ResultSet.from_legacy(jo_res, rad_sum, cs_res, wl, band_labels, dtype)
+    return jo_res, rad_sum, cs_res
@@ -0,0 +1,77 @@
+"""
+Lectura anticipada de espectros de emisión.
+
+run_full_analysis consume las muestras en orden; mientras se ajusta una muestra,
+un pequeño pool de hilos ya está leyendo y parseando los espectros de las
+siguientes (la lectura de disco o de red y el parser de pandas liberan el GIL).
+La ventana es acotada: nunca hay más de depth lecturas pendientes o sin
+consumir, por lo que la memoria no crece con el número de muestras.
+"""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_PREFETCH = 4
+
+
+def read_spectrum(path):
+    """
+    Espectro ordenado por λ como (wl_nm, intensidad), o None si no se puede leer.
+    Lee el archivo directamente, sin pasar por el registro de sesión de data_io:
+    en modo stream cada espectro se usa una vez y el registro crecería sin límite.
+    """
+    from . import data_io
+    df = data_io.load_emission_spectrum(path)
+    if df is None:
+        return None
+    df = df.sort_values('wavelength_nm', kind='mergesort')
+    return df['wavelength_nm'].to_numpy(dtype=float), df['intensity'].to_numpy(dtype=float)
+
+
+class Prefetcher:
+    """
+    Carga items en segundo plano en el orden en que se van a pedir.
+    items: secuencia ordenada de claves (p. ej. rutas); load(item) -> valor.
+    get(item) devuelve el valor (esperando si aún se está leyendo) y lanza la
+    lectura del siguiente item para mantener la ventana llena.
+    """
+
+    def __init__(self, items, load=read_spectrum, depth=DEFAULT_PREFETCH):
+        self.load, self.depth = load, max(int(depth), 1)
+        self._queue = deque(items)
+        self._pending = {}
+        self._pool = ThreadPoolExecutor(max_workers=self.depth, thread_name_prefix="fropa-prefetch")
+        for _ in range(self.depth):
+            self._submit_next()
+
+    def _submit_next(self):
+        while self._queue:
+            item = self._queue.popleft()
+            if item not in self._pending:
+                self._pending[item] = self._pool.submit(self.load, item)
+                return
+
+    def get(self, item):
+        future = self._pending.pop(item, None)
+        if future is None:
+            # Fuera de orden o no anunciado: lectura directa
+            return self.load(item)
+        self._submit_next()
+        return future.result()
+
+    def drain(self):
+        """Espera a que terminen todas las lecturas anunciadas (para precargar el registro de sesión)."""
+        while self._pending:
+            self.get(next(iter(self._pending)))
+
+    def close(self):
+        self._queue.clear()
+        for future in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+        self._pool.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
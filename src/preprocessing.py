@@ -0,0 +1,161 @@
+"""
+Etapa opcional de preprocesado de espectros de emisión.
+
+Todos los espectros vinculados se remuestrean sobre una malla común y se
+apilan en una matriz 2-D (muestras x λ). La línea base, el suavizado y la
+normalización se aplican como operaciones vectorizadas sobre la matriz
+completa. La malla cubre la unión de los intervalos medidos: un espectro corto
+no recorta las bandas de los demás, solo queda en NaN fuera de su propio rango. El resultado se guarda en un registro de sesión.
+"""
+import os
+import numpy as np
+from . import data_io
+
+BASELINE_MODES = ("none", "offset", "linear")
+NORMALIZE_MODES = ("none", "max", "area")
+
+DEFAULT_PREPROCESS = {
+    "step_nm": None,        # None: paso mediano del espectro más fino
+    "baseline": "linear",   # 'none' | 'offset' | 'linear'
+    "edge_points": 10,      # puntos de cada extremo usados para estimar la línea base
+    "smooth_window": 0,     # 0 o 1: sin suavizado; impar >= 3: Savitzky-Golay
+    "smooth_order": 2,
+    "clip_negative": True,
+    "normalize": "none",    # 'none' | 'max' | 'area'
+}
+
+# clave -> (malla, nombres, matriz procesada)
+_MATRIX_CACHE = {}
+
+
+def build_spectral_matrix(emission_dict, step_nm=None):
+    """
+    Lee los espectros (vía registro de sesión) y los interpola en una malla común
+    que cubre la unión de sus intervalos; fuera del intervalo medido de cada
+    espectro su fila queda en NaN (ver valid_spans).
+    Devuelve (malla_nm, nombres, matriz[muestras, λ]).
+    """
+    names, spectra = [], []
+    for s_name, path in emission_dict.items():
+        df = data_io.get_emission_spectrum(path)
+        if df is None: continue
+        df = df.sort_values('wavelength_nm', kind='mergesort')
+        names.append(s_name)
+        spectra.append((df['wavelength_nm'].to_numpy(dtype=float), df['intensity'].to_numpy(dtype=float)))
+    if not spectra:
+        raise ValueError("No hay espectros de emisión válidos para preprocesar.")
+
+    # Si todos los espectros ya comparten la misma malla no hace falta interpolar
+    first_wl = spectra[0][0]
+    if step_nm is None and all(len(wl) == len(first_wl) and np.array_equal(wl, first_wl) for wl, _ in spectra):
+        return first_wl.copy(), names, np.vstack([I for _, I in spectra])
+
+    lo = min(wl[0] for wl, _ in spectra)
+    hi = max(wl[-1] for wl, _ in spectra)
+    if step_nm is None:
+        step_nm = min(np.median(np.diff(wl)) for wl, _ in spectra)
+    # La malla se ancla al inicio del intervalo común (si lo hay) para que los puntos
+    # compartidos por todos los espectros no dependan de los que cubren más rango
+    anchor = max(wl[0] for wl, _ in spectra)
+    if anchor > min(wl[-1] for wl, _ in spectra):
+        anchor = lo
+    k0 = int(np.ceil((lo - anchor) / step_nm - 1e-9))
+    grid = np.concatenate([anchor + step_nm * np.arange(k0, 0), np.arange(anchor, hi + 0.5 * step_nm, step_nm)])
+    # Se redondea a la resolución del paso para que los nodos caigan exactamente en las λ medidas
+    # (p. ej. 640.0 y no 639.99999999999) y los extremos de la unión no se pierdan por redondeo
+    grid = np.round(grid, max(0, int(np.ceil(-np.log10(step_nm)))) + 6)
+    grid = grid[(grid >= lo) & (grid <= hi)]
+
+    matrix = np.empty((len(spectra), len(grid)))
+    for k, (wl, I) in enumerate(spectra):
+        matrix[k] = np.interp(grid, wl, I, left=np.nan, right=np.nan)
+    return grid, names, matrix
+
+
+def valid_spans(matrix):
+    """Intervalo [inicio, fin) de columnas con datos de cada fila (NaN fuera del rango medido)."""
+    ok = ~np.isnan(matrix)
+    has = ok.any(axis=1)
+    start = np.where(has, ok.argmax(axis=1), 0)
+    stop = np.where(has, matrix.shape[1] - ok[:, ::-1].argmax(axis=1), 0)
+    return start, stop
+
+
+def _savgol_coeffs(window, order):
+    half = window // 2
+    x = np.arange(-half, half + 1, dtype=float)
+    A = np.vander(x, order + 1, increasing=True)
+    # Fila 0 de la pseudo-inversa: valor ajustado en el centro de la ventana
+    return np.linalg.pinv(A)[0]
+
+
+def preprocess_matrix(grid, matrix, options=None):
+    """
+    Aplica línea base, suavizado y normalización a todas las filas a la vez; las
+    filas se agrupan por intervalo válido y cada grupo se procesa solo dentro de él.
+    """
+    opts = {**DEFAULT_PREPROCESS, **(options or {})}
+    M = np.array(matrix, dtype=float, copy=True)
+    start, stop = valid_spans(M)
+    spans = np.stack([start, stop], axis=1)
+    for a, b in np.unique(spans, axis=0):
+        if b - a < 2: continue
+        rows = np.flatnonzero((start == a) & (stop == b))
+        M[rows, a:b] = _preprocess_block(grid[a:b], M[rows, a:b], opts)
+    return M
+
+
+def _preprocess_block(grid, M, opts):
+    """Línea base, suavizado y normalización de filas que comparten el mismo intervalo válido."""
+    k = max(1, min(int(opts["edge_points"]), M.shape[1] // 2))
+
+    if opts["baseline"] == "offset":
+        M -= np.concatenate([M[:, :k], M[:, -k:]], axis=1).mean(axis=1, keepdims=True)
+    elif opts["baseline"] == "linear":
+        # Recta por los promedios de ambos extremos de cada espectro
+        y0, y1 = M[:, :k].mean(axis=1, keepdims=True), M[:, -k:].mean(axis=1, keepdims=True)
+        x0, x1 = grid[:k].mean(), grid[-k:].mean()
+        M -= y0 + (y1 - y0) * (grid[None, :] - x0) / (x1 - x0)
+    elif opts["baseline"] != "none":
+        raise ValueError(f"Modo de línea base desconocido: {opts['baseline']}")
+
+    w = int(opts["smooth_window"])
+    if w >= 3:
+        if w % 2 == 0: w += 1
+        if w > M.shape[1]: raise ValueError("La ventana de suavizado es mayor que el espectro.")
+        coeffs = _savgol_coeffs(w, min(int(opts["smooth_order"]), w - 1))
+        padded = np.pad(M, ((0, 0), (w // 2, w // 2)), mode='edge')
+        M = np.lib.stride_tricks.sliding_window_view(padded, w, axis=1) @ coeffs
+
+    if opts["clip_negative"]:
+        np.clip(M, 0, None, out=M)
+
+    if opts["normalize"] == "max":
+        peak = M.max(axis=1, keepdims=True)
+        M = np.divide(M, peak, out=np.zeros_like(M), where=peak > 0)
+    elif opts["normalize"] == "area":
+        area = np.trapz(M, x=grid, axis=1)[:, None]
+        M = np.divide(M, area, out=np.zeros_like(M), where=area > 0)
+    elif opts["normalize"] != "none":
+        raise ValueError(f"Modo de normalización desconocido: {opts['normalize']}")
+    return M
+
+
+def get_processed_matrix(emission_dict, options=None):
+    """
+    Malla común + matriz preprocesada, reutilizando el registro de sesión
+    mientras no cambien los archivos (mtime) ni las opciones.
+    """
+    opts = {**DEFAULT_PREPROCESS, **(options or {})}
+    files = []
+    for s_name, path in emission_dict.items():
+        try:
+            files.append((s_name, os.path.abspath(path), os.path.getmtime(path)))
+        except OSError:
+            continue
+    key = (tuple(files), tuple(sorted(opts.items())))
+    if key not in _MATRIX_CACHE:
+        grid, names, raw = build_spectral_matrix({s: p for s, p, _ in files}, opts["step_nm"])
+        _MATRIX_CACHE.clear()  # solo se conserva la configuración más reciente
+        _MATRIX_CACHE[key] = (grid, names, preprocess_matrix(grid, raw, opts))
+    return _MATRIX_CACHE[key]
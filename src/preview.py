@@ -0,0 +1,120 @@
+"""
+Vista previa en vivo de la sección eficaz (σₑ, Δλ_eff, ΔG) para la banda en edición.
+
+Mantiene en memoria todo lo que no depende del rango de la banda:
+espectros ordenados, n(λ) sobre la malla completa de cada espectro,
+parámetros Ωλ por muestra y las tasas A_rad ya calculadas. Cada
+actualización solo recorta arrays y evalúa dos integrales.
+"""
+import os
+import numpy as np
+from . import data_io
+from .ions import ion_for_sample
+from .physics_core import (calculate_refractive_index, calculate_S_ed_exp, perform_jo_fit,
+                           _calculate_A_rad_specific, cross_section_from_arrays, sample_coeffs, emission_series,
+                           matrices_by_ion)
+from .project import file_signature
+
+
+def _mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+def _inputs_key(p_osc, p_abs, p_sell, sm, p_em, ion=None, sellmeier_aliases=None):
+    """Clave de las entradas de las que dependen Ωλ, n(λ) y A_rad (rutas, mtimes, modelo de Sellmeier e ion)."""
+    return (p_osc, _mtime(p_osc), file_signature(p_abs), p_sell, _mtime(p_sell), sm, file_signature(p_em), ion,
+            tuple(sorted((sellmeier_aliases or {}).items())))
+
+
+class CrossSectionPreview:
+    def __init__(self):
+        self._base_key = None
+        self._omegas, self._coeffs = {}, {}
+        self._spectra = {}   # muestra -> (clave, wl_nm, intensidad, n)
+        self._a_rad = {}     # (muestra, slug_inicial, slug_final) -> A_rad
+        self._rates_key = None  # entradas con las que se calcularon las A_rad de _a_rad
+        self.sm = None
+        self._em_mx = {}     # muestra -> matriz de emisión de su ion
+
+    def update_inputs(self, p_osc, p_abs, p_sell, sm, p_em, emission_dict, ion=None, sellmeier_aliases=None, lambda_ex=None):
+        """
+        Sincroniza el contexto con la configuración actual de la GUI.
+        Solo se recalcula lo que cambió (rutas, mtimes, modelo de Sellmeier o ion).
+        """
+        base_key = _inputs_key(p_osc, p_abs, p_sell, sm, p_em, ion, sellmeier_aliases)
+        if base_key != self._base_key:
+            wl, f_exp, s_names, _ = data_io.load_oscillator_data(p_osc)
+            sell_co = data_io.load_sellmeier_coeffs(p_sell, sm)
+            self._omegas, self._coeffs, self._spectra, self._em_mx = {}, {}, {}, {}
+            # Las A_rad precargadas por set_known_rates siguen valiendo si se calcularon con estas entradas
+            if base_key != self._rates_key:
+                self._a_rad, self._rates_key = {}, base_key
+            coeffs_of = {s_name: sample_coeffs(sell_co, s_name, sellmeier_aliases) for s_name in s_names}
+            mats = matrices_by_ion(p_abs, p_em, {ion_for_sample(ion, s).symbol for s, c in coeffs_of.items() if c is not None})
+            for i, s_name in enumerate(s_names):
+                coeffs = coeffs_of[s_name]
+                if coeffs is None: continue
+                sample_ion = ion_for_sample(ion, s_name)
+                abs_mx, self._em_mx[s_name] = mats[sample_ion.symbol]
+                n_vals = calculate_refractive_index(wl, coeffs, sm)
+                s_ed_exp_val = calculate_S_ed_exp(wl, f_exp[:, i], n_vals, sample_ion.ground_J)
+                omegas, _, _ = perform_jo_fit(s_ed_exp_val, abs_mx, wl, n_vals, sample_ion.ground_J)
+                self._omegas[s_name], self._coeffs[s_name] = omegas, coeffs
+            self.sm = sm
+            self._base_key = base_key
+
+        # Con series de excitación se previsualiza el espectro a lambda_ex (o el primero de la serie)
+        series = emission_series(emission_dict, lambda_ex or 0.0)
+        for s_name in list(self._spectra):
+            if s_name not in series: del self._spectra[s_name]
+        for s_name, entries in series.items():
+            if s_name not in self._coeffs: continue
+            em_f = entries.get(float(lambda_ex or 0.0), next(iter(entries.values())))
+            key = (em_f, _mtime(em_f))
+            if s_name in self._spectra and self._spectra[s_name][0] == key: continue
+            df = data_io.get_emission_spectrum(em_f)
+            if df is None: continue
+            df = df.sort_values('wavelength_nm', kind='mergesort')
+            wl_nm = df['wavelength_nm'].to_numpy(dtype=float)
+            self._spectra[s_name] = (key, wl_nm, df['intensity'].to_numpy(dtype=float),
+                                     calculate_refractive_index(wl_nm, self._coeffs[s_name], self.sm))
+
+    def set_known_rates(self, results, config):
+        """
+        Precarga A_rad desde las tablas radiativas (results.ResultSet) de una ejecución
+        completa con la configuración config (argumentos de run_full_analysis). Se
+        conservan mientras update_inputs reciba esas mismas entradas.
+        """
+        from .results import RAD_VALUE_COLUMNS
+        key = _inputs_key(config["p_osc"], config["p_abs"], config["p_sell"], config["sm"], config["p_em"],
+                          config.get("ion"), config.get("sellmeier_aliases"))
+        if key != self._rates_key:
+            self._a_rad, self._rates_key = {}, key
+        samples, initial, final = results.rad_row_labels()
+        a_rad = results.rad_values[:, RAD_VALUE_COLUMNS.index('A')].astype(float)
+        for s_name, slj, slj_f, a in zip(samples, initial, final, a_rad):
+            self._a_rad[(s_name, slj, slj_f)] = a
+
+    def _get_a_rad(self, s_name, i_slug, f_slug):
+        key = (s_name, i_slug, f_slug)
+        if key not in self._a_rad:
+            self._a_rad[key] = _calculate_A_rad_specific(i_slug, f_slug, self._omegas[s_name],
+                                                         self._coeffs[s_name], self._em_mx[s_name], self.sm)
+        return self._a_rad[key]
+
+    def evaluate(self, band_info):
+        """Devuelve una fila de resultados por espectro vinculado (mismas claves que cs_res)."""
+        rows = []
+        for s_name, (_, wl_nm, intensity, n_full) in self._spectra.items():
+            A_rad = self._get_a_rad(s_name, band_info['initial_slug'], band_info['final_slug'])
+            if not A_rad > 0: continue
+            lo = np.searchsorted(wl_nm, band_info['range_min'], side='left')
+            hi = np.searchsorted(wl_nm, band_info['range_max'], side='right')
+            res = cross_section_from_arrays(wl_nm[lo:hi], intensity[lo:hi], n_full[lo:hi], A_rad, band_info)
+            if res:
+                res['Glass'] = s_name
+                rows.append(res)
+        return rows
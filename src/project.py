@@ -0,0 +1,277 @@
+"""
+Archivos de proyecto (.fropa.npz).
+
+Un proyecto guarda la configuración del análisis (rutas, bandas, espectros
+vinculados, transiciones, λ_ex, modelo de Sellmeier, ion, opciones) junto con
+los resultados calculados (n(λ) y un results.ResultSet con los ajustes Ω, las
+tablas radiativas y las secciones eficaces) en un único .npz sin objetos pickle.
+Los resultados se escriben directamente desde los arrays del ResultSet; los
+proyectos de la versión 1 (una tabla '<tabla>/__columns__' + '<tabla>/c<j>' por
+muestra) se siguen pudiendo abrir.
+
+Cada muestra lleva una huella de sus entradas (columna de f_exp, coeficientes de
+Sellmeier y archivo de espectro); al reabrir el proyecto solo se recalculan las
+muestras cuya huella cambió en disco. Si cambia algo común a todas (matriz de
+absorción o de emisión, longitudes de onda, opciones) se recalcula todo. Los
+lotes largos pueden registrar cada muestra en un diario reanudable (ver checkpoint).
+"""
+import hashlib
+import json
+import os
+import numpy as np
+import pandas as pd
+
+PROJECT_VERSION = 2
+PROJECT_EXT = ".fropa.npz"
+
+# Argumentos de run_full_analysis que forman parte de la configuración
+ANALYSIS_KEYS = ("p_osc", "p_abs", "p_sell", "emission_dict", "sm", "do_rad_calc", "p_em", "sel_trans_rad",
+                 "do_cs_calc", "user_bands", "lambda_ex", "preprocess", "uncertainty", "ion", "sellmeier_aliases")
+# Opciones que afectan a todas las muestras (las rutas de osc/Sellmeier/espectros se siguen por muestra)
+_GLOBAL_KEYS = ("sm", "do_rad_calc", "sel_trans_rad", "do_cs_calc", "user_bands", "lambda_ex", "preprocess",
+                "uncertainty", "ion")
+
+
+def file_signature(path):
+    """
+    'ruta|mtime|tamaño' de un archivo, o '' si no existe. Con un dict de rutas
+    (p. ej. matrices por ion) se devuelve {clave: firma}.
+    """
+    if isinstance(path, dict):
+        return {k: file_signature(v) for k, v in sorted(path.items())}
+    if not path or not os.path.exists(path):
+        return ""
+    st = os.stat(path)
+    return f"{os.path.abspath(path)}|{st.st_mtime_ns}|{st.st_size}"
+
+
+def _digest(*parts):
+    h = hashlib.sha1()
+    for part in parts:
+        h.update(part.tobytes() if isinstance(part, np.ndarray) else json.dumps(part, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+
+def input_fingerprints(config):
+    """
+    Huellas de las entradas: (global, {muestra: huella}).
+    Devuelve también los datos de osciladores leídos para no volver a cargarlos.
+    """
+    from . import data_io
+    from .physics_core import sample_coeffs, emission_series
+    wl, f_exp, s_names, band_labels = data_io.load_oscillator_data(config["p_osc"])
+    sell_co = data_io.load_sellmeier_coeffs(config["p_sell"], config["sm"])
+    if wl is None or sell_co is None:
+        raise ValueError("Error cargando archivos principales.")
+    global_fp = _digest(np.asarray(wl, dtype=float), list(band_labels), file_signature(config["p_abs"]),
+                        file_signature(config["p_em"]), {k: config.get(k) for k in _GLOBAL_KEYS})
+    emission = emission_series(config.get("emission_dict"), config["lambda_ex"])
+    per_sample = {}
+    for i, s_name in enumerate(s_names):
+        coeffs = sample_coeffs(sell_co, s_name, config.get("sellmeier_aliases"))
+        per_sample[s_name] = _digest(np.ascontiguousarray(f_exp[:, i], dtype=float),
+                                     None if coeffs is None else [float(c) for c in coeffs],
+                                     [[l, file_signature(p)] for l, p in emission.get(s_name, {}).items()])
+    return global_fp, per_sample, (wl, f_exp, s_names, band_labels), sell_co
+
+
+def stale_samples(fingerprints, previous):
+    """Muestras a recalcular frente a las huellas de un proyecto anterior (todas si cambió lo global)."""
+    global_fp, per_sample = fingerprints
+    if previous is None or previous.get("global") != global_fp:
+        return list(per_sample)
+    old = previous.get("samples", {})
+    return [s for s, fp in per_sample.items() if old.get(s) != fp]
+
+
+def merge_results(s_names, old, new, recomputed):
+    """
+    Combina resultados previos y recalculados ({'set': ResultSet, 'n': {muestra: n(λ)}})
+    en el orden de s_names. old puede ser None.
+    """
+    from .results import ResultSet
+    recomputed = set(recomputed)
+    n = {}
+    for s in s_names:
+        src = new if s in recomputed else old
+        if src is not None and s in src["n"]:
+            n[s] = src["n"][s]
+    parts = [new["set"].take([s for s in s_names if s in recomputed])]
+    kept = old["set"].take([s for s in s_names if s not in recomputed]) if old is not None else None
+    if kept is not None and len(kept):
+        parts.append(kept)
+    # cs queda agrupado por λ_ex (orden estable: muestras y bandas dentro de cada λ_ex)
+    return {"set": ResultSet.concat(parts).take(s_names), "n": n}
+
+
+def run_project(config, previous=None, n_workers=None, on_sample=None, journal=None):
+    """
+    Ejecuta run_full_analysis solo sobre las muestras cuyas entradas cambiaron
+    respecto de previous (un proyecto ya calculado, o None para calcularlo todo).
+    on_sample: se pasa a run_full_analysis (aviso por cada muestra recalculada).
+    journal: carpeta de un checkpoint.RunJournal; cada muestra terminada se registra
+    en él y, si la ejecución se interrumpe, al relanzarla solo se calculan las que
+    faltan. '{fingerprint}' en la ruta se sustituye por los 12 primeros caracteres
+    de la huella global. Se borra al terminar. Con la malla preprocesada y σₑ no se usa (la malla
+    común depende de todos los espectros).
+    Devuelve (proyecto, muestras recalculadas).
+    """
+    from .physics_core import run_full_analysis, calculate_refractive_index, sample_coeffs
+    from .results import ResultSet
+    global_fp, per_sample, osc_data, sell_co = input_fingerprints(config)
+    fingerprints = {"global": global_fp, "samples": per_sample}
+    prev_fp = previous.get("fingerprints") if previous else None
+    stale = stale_samples((global_fp, per_sample), prev_fp)
+    common_grid = bool(config.get("preprocess") and config.get("do_cs_calc"))
+    if common_grid and stale:
+        # La malla común preprocesada depende de todos los espectros
+        emission = config.get("emission_dict") or {}
+        stale = list(dict.fromkeys(stale + [s for s in per_sample if emission.get(s)]))
+
+    wl, s_names, band_labels = osc_data[0], osc_data[2], osc_data[3]
+    wl = np.asarray(wl, dtype=float)
+
+    def n_of(s):
+        coeffs = sample_coeffs(sell_co, s, config.get("sellmeier_aliases"))
+        return None if coeffs is None else np.atleast_1d(calculate_refractive_index(wl, coeffs, config["sm"]))
+
+    run_journal, done = None, {}
+    if journal is not None and stale and not common_grid:
+        from .checkpoint import RunJournal, FINGERPRINT_FIELD
+        run_journal = RunJournal(journal.replace(FINGERPRINT_FIELD, global_fp[:12]), global_fp)
+        done = run_journal.completed({s: per_sample[s] for s in stale})
+    todo = [s for s in stale if s not in done]
+
+    if run_journal is None:
+        callback = on_sample
+    else:
+        def callback(s_name, jo, rad_df, cs_rows):
+            n = n_of(s_name)
+            run_journal.record(s_name, per_sample[s_name],
+                               {"set": ResultSet.from_sample(wl, band_labels, jo, rad_df, cs_rows),
+                                "n": {} if n is None else {s_name: n}})
+            if on_sample is not None:
+                on_sample(s_name, jo, rad_df, cs_rows)
+
+    kwargs = {k: config.get(k) for k in ANALYSIS_KEYS}
+    new = {"set": ResultSet.from_columns(wl, band_labels, [], {}, []), "n": {}}
+    if todo:
+        kwargs.update(emission_dict=kwargs["emission_dict"] or {}, uncertainty=bool(kwargs["uncertainty"]))
+        # Resultados columnar: el proyecto nunca pasa por las tablas por muestra
+        new["set"] = run_full_analysis(**kwargs, osc_data=osc_data, n_workers=n_workers, samples=set(todo),
+                                       on_sample=callback, columnar=True)
+        for s in todo:
+            n = n_of(s)
+            if n is not None:
+                new["n"][s] = n
+    if done:
+        # Muestras recuperadas del diario + las calculadas ahora, como si fuera una sola ejecución
+        journaled = {"set": ResultSet.concat([res["set"] for res in done.values()]),
+                     "n": {s: v for res in done.values() for s, v in res["n"].items()}}
+        new = merge_results(s_names, journaled, new, todo)
+    results = merge_results(s_names, previous["results"] if previous else None, new, stale)
+    if run_journal is not None:
+        run_journal.clear()
+    return {"config": config, "results": results, "fingerprints": fingerprints}, stale
+
+
+# --- Serialización ---
+
+_SET_ARRAYS = ("omega", "rms", "f_exp", "f_cal", "rad_offsets", "rad_levels", "rad_values",
+               "cs_sample", "cs_band", "cs_lambda", "cs_values")
+_SET_NAMES = ("samples", "band_labels", "levels", "rad_samples", "cs_samples", "cs_bands")
+_SET_EXTRAS = ("jo_extra", "rad_extra", "cs_extra")
+
+
+def pack_results(res):
+    """Resultados {'set': ResultSet, 'n'} como (arrays, cabecera JSON), escritos desde los arrays del conjunto."""
+    rs = res["set"]
+    arrays = {name: getattr(rs, name) for name in _SET_ARRAYS}
+    arrays["wl"] = rs.wl
+    extras = {}
+    for group in _SET_EXTRAS:
+        extras[group] = list(getattr(rs, group))
+        for j, v in enumerate(getattr(rs, group).values()):
+            arrays[f"{group}{j}"] = v if v.dtype.kind in 'fiub' else v.astype(str)
+    n_names = list(res["n"])
+    for k, s in enumerate(n_names):
+        arrays[f"n{k}"] = res["n"][s]
+    meta = {name: list(getattr(rs, name)) for name in _SET_NAMES}
+    meta.update(dtype=rs.dtype.name, extras=extras, n=n_names)
+    return arrays, meta
+
+
+def unpack_results(data, header):
+    """Inverso de pack_results sobre un .npz abierto."""
+    from .results import ResultSet
+    extras = {}
+    for group in _SET_EXTRAS:
+        extras[group] = {}
+        for j, name in enumerate(header["extras"][group]):
+            v = data[f"{group}{j}"]
+            extras[group][name] = v if v.dtype.kind in 'fiub' else v.astype(object)
+    rs = ResultSet(header["samples"], header["band_labels"], data["wl"], data["omega"], data["rms"],
+                   data["f_exp"], data["f_cal"], header["rad_samples"], data["rad_offsets"], header["levels"],
+                   data["rad_levels"], data["rad_values"], header["cs_samples"], data["cs_sample"],
+                   header["cs_bands"], data["cs_band"], data["cs_lambda"], data["cs_values"],
+                   dtype=header["dtype"], **extras)
+    return {"set": rs, "n": {s: data[f"n{k}"] for k, s in enumerate(header["n"])}}
+
+
+def _get_frame(data, name):
+    cols = data[f"{name}/__columns__"].tolist()
+    return pd.DataFrame({c: data[f"{name}/c{j}"] for j, c in enumerate(cols)})
+
+
+def _unpack_results_v1(data, header):
+    """Resultados de un proyecto de la versión 1 (tablas por muestra), convertidos a ResultSet."""
+    from .results import ResultSet
+    jo = []
+    for k, meta in enumerate(header["jo"]):
+        entry = dict(meta["scalars"])
+        for key in meta["frames"]:
+            entry[key] = _get_frame(data, f"jo{k}/{key}")
+        for key in meta["arrays"]:
+            entry[key] = data[f"jo{k}:{key}"]
+        jo.append(entry)
+    rad = {s: _get_frame(data, f"rad{k}") for k, s in enumerate(header["rad"])}
+    cs = []
+    if header["cs"]:
+        for row in _get_frame(data, "cs").to_dict("records"):
+            # Las columnas δ ausentes en una fila se guardan como NaN
+            cs.append({c: v for c, v in row.items() if not (c.startswith('δ') and pd.isna(v))})
+    n = {s: data[f"n{k}"] for k, s in enumerate(header["n"])}
+    return {"set": ResultSet.from_legacy(jo, rad, cs, data["wl"]), "n": n}
+
+
+def save_project(path, project):
+    """Escribe el proyecto (configuración + resultados + huellas) en un único .npz."""
+    arrays, meta = pack_results(project["results"])
+    header = {"version": PROJECT_VERSION, "config": project["config"], "fingerprints": project["fingerprints"], **meta}
+    arrays["__header__"] = np.array(json.dumps(header, ensure_ascii=False, default=str))
+    if not path.endswith(".npz"):
+        path += PROJECT_EXT
+    np.savez_compressed(path, **arrays)
+    return path
+
+
+def load_project(path):
+    """Lee un proyecto guardado con save_project (sin recalcular nada)."""
+    with np.load(path, allow_pickle=False) as data:
+        header = json.loads(str(data["__header__"]))
+        if header.get("version") == 1:
+            results = _unpack_results_v1(data, header)
+        elif header.get("version") == PROJECT_VERSION:
+            results = unpack_results(data, header)
+        else:
+            raise ValueError(f"Versión de proyecto no soportada: {header.get('version')}")
+    config = header["config"]
+    # JSON guarda las claves λ_ex de las series de excitación como texto
+    config["emission_dict"] = {s: {float(l): p for l, p in v.items()} if isinstance(v, dict) else v
+                               for s, v in (config.get("emission_dict") or {}).items()}
+    return {"config": config, "results": results, "fingerprints": header["fingerprints"]}
+
+
+def refresh_project(project, n_workers=None):
+    """Recalcula solo lo que cambió en disco desde que se guardó el proyecto. Devuelve (proyecto, recalculadas)."""
+    return run_project(project["config"], previous=project, n_workers=n_workers)
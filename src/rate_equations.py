@@ -0,0 +1,139 @@
+"""
+Solver de ecuaciones de tasa en estado estacionario.
+
+Construye la matriz de tasas nivel a nivel a partir de las A calculadas por
+calculate_radiative_properties, más tasas no radiativas y de bombeo a λ_ex
+dadas por el usuario, y resuelve las poblaciones estacionarias para muchas
+muestras y potencias de bombeo a la vez (np.linalg.solve por lotes).
+
+Convención: K[j, i] es la tasa (s⁻¹) de i -> j; la diagonal es menos la suma
+de salidas, de modo que dN/dt = K · N.
+"""
+import numpy as np
+import pandas as pd
+from .constants import H, C
+from .ions import DEFAULT_ION, get_ion
+
+
+def load_nonradiative_rates(filepath):
+    """
+    Lee tasas no radiativas: columnas From, To, W_nr (s⁻¹) y opcionalmente Sample.
+    Devuelve {(from, to): W} o {muestra: {(from, to): W}} si hay columna Sample.
+    """
+    try:
+        df = pd.read_csv(filepath, sep=r'\s+', comment='#')
+        if 'Sample' in df.columns:
+            return {s: {(r.From, r.To): float(r.W_nr) for r in g.itertuples()} for s, g in df.groupby('Sample')}
+        return {(r.From, r.To): float(r.W_nr) for r in df.itertuples()}
+    except Exception as e:
+        raise ValueError(f"Error en archivo de tasas no radiativas: {e}")
+
+
+def collect_levels(rad_sum, nonrad=None, pump_transitions=None, ion=DEFAULT_ION):
+    """
+    Lista de niveles presentes en las tablas radiativas, tasas no radiativas y bombeo:
+    el fundamental del ion primero, luego sus niveles habituales en orden de energía
+    (Ion.levels) y al final los que no estén en el registro, por orden alfabético.
+    """
+    ion = get_ion(ion)
+    levels = {ion.ground}
+    for df in rad_sum.values():
+        if df.empty: continue
+        levels.update(df['SLJ']); levels.update(df["S'L'J'"])
+    for rates in _iter_rate_dicts(nonrad):
+        for a, b in rates: levels.update((a, b))
+    for p in pump_transitions or []:
+        levels.update((p['from'], p['to']))
+    known = [lvl for lvl in ion.levels if lvl in levels]
+    return known + sorted(levels - set(known))
+
+
+def _iter_rate_dicts(nonrad):
+    if not nonrad: return []
+    first = next(iter(nonrad))
+    return list(nonrad.values()) if not isinstance(first, tuple) else [nonrad]
+
+
+def build_rate_matrix(levels, rad_df=None, nonrad_rates=None):
+    """Matriz K (L x L) de procesos espontáneos: radiativos (A) más no radiativos (W_nr)."""
+    pos = {lvl: k for k, lvl in enumerate(levels)}
+    K = np.zeros((len(levels), len(levels)))
+    if rad_df is not None and not rad_df.empty:
+        i = rad_df['SLJ'].map(pos).to_numpy()
+        j = rad_df["S'L'J'"].map(pos).to_numpy()
+        np.add.at(K, (j, i), rad_df['A'].to_numpy(dtype=float))
+    for (a, b), w in (nonrad_rates or {}).items():
+        K[pos[b], pos[a]] += w
+    K[np.diag_indices_from(K)] -= K.sum(axis=0) - np.diag(K)
+    return K
+
+
+def build_pump_matrix(levels, pump_transitions, lambda_ex):
+    """
+    Matriz de bombeo por unidad de intensidad (W/cm²): R = σ·I·λ/(h·c).
+    pump_transitions: lista de {'from', 'to', 'sigma'} (σ en cm²), p. ej. GSA y ESA.
+    """
+    pos = {lvl: k for k, lvl in enumerate(levels)}
+    photon_flux_per_W = 1e7 * (lambda_ex * 1e-7) / (H * C)   # fotones/(s·cm²) por W/cm² (1 W = 1e7 erg/s)
+    P = np.zeros((len(levels), len(levels)))
+    for p in pump_transitions:
+        i, j = pos[p['from']], pos[p['to']]
+        r = p['sigma'] * photon_flux_per_W
+        P[j, i] += r
+        P[i, i] -= r
+    return P
+
+
+def solve_steady_state(K, P, intensities):
+    """
+    Poblaciones estacionarias normalizadas (Σ N = 1).
+    K, P: arrays (S, L, L) o (L, L); intensities: array (I,) en W/cm².
+    Devuelve un array (S, I, L).
+    """
+    K, P = np.asarray(K, dtype=float), np.asarray(P, dtype=float)
+    if K.ndim == 2: K = K[None]
+    if P.ndim == 2: P = np.broadcast_to(P, K.shape)
+    intensities = np.atleast_1d(np.asarray(intensities, dtype=float))
+    # (S, I, L, L): una matriz por punto de operación, construida por broadcasting
+    M = K[:, None] + intensities[None, :, None, None] * P[:, None]
+    # Se reemplaza la última ecuación por la conservación de la población
+    M[..., -1, :] = 1.0
+    rhs = np.zeros(M.shape[:-1]); rhs[..., -1] = 1.0
+    try:
+        return np.linalg.solve(M, rhs[..., None])[..., 0]
+    except np.linalg.LinAlgError:
+        raise ValueError("Sistema singular: algún nivel no tiene vías de desexcitación.")
+
+
+def run_population_sweep(rad_sum, pump_transitions, lambda_ex, intensities, nonrad=None, ion=DEFAULT_ION):
+    """
+    Barrido de poblaciones para todas las muestras de rad_sum y todas las intensidades.
+    nonrad: {(from, to): W} común o {muestra: {(from, to): W}}.
+    ion: símbolo del registro de iones (fija el fundamental y el orden de los niveles).
+    Devuelve (niveles, muestras, poblaciones[S, I, L]).
+    """
+    samples = [s for s, df in rad_sum.items() if not df.empty]
+    if not samples:
+        raise ValueError("No hay tablas radiativas para construir las ecuaciones de tasa.")
+    levels = collect_levels({s: rad_sum[s] for s in samples}, nonrad, pump_transitions, ion)
+    per_sample = nonrad and not isinstance(next(iter(nonrad)), tuple)
+    K = np.stack([build_rate_matrix(levels, rad_sum[s], nonrad.get(s) if per_sample else nonrad) for s in samples])
+
+    # Niveles excitados sin ninguna salida harían singular el sistema
+    stuck = [levels[k] for k in range(1, len(levels)) if np.any(K[:, k, k] == 0)]
+    if stuck:
+        raise ValueError(f"Niveles sin desexcitación (seleccione sus transiciones radiativas o añada W_nr): {', '.join(stuck)}")
+
+    P = build_pump_matrix(levels, pump_transitions, lambda_ex)
+    pops = solve_steady_state(K, P, intensities)
+    return levels, samples, pops
+
+
+def populations_to_frame(levels, samples, intensities, pops):
+    """Tabla larga (Sample, I, nivel...) para mostrar o exportar un barrido."""
+    intensities = np.atleast_1d(intensities)
+    S, I, L = pops.shape
+    df = pd.DataFrame(pops.reshape(S * I, L), columns=levels)
+    df.insert(0, 'I (W/cm²)', np.tile(intensities, S))
+    df.insert(0, 'Sample', np.repeat(samples, I))
+    return df
@@ -0,0 +1,202 @@
+"""
+Registro indexado de muestras.
+
+Las muestras se definen por las columnas del archivo de osciladores y se
+buscan por nombre exacto (diccionario), nunca por subcadena: 'SAMPLE1' no
+captura 'emision_SAMPLE10.txt'. El registro une las tres fuentes de datos de
+cada muestra:
+
+* columna de f_exp en el archivo de osciladores,
+* fila de coeficientes del archivo de Sellmeier (mismo nombre, o el indicado
+  en la columna Sellmeier del manifiesto cuando los nombres difieren),
+* espectro(s) de emisión, vinculados por manifiesto, por patrón
+  ('emision_{sample}.txt') o por tokens del nombre de archivo.
+
+La vinculación de una carpeta es una sola pasada de os.scandir con una
+búsqueda O(1) por archivo.
+"""
+import os
+import re
+import pandas as pd
+
+SAMPLE_FIELD = "{sample}"
+DEFAULT_SPECTRUM_PATTERN = "emision_{sample}.txt"
+_TOKEN_SEP = re.compile(r"[_\-\s]+")
+_EXCITATION = re.compile(r"^(\d+(?:\.\d+)?)nm$", re.IGNORECASE)
+
+
+def excitation_from_filename(fname):
+    """λ_ex de un nombre de archivo con un token '<número>nm' (p. ej. emision_A_980nm.txt -> 980.0), o None."""
+    for tok in _TOKEN_SEP.split(os.path.splitext(fname)[0]):
+        m = _EXCITATION.match(tok)
+        if m:
+            return float(m.group(1))
+    return None
+
+
+def merge_links(emission_dict, links, lambda_ex):
+    """
+    Añade vínculos nuevos a emission_dict. Si alguno es una serie {λ_ex: ruta}, la
+    entrada de esa muestra pasa a ser una serie (una ruta previa queda a lambda_ex).
+    """
+    merged = dict(emission_dict)
+    for s_name, val in links.items():
+        old = merged.get(s_name)
+        if isinstance(val, dict):
+            base = dict(old) if isinstance(old, dict) else ({float(lambda_ex): old} if old else {})
+            base.update(val)
+            merged[s_name] = base
+        elif isinstance(old, dict):
+            merged[s_name] = {**old, float(lambda_ex): val}
+        else:
+            merged[s_name] = val
+    return merged
+
+
+def pattern_regex(pattern):
+    """'emision_{sample}.txt' -> regex con el grupo 'sample' (el resto del patrón es literal, admite * y ?)."""
+    if pattern.count(SAMPLE_FIELD) != 1:
+        raise ValueError(f"El patrón debe contener exactamente un {SAMPLE_FIELD}: {pattern}")
+    head, tail = pattern.split(SAMPLE_FIELD)
+    lit = lambda p: re.escape(p).replace(r"\*", ".*").replace(r"\?", ".")
+    return re.compile(f"^{lit(head)}(?P<sample>.+?){lit(tail)}$")
+
+
+class SampleRegistry:
+    """
+    Muestras del análisis con búsqueda exacta por nombre.
+    sellmeier_aliases: {muestra: nombre de la fila de Sellmeier} para nombres distintos.
+    """
+
+    def __init__(self, samples, sellmeier_aliases=None):
+        self.samples = [str(s) for s in samples]
+        self._index = {s: i for i, s in enumerate(self.samples)}
+        if len(self._index) != len(self.samples):
+            dup = sorted({s for s in self.samples if self.samples.count(s) > 1})
+            raise ValueError(f"Muestras duplicadas en el archivo de osciladores: {', '.join(dup)}")
+        self.sellmeier_aliases = dict(sellmeier_aliases or {})
+        self._max_tokens = max((len(_TOKEN_SEP.split(s)) for s in self.samples), default=1)
+
+    @classmethod
+    def from_oscillator_file(cls, p_osc, sellmeier_aliases=None):
+        from . import data_io
+        _, _, s_names, _ = data_io.load_oscillator_data(p_osc)
+        if s_names is None:
+            raise ValueError("No se pudo leer el archivo de osciladores.")
+        return cls(s_names, sellmeier_aliases)
+
+    def __len__(self):
+        return len(self.samples)
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def index(self, name):
+        """Columna de f_exp de la muestra (KeyError si no existe)."""
+        return self._index[name]
+
+    # --- Sellmeier ---
+
+    def sellmeier_coeffs(self, sell_co, name):
+        """Coeficientes de Sellmeier de una muestra (fila con su nombre o su alias), o None."""
+        from .physics_core import sample_coeffs
+        return sample_coeffs(sell_co, name, self.sellmeier_aliases)
+
+    # --- Espectros ---
+
+    def match_file(self, fname):
+        """
+        Muestra de un nombre de archivo por coincidencia exacta de tokens
+        (separados por _, - o espacios; el punto no separa). Si varias muestras distintas coinciden
+        con la misma longitud, el archivo es ambiguo y se devuelve None.
+        """
+        tokens = [t for t in _TOKEN_SEP.split(os.path.splitext(fname)[0]) if t]
+        best, best_len, ambiguous = None, 0, False
+        for i in range(len(tokens)):
+            for j in range(i + 1, min(i + self._max_tokens, len(tokens)) + 1):
+                # Se prueban todos los separadores posibles entre tokens de la ventana
+                for cand in self._joins(tokens[i:j]):
+                    if cand in self._index:
+                        n = j - i
+                        if n > best_len:
+                            best, best_len, ambiguous = cand, n, False
+                        elif n == best_len and cand != best:
+                            ambiguous = True
+        return None if ambiguous else best
+
+    @staticmethod
+    def _joins(tokens):
+        if len(tokens) == 1:
+            return tokens
+        return {sep.join(tokens) for sep in ("_", "-", " ")}
+
+    def link_files(self, paths, by_excitation=False, lambda_ex=None):
+        """
+        Vincula una lista de rutas en una pasada.
+        Devuelve (vínculos {muestra: ruta}, rutas sin muestra o ambiguas). Con
+        by_excitation los vínculos son series {muestra: {λ_ex: ruta}}, con λ_ex tomada
+        del token '<número>nm' del nombre (o lambda_ex si no lo tiene).
+        """
+        links, unmatched = {}, []
+        for p in paths:
+            fname = os.path.basename(p)
+            match = self.match_file(fname)
+            if match is None:
+                unmatched.append(p)
+            elif by_excitation:
+                l = excitation_from_filename(fname)
+                links.setdefault(match, {})[l if l is not None else float(lambda_ex)] = p
+            else:
+                links[match] = p
+        return links, unmatched
+
+    def link_directory(self, folder, pattern=DEFAULT_SPECTRUM_PATTERN):
+        """
+        Vincula todos los archivos de folder que cumplen pattern ('emision_{sample}.txt')
+        con una sola pasada de os.scandir. Devuelve (vínculos, archivos que cumplen el
+        patrón pero cuya muestra no está en el registro).
+        """
+        rx = pattern_regex(pattern)
+        links, unmatched = {}, []
+        with os.scandir(folder) as it:
+            for entry in it:
+                m = rx.match(entry.name)
+                if m is None or not entry.is_file():
+                    continue
+                if m.group("sample") in self._index:
+                    links[m.group("sample")] = entry.path
+                else:
+                    unmatched.append(entry.path)
+        return links, unmatched
+
+    def link_manifest(self, manifest_path):
+        """
+        Manifiesto de espectros: columnas Sample y File (ruta absoluta o relativa al
+        manifiesto) y, opcionalmente, Sellmeier (fila de coeficientes si su nombre
+        difiere del de la muestra) y Excitation (λ_ex en nm; con ella los vínculos son
+        series {muestra: {λ_ex: ruta}}). Actualiza los alias de Sellmeier del registro.
+        Devuelve (vínculos, muestras del manifiesto que no están en el registro).
+        """
+        try:
+            df = pd.read_csv(manifest_path, sep=r'\s+', comment='#', dtype=str)
+            missing = [c for c in ['Sample', 'File'] if c not in df.columns]
+            if missing:
+                raise ValueError(f"faltan columnas {missing}")
+        except Exception as e:
+            raise ValueError(f"Error en manifiesto de espectros: {e}")
+        base = os.path.dirname(os.path.abspath(manifest_path))
+        links, unknown = {}, []
+        has_sell, has_ex = 'Sellmeier' in df.columns, 'Excitation' in df.columns
+        for row in df.itertuples(index=False):
+            if row.Sample not in self._index:
+                unknown.append(row.Sample)
+                continue
+            if isinstance(row.File, str) and row.File not in ("-", ""):
+                path = row.File if os.path.isabs(row.File) else os.path.join(base, row.File)
+                if has_ex:
+                    links.setdefault(row.Sample, {})[float(row.Excitation)] = path
+                else:
+                    links[row.Sample] = path
+            if has_sell and isinstance(row.Sellmeier, str) and row.Sellmeier != "-":
+                self.sellmeier_aliases[row.Sample] = row.Sellmeier
+        return links, unknown
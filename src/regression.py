@@ -0,0 +1,540 @@
+"""
+Arnés de regresión numérica.
+
+Comprueba que los resultados publicados no cambian al adoptar los caminos
+optimizados del motor:
+
+* Ejemplo: ejecuta data_original/example y compara con las tablas de Res/
+  (escritas con 4 decimales), columna a columna. Las tablas radiativas y de
+  sección eficaz necesitan la matriz de emisión interna
+  (data_original/EmMatrixElements_Er.txt) o la indicada con --em.
+* Equivalencia de caminos: sobre el ejemplo y sobre conjuntos sintéticos más
+  grandes, compara una copia independiente del bucle original (muestra a
+  muestra, fila a fila con iterrows, sin backend de núcleos) con el camino por lotes, el pool de procesos, la malla preprocesada
+  identidad, el modo de incertidumbres y el ResultSet columnar. La malla
+  preprocesada se comprueba también con un espectro que solo cubre parte de una banda.
+* Rejillas de diseño: DesignTable.lookup coincide con la evaluación exacta en
+  los nodos y da NaN fuera de los ejes tabulados.
+
+Uso:
+    python -m src.regression [--example DIR] [--em ARCHIVO] [--synthetic N] [--workers K]
+"""
+import argparse
+import io
+import os
+import re
+import sys
+import tempfile
+import warnings
+import numpy as np
+import pandas as pd
+
+from . import data_io
+from .export import build_export_tables, CS_COLUMNS
+from .constants import H, C, M, E, PI, J_GROUND_ER
+from .physics_core import (run_full_analysis, jo_entry, calculate_refractive_index, calculate_S_ed_exp,
+                           sample_coeffs, RAD_COLUMNS)
+from .utils import SELLMEIER_MODEL_1, PRETTY_NAMES
+
+# Tolerancias: las tablas de Res/ tienen 4 decimales; los caminos optimizados deben coincidir casi bit a bit
+RES_TOL = {"rtol": 0.0, "atol": 5.001e-5}
+PATH_TOL = {"rtol": 1e-10, "atol": 0.0}
+# Preprocesado que deja los espectros intactos (solo el remuestreo en la malla común)
+IDENTITY_PREPROCESS = {"baseline": "none", "smooth_window": 0, "clip_negative": False, "normalize": "none"}
+
+# Matriz de emisión interna (la que usan la interfaz y run_analysis, y con la que se generó example/Res)
+INTERNAL_EM_MATRIX = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                  "data_original", "EmMatrixElements_Er.txt")
+
+# Bandas de emisión usadas para las comparaciones (mismo formato que JuddOfeltApp.user_bands)
+DEFAULT_BANDS = [
+    {"initial": "⁴F₉/₂", "final": "⁴I₁₅/₂", "initial_slug": "4F9/2", "final_slug": "4I15/2", "range_min": 640.0, "range_max": 680.0},
+    {"initial": "⁴S₃/₂", "final": "⁴I₁₅/₂", "initial_slug": "4S3/2", "final_slug": "4I15/2", "range_min": 533.0, "range_max": 564.0},
+]
+DEFAULT_LEVELS = ['2H11/2', '4S3/2', '4F9/2', '4I11/2', '4I13/2']
+
+# Matriz de emisión reducida para los conjuntos sintéticos (J L S J' L' S' ν U2 U4 U6)
+SYNTHETIC_EM_MATRIX = """\
+5.5 5 0.5 7.5 6 1.5 19150 0.7125 0.4125 0.0925
+5.5 5 0.5 6.5 6 1.5 12600 0.0204 0.1173 0.0255
+1.5 0 1.5 7.5 6 1.5 18350 0 0 0.2211
+1.5 0 1.5 6.5 6 1.5 11850 0 0 0.3462
+1.5 0 1.5 5.5 6 1.5 8150 0 0.0037 0.0795
+4.5 3 1.5 7.5 6 1.5 15250 0 0.5354 0.4618
+4.5 3 1.5 6.5 6 1.5 8700 0.0096 0.1170 1.4325
+4.5 3 1.5 5.5 6 1.5 5000 0.0671 0.0088 1.2611
+6.5 6 1.5 7.5 6 1.5 6500 0.0195 0.1173 1.4316
+5.5 6 1.5 7.5 6 1.5 10200 0.0282 0.0003 0.3953
+5.5 6 1.5 6.5 6 1.5 3700 0.021 0.11 1.04
+"""
+
+
+# ---------------------------------------------------------------------------
+# Comparación de tablas
+# ---------------------------------------------------------------------------
+
+def compare_frames(table, ref, new, rtol, atol, keys=None):
+    """
+    Compara dos tablas columna a columna. Con keys se emparejan las filas por
+    esas columnas; si no, por posición. Devuelve una lista de dicts (una fila
+    del informe por columna).
+    """
+    rows = []
+    if keys:
+        merged = ref.merge(new, on=keys, how='outer', suffixes=('_ref', '_new'), indicator=True)
+        unmatched = int((merged['_merge'] != 'both').sum())
+        if unmatched:
+            rows.append({'table': table, 'column': '(filas)', 'n': len(merged), 'max_abs': np.nan,
+                         'max_rel': np.nan, 'ok': False, 'note': f"{unmatched} filas sin pareja"})
+        merged = merged[merged['_merge'] == 'both']
+        pairs = [(c, merged[f"{c}_ref"], merged[f"{c}_new"]) for c in ref.columns if c not in keys and c in new.columns]
+    else:
+        if len(ref) != len(new):
+            return [{'table': table, 'column': '(filas)', 'n': max(len(ref), len(new)), 'max_abs': np.nan,
+                     'max_rel': np.nan, 'ok': False, 'note': f"{len(ref)} filas de referencia, {len(new)} calculadas"}]
+        pairs = [(c, ref[c].reset_index(drop=True), new[c].reset_index(drop=True)) for c in ref.columns if c in new.columns]
+
+    for col in [c for c in ref.columns if c not in new.columns and c not in (keys or [])]:
+        rows.append({'table': table, 'column': col, 'n': 0, 'max_abs': np.nan, 'max_rel': np.nan,
+                     'ok': False, 'note': "columna ausente"})
+    for col, a, b in pairs:
+        a_num, b_num = pd.to_numeric(a, errors='coerce'), pd.to_numeric(b, errors='coerce')
+        if a_num.notna().all() and b_num.notna().all():
+            a_arr, b_arr = a_num.to_numpy(dtype=float), b_num.to_numpy(dtype=float)
+            diff = np.abs(a_arr - b_arr)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                rel = np.where(a_arr != 0, diff / np.abs(a_arr), np.where(diff > 0, np.inf, 0.0))
+            ok = bool(np.all(diff <= atol + rtol * np.abs(a_arr)))
+            rows.append({'table': table, 'column': col, 'n': len(diff), 'max_abs': diff.max(initial=0.0),
+                         'max_rel': rel.max(initial=0.0), 'ok': ok, 'note': ""})
+        else:
+            bad = int((a.astype(str).str.strip() != b.astype(str).str.strip()).sum())
+            rows.append({'table': table, 'column': col, 'n': len(a), 'max_abs': np.nan, 'max_rel': np.nan,
+                         'ok': bad == 0, 'note': f"{bad} valores distintos" if bad else ""})
+    return rows
+
+
+def compare_results(label, ref, new, tol):
+    """Compara dos tuplas (jo, rad, cs) con las mismas tablas que la exportación."""
+    ref_tables = {(k, s): df for k, s, df, _ in build_export_tables(*ref)}
+    new_tables = {(k, s): df for k, s, df, _ in build_export_tables(*new)}
+    rows = []
+    for key, ref_df in ref_tables.items():
+        name = f"{label}: {key[0]}" + (f"[{key[1]}]" if key[1] is not None else "")
+        if key not in new_tables:
+            rows.append({'table': name, 'column': '(tabla)', 'n': 0, 'max_abs': np.nan, 'max_rel': np.nan,
+                         'ok': False, 'note': "tabla ausente"})
+            continue
+        keys = ['Glass', 'Level'] if key[0] == "Cross_Sections" else None
+        rows += compare_frames(name, ref_df, new_tables[key][list(ref_df.columns)], keys=keys, **tol)
+    return rows
+
+
+# ---------------------------------------------------------------------------
+# Camino de referencia
+# ---------------------------------------------------------------------------
+
+def _ref_refractive_index(wavelength_nm, coeffs_list, model_type):
+    """Sellmeier término a término, como el código original (sin backend de núcleos)."""
+    wl_arr = np.atleast_1d(np.asarray(wavelength_nm, dtype=float))
+    base, loop_coeffs = (1.0, coeffs_list) if model_type == SELLMEIER_MODEL_1 else (coeffs_list[0], coeffs_list[1:])
+    sum_term = 0.0
+    for k in range(0, len(loop_coeffs), 2):
+        sum_term += loop_coeffs[k] / (1 - loop_coeffs[k + 1] / wl_arr**2)
+    result = np.sqrt(base + sum_term)
+    return result[0] if np.isscalar(wavelength_nm) else result
+
+
+def _ref_smd(J1, L1, S1, J2, L2, S2):
+    """S_md escalar con las reglas de selección ΔL=0, ΔS=0, ΔJ=0,±1 (copia del código original)."""
+    if S1 != S2 or L1 != L2 or (J1 == 0 and J2 == 0):
+        return 0
+    mu_B_sq = ((E * H) / (4 * PI * M * C))**2
+    if J2 == J1:
+        if J1 == 0: return 0
+        g = 1 + (J1*(J1+1) + S1*(S1+1) - L1*(L1+1)) / (2*J1*(J1+1))
+        matrix_element_sq = g**2 * J1 * (J1+1) * (2*J1+1)
+    elif J2 == J1 - 1:
+        matrix_element_sq = ((S1+L1+1)**2 - J1**2) * (J1**2 - (L1-S1)**2) / (4*J1)
+    elif J2 == J1 + 1:
+        matrix_element_sq = ((S1+L1+1)**2 - (J1+1)**2) * ((J1+1)**2 - (L1-S1)**2) / (4*(J1+1))
+    else:
+        return 0
+    return mu_B_sq * matrix_element_sq
+
+
+def _ref_rates(group, omegas, coeffs, sm):
+    """A_ed y A_md de un grupo de filas J -> J' con el bucle iterrows original."""
+    A_ed, A_md = 0, 0
+    J_init = group['J_initial'].iloc[0]
+    for _, row in group.iterrows():
+        nu, U_sq = row['wavenumber_cm_1'], row[['U2', 'U4', 'U6']].to_numpy(dtype=float)
+        n = _ref_refractive_index(1e7/nu, coeffs, sm)
+        t_const = (64*PI**4*nu**3)/(3*H*(2*J_init+1))
+        A_ed += (t_const*((n*(n**2+2)**2)/9))*(E**2 * np.sum(omegas * U_sq))
+        A_md += t_const*(n**3)*_ref_smd(row['J_initial'], row['L_initial'], row['S_initial'],
+                                        row['J_final'], row['L_final'], row['S_final'])
+    return A_ed, A_md
+
+
+def _ref_radiative(omegas, coeffs, em_df, sm, sel_levels):
+    """Tabla radiativa (A_ed, A_md, A, β_R, A_T, τ_R) con el bucle por nivel y por fila original."""
+    results = []
+    for level_name in sel_levels:
+        trans = em_df[em_df['Initial_Name_Slug'] == level_name]
+        if trans.empty: continue
+        A_total, temp_calcs = 0, []
+        for f_name, group in trans.groupby('Final_Name_Slug'):
+            A_ed, A_md = _ref_rates(group, omegas, coeffs, sm)
+            temp_calcs.append({'SLJ': level_name, "S'L'J'": f_name, 'A_ed': A_ed, 'A_md': A_md, 'A': A_ed + A_md})
+            A_total += A_ed + A_md
+        if A_total > 0:
+            for calc in temp_calcs:
+                results.append({**calc, 'β_R (%)': (calc['A']/A_total)*100, 'A_T (s⁻¹)': A_total,
+                                'τ_R (ms)': (1/A_total)*1000})
+    return pd.DataFrame(results, columns=RAD_COLUMNS) if results else pd.DataFrame()
+
+
+def _ref_cross_section(spectrum, band_info, A_rad, coeffs, sm):
+    """Füchtbauer-Ladenburg sobre el DataFrame del espectro, como el código original."""
+    band = spectrum[(spectrum['wavelength_nm'] >= band_info['range_min']) & (spectrum['wavelength_nm'] <= band_info['range_max'])]
+    if len(band) < 2: return None
+    wl_nm, I = band['wavelength_nm'].to_numpy(dtype=float), band['intensity'].to_numpy(dtype=float)
+    lam_cm = wl_nm*1e-7
+    den_int = np.trapz(lam_cm*I*_ref_refractive_index(wl_nm, coeffs, sm)**2, x=lam_cm)
+    if den_int == 0: return None
+    max_idx = np.argmax(I)
+    max_I, max_lam_cm = I[max_idx], lam_cm[max_idx]
+    sigma = A_rad*(max_lam_cm**5)*max_I/(8*PI*C*den_int)
+    if not np.isfinite(sigma): return None
+    d_lam = np.trapz(I, x=wl_nm)/max_I if max_I > 0 else 0
+    return {'Level': f"{band_info['initial']} → {band_info['final']}", 'E_exp (cm⁻¹)': 1/max_lam_cm,
+            'Δλ_eff (nm)': d_lam, 'σₑ (x10⁻²¹ cm²)': sigma*1e21, 'ΔG (x10⁻²⁸ cm³)': sigma*(d_lam*1e-7)*1e28}
+
+
+def reference_analysis(p_osc, p_abs, p_sell, emission_dict, sm, do_rad_calc, p_em, sel_trans_rad,
+                       do_cs_calc, user_bands, lambda_ex):
+    """
+    Bucle original muestra a muestra, nivel a nivel y fila a fila (iterrows), sin
+    lotes, sin procesos, sin registros de sesión y sin el backend de núcleos: una
+    copia independiente del cálculo, referencia de todas las comparaciones.
+    """
+    wl, f_exp, s_names, band_labels = data_io.load_oscillator_data(p_osc)
+    abs_mx = data_io.load_abs_matrix_elements(p_abs)
+    sell_co = data_io.load_sellmeier_coeffs(p_sell, sm)
+    em_mx = data_io.load_emission_matrix_elements(p_em) if (do_rad_calc or do_cs_calc) and p_em and os.path.exists(p_em) else None
+
+    jo_res, rad_sum, cs_res = [], {}, []
+    for i, s_name in enumerate(s_names):
+        coeffs = sample_coeffs(sell_co, s_name)
+        if coeffs is None: continue
+        n_vals = _ref_refractive_index(wl, coeffs, sm)
+        s_ed = calculate_S_ed_exp(wl, f_exp[:, i], n_vals)
+        omegas, _, _, _ = np.linalg.lstsq(abs_mx, s_ed, rcond=None)
+        s_ed_calc = abs_mx @ omegas
+        f_cal = s_ed_calc*(8*PI**2*M*C*(n_vals**2+2)**2)/(3*H*wl*1e-7*(2*J_GROUND_ER+1)*9*n_vals)
+        rms_f = np.sqrt(np.sum((f_exp[:, i] - f_cal)**2)/(len(wl) - 3))
+        jo_res.append(jo_entry({"Sample": s_name, "Ω": omegas*1e20,
+                                "rms_S": np.sqrt(np.sum((s_ed - s_ed_calc)**2)/(len(s_ed) - 3))*1e20,
+                                "rms_f": rms_f*1e6, "rms_perc": rms_f/np.sqrt(np.sum(f_exp[:, i]**2)/len(wl))*100,
+                                "f_exp": f_exp[:, i]*1e6, "f_cal": f_cal*1e6}, wl, band_labels))
+        rad_df = None
+        if do_rad_calc and em_mx is not None:
+            rad_df = rad_sum[s_name] = _ref_radiative(omegas, coeffs, em_mx, sm, sel_trans_rad)
+        em_f = emission_dict.get(s_name)
+        if not (do_cs_calc and em_mx is not None and user_bands and em_f and os.path.exists(em_f)): continue
+        spectrum = data_io.load_emission_spectrum(em_f)
+        if spectrum is None: continue
+        spectrum = spectrum.sort_values('wavelength_nm', kind='mergesort')
+        for band in user_bands:
+            A_rad = 0
+            if rad_df is not None and not rad_df.empty:
+                match = rad_df[(rad_df['SLJ'] == band['initial_slug']) & (rad_df["S'L'J'"] == band['final_slug'])]
+                A_rad = match['A'].iloc[0] if not match.empty else 0
+            if A_rad == 0:
+                group = em_mx[(em_mx['Initial_Name_Slug'] == band['initial_slug']) & (em_mx['Final_Name_Slug'] == band['final_slug'])]
+                A_rad = sum(_ref_rates(group, omegas, coeffs, sm)) if not group.empty else 0
+            if not A_rad > 0: continue
+            analysis = _ref_cross_section(spectrum, band, A_rad, coeffs, sm)
+            if analysis:
+                analysis.update({'Glass': s_name, 'λ_ex (nm)': lambda_ex})
+                cs_res.append(analysis)
+    return jo_res, rad_sum, cs_res
+
+
+def _shared_grid(emission_dict):
+    """True si todos los espectros comparten exactamente la misma malla (la malla preprocesada es entonces la original)."""
+    grids = []
+    for path in emission_dict.values():
+        df = data_io.load_emission_spectrum(path)
+        if df is None: continue
+        grids.append(df.sort_values('wavelength_nm', kind='mergesort')['wavelength_nm'].to_numpy())
+    return bool(grids) and all(len(g) == len(grids[0]) and np.array_equal(g, grids[0]) for g in grids)
+
+
+def check_paths(label, args, workers=2):
+    """Compara el camino de referencia con todos los caminos optimizados de run_full_analysis."""
+    ref = reference_analysis(*args)
+    paths = {"lotes": {}, "incertidumbre": {"uncertainty": True}, "columnar": {"columnar": True}}
+    if workers and workers > 1:
+        paths[f"procesos x{workers}"] = {"n_workers": workers}
+    if args[8] and _shared_grid(args[3]):
+        paths["preprocesado identidad"] = {"preprocess": IDENTITY_PREPROCESS}
+    rows = []
+    for name, kwargs in paths.items():
+        out = run_full_analysis(*args, **kwargs)
+        rows += compare_results(f"{label} / {name}", ref, out if isinstance(out, tuple) else (out, None, None), PATH_TOL)
+    return rows
+
+
+def check_partial_coverage(label, out_dir, example_dir, seed=0):
+    """
+    Malla preprocesada con un espectro que solo cubre la mitad de una banda: σₑ se
+    integra sobre su tramo medido y coincide con el bucle original sobre el archivo corto.
+    """
+    args = list(synthetic_dataset(out_dir, 4, example_dir, seed, mixed_grids=False))
+    band = args[9][0]
+    mid = 0.5 * (band['range_min'] + band['range_max'])
+    s_name, path = next(iter(args[3].items()))
+    with open(path) as f:
+        lines = [l for l in f if float(l.split()[0]) >= mid]
+    short = os.path.join(out_dir, f"emision_{s_name}_corto.txt")
+    with open(short, 'w') as f:
+        f.writelines(lines)
+    args[3] = {**args[3], s_name: short}
+    with warnings.catch_warnings():
+        # La otra banda queda fuera del espectro corto: el aviso es el esperado
+        warnings.simplefilter("ignore", RuntimeWarning)
+        out = run_full_analysis(*args, preprocess=IDENTITY_PREPROCESS)
+    return compare_results(f"{label} / preprocesado, espectro corto", reference_analysis(*args), out, PATH_TOL)
+
+
+# ---------------------------------------------------------------------------
+# Ejemplo publicado
+# ---------------------------------------------------------------------------
+
+def _read_cross_sections(path):
+    """Cross_Sections.txt alineado: la columna Level contiene espacios ('⁴F₉/₂ → ⁴I₁₅/₂')."""
+    pattern = re.compile(r'^\s*(\S+)\s+(\S+)\s+(\S+\s*→\s*\S+)\s+(\S+)\s+(\S+)\s+(\S+)\s+(\S+)\s*$')
+    with open(path, encoding='utf-8') as f:
+        lines = f.read().splitlines()[1:]
+    rows = [pattern.match(line).groups() for line in lines if line.strip()]
+    df = pd.DataFrame(rows, columns=CS_COLUMNS)
+    for c in CS_COLUMNS:
+        if c not in ('Glass', 'Level'):
+            df[c] = df[c].astype(float)
+    return df
+
+
+def load_reference_tables(res_dir):
+    """Lee las tablas de Res/ con las mismas claves que build_export_tables."""
+    tables = {}
+    for fname in sorted(os.listdir(res_dir)):
+        path, stem = os.path.join(res_dir, fname), os.path.splitext(fname)[0]
+        if stem == "JO_Parameters":
+            tables[("JO_Parameters", None)] = pd.read_csv(path, sep='\t')
+        elif stem.startswith("Oscillator_Strengths_"):
+            # La tabla termina donde empiezan los indicadores de calidad ('# ...'); se ignoran
+            # líneas vacías para tolerar finales de línea \r\r\n de archivos escritos en Windows
+            with open(path, encoding='utf-8') as f:
+                lines = [l for l in f.read().splitlines() if l.strip()]
+            end = next((k for k, l in enumerate(lines) if l.startswith('#')), len(lines))
+            tables[("Oscillator_Strengths", stem[len("Oscillator_Strengths_"):])] = pd.read_csv(
+                io.StringIO("\n".join(lines[:end])), sep='\t')
+        elif stem.startswith("Radiative_Props_"):
+            # Texto alineado: los nombres de columna llevan espacios simples, los valores no
+            with open(path, encoding='utf-8') as f:
+                columns = re.split(r'\s{2,}', f.readline().strip())
+            tables[("Radiative_Props", stem[len("Radiative_Props_"):])] = pd.read_csv(
+                path, sep=r'\s+', skiprows=1, header=None, names=columns)
+        elif stem == "Cross_Sections":
+            tables[("Cross_Sections", None)] = _read_cross_sections(path)
+    return tables
+
+
+def example_args(example_dir, em_path=None, bands=None, levels=None):
+    """Argumentos de run_full_analysis para el conjunto de ejemplo."""
+    d = example_dir
+    emission = {}
+    for fname in sorted(os.listdir(d)):
+        if fname.startswith("emision_") and fname.endswith(".txt"):
+            emission[fname[len("emision_"):-4]] = os.path.join(d, fname)
+    has_em = bool(em_path) and os.path.exists(em_path)
+    return (os.path.join(d, "Oscillator_Er.txt"), os.path.join(d, "AbsMatrixElements_C1968.txt"),
+            os.path.join(d, "Sellmeier.txt"), emission, SELLMEIER_MODEL_1,
+            has_em, em_path, levels or DEFAULT_LEVELS, has_em, bands or DEFAULT_BANDS, 980.0)
+
+
+def _reference_levels(reference):
+    """Niveles iniciales (slugs) de las tablas radiativas de Res/, en orden de aparición."""
+    slug_of = {pretty: slug for slug, pretty in PRETTY_NAMES.items()}
+    levels = {}
+    for (key, _), df in reference.items():
+        if key == "Radiative_Props":
+            levels.update(dict.fromkeys(slug_of.get(l, l) for l in df['SLJ']))
+    return list(levels) or None
+
+
+def check_example(example_dir, em_path=INTERNAL_EM_MATRIX, bands=None):
+    """
+    Compara el resultado del ejemplo con Res/. Las tablas radiativas y de sección
+    eficaz se calculan para todos los niveles de Res/ con la matriz de emisión
+    em_path (por defecto la interna, data_original/EmMatrixElements_Er.txt, con la
+    que se generó Res/); si no existe, esas tablas se informan como omitidas
+    indicando la ruta que falta.
+    """
+    reference = load_reference_tables(os.path.join(example_dir, "Res"))
+    args = example_args(example_dir, em_path, bands, _reference_levels(reference))
+    jo, rad, cs = run_full_analysis(*args)
+    computed = {(k, s): df for k, s, df, _ in build_export_tables(jo, rad, cs)}
+    missing_em = not (em_path and os.path.exists(em_path))
+    rows = []
+    for key, ref_df in reference.items():
+        name = f"Res: {key[0]}" + (f"[{key[1]}]" if key[1] is not None else "")
+        if key not in computed:
+            note = f"no calculada: falta la matriz de emisión {em_path}" if missing_em else "no calculada (banda sin datos)"
+            rows.append({'table': name, 'column': '(tabla)', 'n': 0, 'max_abs': np.nan, 'max_rel': np.nan,
+                         'ok': None, 'note': note})
+            continue
+        new_df = computed[key]
+        keys = {"Radiative_Props": ["SLJ", "S'L'J'"], "Cross_Sections": ['Glass', 'Level']}.get(key[0])
+        if keys:
+            # Solo las transiciones/bandas calculadas en ambas tablas
+            common = ref_df[keys].merge(new_df[keys], on=keys)
+            rows += compare_frames(name, ref_df.merge(common, on=keys), new_df.merge(common, on=keys),
+                                   keys=keys, **RES_TOL)
+        else:
+            rows += compare_frames(name, ref_df, new_df.set_axis(ref_df.columns, axis=1), **RES_TOL)
+    return rows, args
+
+
+# ---------------------------------------------------------------------------
+# Conjuntos sintéticos
+# ---------------------------------------------------------------------------
+
+def synthetic_dataset(out_dir, n_samples, example_dir, seed=0, mixed_grids=True):
+    """
+    Escribe un conjunto sintético de n_samples muestras con la estructura del ejemplo:
+    Ωλ y Sellmeier aleatorios, f_exp generado por el modelo JO con ruido y espectros
+    gaussianos (la mitad en una malla desplazada si mixed_grids). Devuelve los argumentos
+    de run_full_analysis.
+    """
+    rng = np.random.default_rng(seed)
+    wl, _, _, band_labels = data_io.load_oscillator_data(os.path.join(example_dir, "Oscillator_Er.txt"))
+    abs_mx = data_io.load_abs_matrix_elements(os.path.join(example_dir, "AbsMatrixElements_C1968.txt"))
+    base = data_io.load_sellmeier_coeffs(os.path.join(example_dir, "Sellmeier.txt"), SELLMEIER_MODEL_1)
+    base = np.asarray(next(iter(base.values())), dtype=float)
+
+    names = [f"SYN{k:04d}" for k in range(n_samples)]
+    omegas = np.column_stack([rng.uniform(1, 20, n_samples), rng.uniform(0.5, 3, n_samples),
+                              rng.uniform(0.5, 3, n_samples)]) * 1e-20
+    coeffs = base * (1 + 0.02 * rng.standard_normal((n_samples, len(base))))
+
+    f_exp = np.empty((len(wl), n_samples))
+    for k in range(n_samples):
+        n_vals = calculate_refractive_index(wl, coeffs[k], SELLMEIER_MODEL_1)
+        # S_ed es lineal en f: f = S / S(f=1)
+        f_exp[:, k] = (abs_mx @ omegas[k]) / calculate_S_ed_exp(wl, np.ones(len(wl)), n_vals)
+    f_exp *= 1 + 0.05 * rng.standard_normal(f_exp.shape)
+
+    osc = pd.DataFrame({'Transition': band_labels, 'Band': wl})
+    for k, s_name in enumerate(names):
+        osc[s_name] = f_exp[:, k]
+    p_osc = os.path.join(out_dir, "Oscillator_SYN.txt")
+    osc.to_csv(p_osc, sep='\t', index=False, float_format='%.6E')
+    p_sell = os.path.join(out_dir, "Sellmeier_SYN.txt")
+    pd.DataFrame(coeffs, index=pd.Index(names, name='Sample'),
+                 columns=[f"c{j}" for j in range(len(base))]).to_csv(p_sell, sep='\t', float_format='%.8f')
+    p_em = os.path.join(out_dir, "EmMatrixElements_SYN.txt")
+    with open(p_em, 'w') as f:
+        f.write(SYNTHETIC_EM_MATRIX)
+
+    emission = {}
+    for k, s_name in enumerate(names):
+        step = 0.2 if (not mixed_grids or k % 2 == 0) else 0.25
+        grid = np.arange(500.0, 700.0 + step / 2, step)
+        I = sum(a * np.exp(-((grid - c) / w) ** 2) for a, c, w in
+                [(1.0, 545 + rng.normal(0, 2), 8), (0.6, 660 + rng.normal(0, 2), 10), (0.2, 525, 5)])
+        I = I + 0.01 * rng.standard_normal(len(grid))
+        path = os.path.join(out_dir, f"emision_{s_name}.txt")
+        np.savetxt(path, np.column_stack([grid, I]), fmt='%.4f %.6e')
+        emission[s_name] = path
+    return (p_osc, os.path.join(example_dir, "AbsMatrixElements_C1968.txt"), p_sell, emission, SELLMEIER_MODEL_1,
+            True, p_em, DEFAULT_LEVELS, True, DEFAULT_BANDS, 980.0)
+
+
+# ---------------------------------------------------------------------------
+# Rejillas de diseño
+# ---------------------------------------------------------------------------
+
+def check_design(label, args):
+    """
+    DesignTable.lookup frente a la evaluación exacta: en los nodos de la rejilla
+    debe coincidir, y fuera de los ejes de Ω o de n debe dar NaN (sin extrapolar).
+    """
+    from .design import DesignBasis, omega_grid
+    basis = DesignBasis(data_io.load_emission_matrix_elements(args[6]), args[7], [1.8, 2.0])
+    table = basis.tabulate(np.linspace(0.5, 8, 6), np.linspace(0.5, 3, 4), np.linspace(0.5, 3, 4))
+    nodes = omega_grid(*table.axes)
+    tau, _ = table.lookup(nodes)
+    exact = basis.evaluate(nodes)['τ_R (ms)']
+    diff = np.abs(tau - exact)
+    rows = [{'table': f"{label}: diseño", 'column': 'τ_R en los nodos', 'n': diff.size, 'max_abs': diff.max(),
+             'max_rel': (diff / np.abs(exact)).max(), 'ok': bool(np.allclose(tau, exact, rtol=1e-12, atol=0)), 'note': ""}]
+    outside = np.array([[18.0, 1.0, 1.0], [4.0, 0.1, 1.0], [4.0, 1.0, 3.5]])
+    for column, (tau, beta) in (("fuera de los ejes de Ω", table.lookup(outside)),
+                                ("fuera del eje de n", table.lookup(nodes[:3], n=2.5))):
+        rows.append({'table': f"{label}: diseño", 'column': column, 'n': tau.size + beta.size, 'max_abs': np.nan,
+                     'max_rel': np.nan, 'ok': bool(np.isnan(tau).all() and np.isnan(beta).all()),
+                     'note': "" if np.isnan(tau).all() else "se extrapola"})
+    return rows
+
+
+# ---------------------------------------------------------------------------
+# Informe
+# ---------------------------------------------------------------------------
+
+def format_report(rows):
+    df = pd.DataFrame(rows, columns=['table', 'column', 'n', 'max_abs', 'max_rel', 'ok', 'note'])
+    df['ok'] = df['ok'].map({True: "OK", False: "FALLO", None: "omitido"})
+    with pd.option_context('display.max_rows', None, 'display.width', 200, 'display.max_colwidth', 60):
+        return df.to_string(index=False, float_format=lambda v: f"{v:.3e}")
+
+
+def main(argv=None):
+    default_example = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data_original", "example")
+    parser = argparse.ArgumentParser(description="Arnés de regresión numérica de FROPA")
+    parser.add_argument("--example", default=default_example, help="carpeta del ejemplo (con Res/)")
+    parser.add_argument("--em", default=INTERNAL_EM_MATRIX,
+                        help="matriz de emisión para comparar las tablas radiativas y de sección eficaz de Res/ "
+                             "(por defecto la interna, data_original/EmMatrixElements_Er.txt)")
+    parser.add_argument("--synthetic", type=int, nargs="*", default=[50], help="tamaños de los conjuntos sintéticos")
+    parser.add_argument("--workers", type=int, default=2, help="procesos para el camino paralelo (0 para omitirlo)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--quiet", action="store_true", help="mostrar solo fallos y comprobaciones omitidas")
+    opts = parser.parse_args(argv)
+
+    rows, args = check_example(opts.example, opts.em)
+    rows += check_paths("ejemplo", args, opts.workers)
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in opts.synthetic:
+            out = os.path.join(tmp, f"syn_{n}")
+            os.makedirs(out)
+            syn_args = synthetic_dataset(out, n, opts.example, opts.seed)
+            rows += check_paths(f"sintético n={n}", syn_args, opts.workers)
+            rows += check_design(f"sintético n={n}", syn_args)
+        out = os.path.join(tmp, "parcial")
+        os.makedirs(out)
+        rows += check_partial_coverage("sintético", out, opts.example, opts.seed)
+
+    print(format_report([r for r in rows if r['ok'] is not True] if opts.quiet else rows))
+    failed = [r for r in rows if r['ok'] is False]
+    skipped = [r for r in rows if r['ok'] is None]
+    if skipped:
+        print(f"\nAVISO: {len(skipped)} tablas de Res/ sin comparar ({skipped[0]['note']}).")
+    print(f"\n{len(rows) - len(failed) - len(skipped)} comprobaciones correctas, {len(failed)} fallos.")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
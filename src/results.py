@@ -0,0 +1,362 @@
+"""
+Resultados en formato columnar.
+
+run_full_analysis devuelve por defecto jo_res (lista de dicts, cada uno con su
+DataFrame f_table), rad_sum (dict de DataFrames) y cs_res (lista de dicts). Con
+cientos de muestras eso son miles de objetos pandas pequeños. ResultSet guarda
+lo mismo en arrays contiguos:
+
+* por muestra: Ω [S, 3], (rms_S, rms_f, rms_perc) [S, 3], f_exp y f_cal [S, B],
+* radiativas: filas de todas las muestras concatenadas [R, 6] con offsets por
+  muestra y los niveles como códigos sobre una lista de slugs,
+* secciones eficaces: [C, 4] con códigos de muestra y de banda y λ_ex,
+
+en float64 o float32 (dtype). Las tablas se crean solo al pedirlas (jo_frame,
+f_table, rad_frame, cs_frame, export_tables), con las mismas columnas que la
+salida clásica; to_legacy / from_legacy convierten entre ambos formatos.
+"""
+import numpy as np
+import pandas as pd
+
+JO_COLUMNS = ["Ω2", "Ω4", "Ω6"]
+RMS_COLUMNS = ["rms_S", "rms_f", "rms_perc"]
+RAD_LEVEL_COLUMNS = ['SLJ', "S'L'J'"]
+RAD_VALUE_COLUMNS = ['A_ed', 'A_md', 'A', 'β_R (%)', 'A_T (s⁻¹)', 'τ_R (ms)']
+CS_VALUE_COLUMNS = ['E_exp (cm⁻¹)', 'Δλ_eff (nm)', 'σₑ (x10⁻²¹ cm²)', 'ΔG (x10⁻²⁸ cm³)']
+_JO_KEYS = {"Sample", "f_table", *JO_COLUMNS, *RMS_COLUMNS}
+
+
+def _codes(values, categories):
+    """Códigos int32 de values sobre la lista categories (que se amplía con los valores nuevos)."""
+    index = {c: k for k, c in enumerate(categories)}
+    out = np.empty(len(values), dtype=np.int32)
+    for r, v in enumerate(values):
+        if v not in index:
+            index[v] = len(categories)
+            categories.append(v)
+        out[r] = index[v]
+    return out
+
+
+def _column(values):
+    """Columna extra: float si todos los valores son numéricos, si no objeto."""
+    arr = np.asarray(values)
+    return arr if arr.dtype.kind in 'fiub' else np.asarray(values, dtype=object)
+
+
+class ResultSet:
+    """
+    Resultados de run_full_analysis(..., columnar=True).
+    samples: nombres en el orden del análisis; band_labels y wl: bandas de absorción.
+    """
+
+    def __init__(self, samples, band_labels, wl, omega, rms, f_exp, f_cal,
+                 rad_samples=(), rad_offsets=(0,), levels=(), rad_levels=None, rad_values=None,
+                 cs_samples=(), cs_sample=None, cs_bands=(), cs_band=None, cs_lambda=None, cs_values=None,
+                 jo_extra=None, rad_extra=None, cs_extra=None, dtype=np.float64):
+        dtype = np.dtype(dtype)
+        if dtype.kind != 'f':
+            raise ValueError(f"dtype debe ser de coma flotante: {dtype}")
+        self.dtype = dtype
+        self.samples = list(samples)
+        self.band_labels = list(band_labels)
+        self.wl = np.asarray(wl, dtype=float)
+        self.omega = np.asarray(omega, dtype=dtype).reshape(-1, 3)
+        self.rms = np.asarray(rms, dtype=dtype).reshape(-1, 3)
+        self.f_exp = np.asarray(f_exp, dtype=dtype).reshape(len(self.samples), len(self.band_labels))
+        self.f_cal = np.asarray(f_cal, dtype=dtype).reshape(len(self.samples), len(self.band_labels))
+        # Tablas radiativas: muestras con tabla (en orden) y sus filas [offsets[k], offsets[k+1])
+        self.rad_samples = list(rad_samples)
+        self.rad_offsets = np.asarray(rad_offsets, dtype=np.int64)
+        self.levels = list(levels)
+        n_rad = int(self.rad_offsets[-1])
+        self.rad_levels = np.zeros((0, 2), np.int32) if rad_levels is None else np.asarray(rad_levels, np.int32).reshape(n_rad, 2)
+        self.rad_values = np.asarray(np.zeros((0, 6)) if rad_values is None else rad_values, dtype=dtype).reshape(n_rad, 6)
+        # Secciones eficaces: una fila por (muestra, λ_ex, banda)
+        self.cs_samples, self.cs_bands = list(cs_samples), list(cs_bands)
+        self.cs_sample = np.zeros(0, np.int32) if cs_sample is None else np.asarray(cs_sample, np.int32)
+        self.cs_band = np.zeros(0, np.int32) if cs_band is None else np.asarray(cs_band, np.int32)
+        self.cs_lambda = np.zeros(0) if cs_lambda is None else np.asarray(cs_lambda, dtype=float)
+        self.cs_values = np.asarray(np.zeros((0, 4)) if cs_values is None else cs_values, dtype=dtype).reshape(-1, 4)
+        # Columnas adicionales (δΩ, cov_Ω, columnas δ, τ_meas...): {nombre: array}
+        self.jo_extra = dict(jo_extra or {})
+        self.rad_extra = dict(rad_extra or {})
+        self.cs_extra = dict(cs_extra or {})
+        self._index = {s: k for k, s in enumerate(self.samples)}
+        self._rad_index = {s: k for k, s in enumerate(self.rad_samples)}
+
+    # --- Construcción ---
+
+    @classmethod
+    def from_columns(cls, wl, band_labels, jo_raw, rad_cols, cs_rows, dtype=np.float64):
+        """
+        Construye el conjunto a partir de las salidas columnar de analyze_sample.
+        jo_raw: lista de dicts (Sample, Ω, rms_*, f_exp, f_cal); rad_cols: {muestra: columnas
+        de radiative_arrays o None}; cs_rows: lista de dicts como cs_res.
+        """
+        samples = [r["Sample"] for r in jo_raw]
+        B = len(band_labels)
+        omega = np.array([r["Ω"] for r in jo_raw], dtype=float).reshape(-1, 3)
+        rms = np.array([[r[c] for c in RMS_COLUMNS] for r in jo_raw], dtype=float).reshape(-1, 3)
+        f_exp = np.array([r["f_exp"] for r in jo_raw], dtype=float).reshape(len(jo_raw), B)
+        f_cal = np.array([r["f_cal"] for r in jo_raw], dtype=float).reshape(len(jo_raw), B)
+        return cls(samples, band_labels, wl, omega, rms, f_exp, f_cal,
+                   **cls._pack_rad(rad_cols), **cls._pack_cs(cs_rows), dtype=dtype)
+
+    @classmethod
+    def from_legacy(cls, jo_res, rad_sum, cs_res, wl=None, band_labels=None, dtype=np.float64):
+        """Convierte la salida clásica (jo_res, rad_sum, cs_res) en un ResultSet."""
+        samples = [r["Sample"] for r in jo_res]
+        if jo_res:
+            ft = jo_res[0]["f_table"]
+            wl = ft["λ (nm)"].to_numpy(dtype=float) if wl is None else wl
+            band_labels = ft["Transición"].tolist() if band_labels is None else band_labels
+        wl = np.zeros(0) if wl is None else wl
+        band_labels = band_labels or []
+        B = len(band_labels)
+        omega = np.array([[r[c] for c in JO_COLUMNS] for r in jo_res], dtype=float).reshape(-1, 3)
+        rms = np.array([[r[c] for c in RMS_COLUMNS] for r in jo_res], dtype=float).reshape(-1, 3)
+        f_exp = np.array([r["f_table"]["f_exp (x10⁻⁶)"].to_numpy(dtype=float) for r in jo_res], dtype=float).reshape(len(jo_res), B)
+        f_cal = np.array([r["f_table"]["f_cal (x10⁻⁶)"].to_numpy(dtype=float) for r in jo_res], dtype=float).reshape(len(jo_res), B)
+        extra_keys = list(dict.fromkeys(k for r in jo_res for k in r if k not in _JO_KEYS))
+        jo_extra = {k: np.array([r[k] for r in jo_res]) for k in extra_keys if all(k in r for r in jo_res)}
+        rad = cls._pack_rad({s: (None if df.empty else {c: df[c].to_numpy() for c in df.columns})
+                             for s, df in (rad_sum or {}).items()})
+        return cls(samples, band_labels, wl, omega, rms, f_exp, f_cal, **rad, **cls._pack_cs(cs_res or []),
+                   jo_extra=jo_extra, dtype=dtype)
+
+    @classmethod
+    def from_sample(cls, wl, band_labels, jo, rad, cs_rows, dtype=np.float64):
+        """Conjunto de una sola muestra a partir de lo que recibe on_sample (salida columnar o clásica)."""
+        rad_cols = {} if rad is None else {jo["Sample"]: rad}
+        if "f_table" in jo:
+            return cls.from_legacy([jo], rad_cols, cs_rows, wl, band_labels, dtype)
+        return cls.from_columns(wl, band_labels, [jo], rad_cols, cs_rows, dtype)
+
+    @staticmethod
+    def _pack_rad(rad_cols):
+        """{muestra: columnas o None} -> argumentos rad_* del constructor."""
+        rad_samples, offsets, levels = list(rad_cols), [0], []
+        codes, values, extra = [], [], {}
+        blocks = [cols for cols in rad_cols.values() if cols is not None]
+        extra_names = list(dict.fromkeys(c for cols in blocks for c in cols
+                                         if c not in RAD_LEVEL_COLUMNS and c not in RAD_VALUE_COLUMNS))
+        for cols in rad_cols.values():
+            n = 0 if cols is None else len(cols['SLJ'])
+            offsets.append(offsets[-1] + n)
+            if not n: continue
+            codes.append(np.column_stack([_codes(list(cols[c]), levels) for c in RAD_LEVEL_COLUMNS]))
+            values.append(np.column_stack([np.asarray(cols[c], dtype=float) for c in RAD_VALUE_COLUMNS]))
+            for c in extra_names:
+                extra.setdefault(c, []).append(cols[c] if c in cols else np.full(n, np.nan))
+        rad_levels = np.concatenate(codes) if codes else None
+        rad_values = np.concatenate(values) if values else None
+        rad_extra = {c: _column(np.concatenate([np.asarray(v, dtype=object) for v in parts]).tolist())
+                     for c, parts in extra.items()}
+        return dict(rad_samples=rad_samples, rad_offsets=offsets, levels=levels, rad_levels=rad_levels,
+                    rad_values=rad_values, rad_extra=rad_extra)
+
+    @staticmethod
+    def _pack_cs(cs_rows):
+        """Lista de dicts de cs_res -> argumentos cs_* del constructor."""
+        cs_samples, cs_bands = [], []
+        sample = _codes([r['Glass'] for r in cs_rows], cs_samples)
+        band = _codes([r['Level'] for r in cs_rows], cs_bands)
+        lam = np.array([r.get('λ_ex (nm)', np.nan) for r in cs_rows], dtype=float)
+        values = np.array([[r[c] for c in CS_VALUE_COLUMNS] for r in cs_rows], dtype=float).reshape(-1, 4)
+        known = {'Glass', 'Level', 'λ_ex (nm)', *CS_VALUE_COLUMNS}
+        names = list(dict.fromkeys(c for r in cs_rows for c in r if c not in known))
+        # Las columnas δ ausentes en una fila quedan como NaN (como al guardar un proyecto)
+        cs_extra = {c: _column([r.get(c, np.nan) for r in cs_rows]) for c in names}
+        return dict(cs_samples=cs_samples, cs_sample=sample, cs_bands=cs_bands, cs_band=band, cs_lambda=lam,
+                    cs_values=values, cs_extra=cs_extra)
+
+    @classmethod
+    def concat(cls, parts):
+        """
+        Une varios conjuntos con las mismas bandas (p. ej. muestras recalculadas y
+        previas). Las columnas adicionales que falten en alguna parte quedan como NaN.
+        """
+        parts = [p for p in parts if p is not None]
+        first = parts[0]
+        levels, cs_samples, cs_bands = [], [], []
+        rad_levels, cs_sample, cs_band, offsets = [], [], [], [0]
+        for p in parts:
+            # Los códigos de cada parte se traducen a las listas comunes
+            if len(p.rad_levels):
+                rad_levels.append(_codes(p.levels, levels)[p.rad_levels])
+            offsets.extend(offsets[-1] + p.rad_offsets[1:])
+            cs_sample.append(_codes(p.cs_samples, cs_samples)[p.cs_sample])
+            cs_band.append(_codes(p.cs_bands, cs_bands)[p.cs_band])
+
+        def extras(name, sizes):
+            keys = list(dict.fromkeys(k for p in parts for k in getattr(p, name)))
+            out = {}
+            for k in keys:
+                tmpl = next(getattr(p, name)[k] for p in parts if k in getattr(p, name))
+                out[k] = np.concatenate([getattr(p, name)[k] if k in getattr(p, name)
+                                         else np.full((size,) + tmpl.shape[1:], np.nan) for p, size in zip(parts, sizes)])
+            return out
+
+        return cls(sum((p.samples for p in parts), []), first.band_labels, first.wl,
+                   np.concatenate([p.omega for p in parts]), np.concatenate([p.rms for p in parts]),
+                   np.concatenate([p.f_exp for p in parts]), np.concatenate([p.f_cal for p in parts]),
+                   sum((p.rad_samples for p in parts), []), offsets, levels,
+                   np.concatenate(rad_levels) if rad_levels else None,
+                   np.concatenate([p.rad_values for p in parts]),
+                   cs_samples, np.concatenate(cs_sample), cs_bands, np.concatenate(cs_band),
+                   np.concatenate([p.cs_lambda for p in parts]), np.concatenate([p.cs_values for p in parts]),
+                   extras("jo_extra", [len(p) for p in parts]),
+                   extras("rad_extra", [len(p.rad_values) for p in parts]),
+                   extras("cs_extra", [len(p.cs_sample) for p in parts]), dtype=first.dtype)
+
+    def take(self, samples):
+        """
+        Subconjunto con las muestras indicadas que existan, en ese orden. Las secciones
+        eficaces quedan agrupadas por λ_ex (muestras y bandas en orden dentro de cada λ_ex).
+        """
+        names = [s for s in samples if s in self._index]
+        rows = np.array([self._index[s] for s in names], dtype=np.int64)
+        rad_names = [s for s in samples if s in self._rad_index]
+        spans = [(self.rad_offsets[k], self.rad_offsets[k + 1]) for k in (self._rad_index[s] for s in rad_names)]
+        rad_rows = np.concatenate([np.arange(lo, hi) for lo, hi in spans]) if spans else np.zeros(0, np.int64)
+        offsets = np.concatenate([[0], np.cumsum([hi - lo for lo, hi in spans], dtype=np.int64)])
+        rank = {s: k for k, s in enumerate(names)}
+        sample_rank = np.array([rank.get(s, -1) for s in self.cs_samples], dtype=np.int64)
+        cs_rank = sample_rank[self.cs_sample] if len(self.cs_sample) else np.zeros(0, np.int64)
+        keep = np.flatnonzero(cs_rank >= 0)
+        cs_rows = keep[np.lexsort((keep, cs_rank[keep], np.nan_to_num(self.cs_lambda[keep], nan=0.0)))]
+        return ResultSet(names, self.band_labels, self.wl, self.omega[rows], self.rms[rows],
+                         self.f_exp[rows], self.f_cal[rows], rad_names, offsets, self.levels,
+                         self.rad_levels[rad_rows], self.rad_values[rad_rows],
+                         self.cs_samples, self.cs_sample[cs_rows], self.cs_bands, self.cs_band[cs_rows],
+                         self.cs_lambda[cs_rows], self.cs_values[cs_rows],
+                         {k: v[rows] for k, v in self.jo_extra.items()},
+                         {k: v[rad_rows] for k, v in self.rad_extra.items()},
+                         {k: v[cs_rows] for k, v in self.cs_extra.items()}, dtype=self.dtype)
+
+    # --- Acceso ---
+
+    def __len__(self):
+        return len(self.samples)
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def index(self, name):
+        """Posición de la muestra (KeyError si no existe)."""
+        return self._index[name]
+
+    @property
+    def nbytes(self):
+        """Memoria ocupada por los arrays numéricos."""
+        arrays = [self.wl, self.omega, self.rms, self.f_exp, self.f_cal, self.rad_offsets, self.rad_levels,
+                  self.rad_values, self.cs_sample, self.cs_band, self.cs_lambda, self.cs_values,
+                  *self.jo_extra.values(), *self.rad_extra.values(), *self.cs_extra.values()]
+        return sum(a.nbytes for a in arrays)
+
+    def astype(self, dtype):
+        """Copia del conjunto con los valores en otro dtype (p. ej. np.float32)."""
+        return ResultSet(self.samples, self.band_labels, self.wl, self.omega, self.rms, self.f_exp, self.f_cal,
+                         self.rad_samples, self.rad_offsets, self.levels, self.rad_levels, self.rad_values,
+                         self.cs_samples, self.cs_sample, self.cs_bands, self.cs_band, self.cs_lambda, self.cs_values,
+                         self.jo_extra, self.rad_extra, self.cs_extra, dtype=dtype)
+
+    def has_uncertainty(self):
+        return "δΩ2" in self.jo_extra
+
+    def rad_row_labels(self):
+        """(muestra, SLJ, S'L'J') de cada fila radiativa, como arrays de objetos alineados con rad_values."""
+        levels = np.asarray(self.levels, dtype=object)
+        samples = np.repeat(np.asarray(self.rad_samples, dtype=object), np.diff(self.rad_offsets))
+        return samples, levels[self.rad_levels[:, 0]], levels[self.rad_levels[:, 1]]
+
+    # --- Vistas (DataFrames creados bajo demanda, siempre en float64) ---
+
+    def jo_frame(self):
+        """Sample, Ω2, Ω4, Ω6, rms_S, rms_f, rms_perc (+ δΩ en modo de incertidumbre)."""
+        df = pd.DataFrame(np.hstack([self.omega, self.rms]).astype(float), columns=JO_COLUMNS + RMS_COLUMNS)
+        df.insert(0, "Sample", self.samples)
+        for k, v in self.jo_extra.items():
+            if v.ndim == 1:
+                df[k] = v
+        return df
+
+    def f_table(self, sample):
+        """Tabla de fuerzas de oscilador de una muestra (mismas columnas que jo_res[k]['f_table'])."""
+        from .ions import pretty_name
+        k = self._index[sample]
+        return pd.DataFrame({
+            "Transición": [pretty_name(b) for b in self.band_labels],
+            "λ (nm)": self.wl.round(2),
+            "f_exp (x10⁻⁶)": self.f_exp[k].astype(float),
+            "f_cal (x10⁻⁶)": self.f_cal[k].astype(float),
+        })
+
+    def rad_frame(self, sample):
+        """Tabla radiativa de una muestra (DataFrame vacío si no tiene filas, None si no se calculó)."""
+        k = self._rad_index.get(sample)
+        if k is None:
+            return None
+        lo, hi = self.rad_offsets[k], self.rad_offsets[k + 1]
+        if lo == hi:
+            return pd.DataFrame()
+        levels = np.asarray(self.levels, dtype=object)
+        df = pd.DataFrame({'SLJ': levels[self.rad_levels[lo:hi, 0]], "S'L'J'": levels[self.rad_levels[lo:hi, 1]]})
+        for j, c in enumerate(RAD_VALUE_COLUMNS):
+            df[c] = self.rad_values[lo:hi, j].astype(float)
+        for c, v in self.rad_extra.items():
+            df[c] = v[lo:hi]
+        return df
+
+    def cs_frame(self):
+        """Secciones eficaces con las columnas de export.CS_COLUMNS (+ columnas δ)."""
+        from .export import CS_COLUMNS
+        if not len(self.cs_sample):
+            return pd.DataFrame(columns=CS_COLUMNS)
+        data = {'λ_ex (nm)': self.cs_lambda,
+                'Glass': np.asarray(self.cs_samples, dtype=object)[self.cs_sample],
+                'Level': np.asarray(self.cs_bands, dtype=object)[self.cs_band]}
+        data.update({c: self.cs_values[:, j].astype(float) for j, c in enumerate(CS_VALUE_COLUMNS)})
+        data.update(self.cs_extra)
+        return pd.DataFrame(data)[CS_COLUMNS + list(self.cs_extra)]
+
+    def export_tables(self):
+        """Mismas tablas que export.build_export_tables sobre la salida clásica."""
+        from .utils import PRETTY_NAMES
+        df_jo = self.jo_frame()[["Sample", "Ω2", "Ω4", "Ω6", "rms_S"]]
+        df_jo.columns = ["Muestra", "Omega2_x10-20", "Omega4_x10-20", "Omega6_x10-20", "rms_S_LineStrength"]
+        if self.has_uncertainty():
+            for k in ("2", "4", "6"):
+                df_jo[f"dOmega{k}_x10-20"] = self.jo_extra[f"δΩ{k}"].astype(float)
+        tables = [("JO_Parameters", None, df_jo, [])]
+        for k, s in enumerate(self.samples):
+            footer = [f"# Indicadores de Calidad para {s}:",
+                      f"rms_f_Oscillator_Strength (x10-6):\t{float(self.rms[k, 1]):.4f}",
+                      f"RMS_Error_Total (%):\t{float(self.rms[k, 2]):.2f}"]
+            tables.append(("Oscillator_Strengths", s, self.f_table(s), footer))
+        for s in self.rad_samples:
+            df = self.rad_frame(s)
+            if df.empty: continue
+            df['SLJ'] = df['SLJ'].map(PRETTY_NAMES).fillna(df['SLJ'])
+            df["S'L'J'"] = df["S'L'J'"].map(PRETTY_NAMES).fillna(df["S'L'J'"])
+            tables.append(("Radiative_Props", s, df, []))
+        if len(self.cs_sample):
+            tables.append(("Cross_Sections", None, self.cs_frame(), []))
+        return tables
+
+    def to_legacy(self):
+        """(jo_res, rad_sum, cs_res) con el formato clásico de run_full_analysis."""
+        jo_res = []
+        for k, s in enumerate(self.samples):
+            entry = {"Sample": s}
+            entry.update({c: float(self.omega[k, j]) for j, c in enumerate(JO_COLUMNS)})
+            entry.update({c: float(self.rms[k, j]) for j, c in enumerate(RMS_COLUMNS)})
+            entry["f_table"] = self.f_table(s)
+            entry.update({c: v[k] for c, v in self.jo_extra.items()})
+            jo_res.append(entry)
+        rad_sum = {s: self.rad_frame(s) for s in self.rad_samples}
+        cs_res = []
+        for row in self.cs_frame().to_dict("records"):
+            cs_res.append({c: v for c, v in row.items() if not (c.startswith('δ') and pd.isna(v))})
+        return jo_res, rad_sum, cs_res
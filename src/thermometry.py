@@ -0,0 +1,168 @@
+"""
+Termometría por cociente de intensidades de fluorescencia (FIR).
+
+Los niveles ²H₁₁/₂ y ⁴S₃/₂ del Er³⁺ están acoplados térmicamente, así que el
+cociente de sus bandas verdes sigue una distribución de Boltzmann:
+
+    FIR(T) = I(²H₁₁/₂) / I(⁴S₃/₂) = B·exp(−ΔE / k_B·T)
+
+Los espectros del manifiesto (miles por muestra, a distintas T) se integran
+por bloques de THERMOMETRY_CHUNK con physics_core.band_integrals, de modo que
+la memoria no crece con el tamaño del manifiesto, y ln FIR = ln B − (ΔE/k_B)·(1/T)
+se ajusta por mínimos cuadrados para todas las muestras simultáneamente.
+Las sensibilidades son S_a = FIR·ΔE/(k_B·T²) y S_r = 100·ΔE/(k_B·T²) (% K⁻¹).
+
+Uso:  python -m src.thermometry MANIFIESTO [--upper 511 533] [--lower 533 564] [--out CARPETA]
+"""
+import argparse
+import os
+import numpy as np
+import pandas as pd
+
+# Rangos (nm) de las bandas ²H₁₁/₂ → ⁴I₁₅/₂ y ⁴S₃/₂ → ⁴I₁₅/₂
+FIR_UPPER_BAND = (511.0, 533.0)
+FIR_LOWER_BAND = (533.0, 564.0)
+SENSITIVITY_POINTS = 100
+# Espectros integrados por bloque (solo un bloque está en memoria a la vez)
+THERMOMETRY_CHUNK = 512
+
+
+def load_thermometry_manifest(filepath):
+    """
+    Manifiesto de espectros a temperatura variable: columnas Sample, Temperature
+    (K) y File (ruta absoluta o relativa al manifiesto; dos columnas λ (nm) e intensidad).
+    """
+    try:
+        df = pd.read_csv(filepath, sep=r'\s+', comment='#')
+        missing = [c for c in ['Sample', 'Temperature', 'File'] if c not in df.columns]
+        if missing:
+            raise ValueError(f"faltan columnas {missing}")
+        base = os.path.dirname(os.path.abspath(filepath))
+        df['File'] = [f if os.path.isabs(f) else os.path.join(base, f) for f in df['File']]
+        df['Sample'] = df['Sample'].astype(str)
+        df['Temperature'] = pd.to_numeric(df['Temperature'], errors='raise').astype(float)
+        if (df['Temperature'] <= 0).any():
+            raise ValueError("las temperaturas deben estar en K y ser positivas")
+        return df
+    except Exception as e:
+        raise ValueError(f"Error en manifiesto de termometría: {e}")
+
+
+def fir_ratios(spectra, upper=FIR_UPPER_BAND, lower=FIR_LOWER_BAND):
+    """
+    FIR de cada espectro (wl_nm ordenado, intensidad). Devuelve (FIR, I_upper, I_lower);
+    los espectros que no cubren alguna banda o con integrales no positivas dan NaN.
+    """
+    from .physics_core import band_integrals
+    integrals, _ = band_integrals(spectra, [upper, lower])
+    I_up, I_low = integrals[:, 0], integrals[:, 1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fir = np.where((I_up > 0) & (I_low > 0), I_up / I_low, np.nan)
+    return fir, I_up, I_low
+
+
+def fit_boltzmann(sample_idx, T, fir, n_samples):
+    """
+    Ajuste lineal ln FIR = ln B − (ΔE/k_B)·(1/T) de todas las muestras a la vez.
+    sample_idx: muestra de cada punto (0..n_samples−1). Devuelve un dict de arrays
+    [n_samples]: B, ΔE (cm⁻¹), R², n (puntos válidos), T_min, T_max.
+    """
+    from .constants import H, C, K_B
+    sample_idx = np.asarray(sample_idx, dtype=np.intp)
+    T, fir = np.asarray(T, dtype=float), np.asarray(fir, dtype=float)
+    ok = np.isfinite(fir) & (fir > 0) & (T > 0)
+    s, x = sample_idx[ok], 1.0 / T[ok]
+    y = np.log(fir[ok])
+    sums = lambda v: np.bincount(s, weights=v, minlength=n_samples)
+    n, sx, sy = sums(np.ones_like(x)), sums(x), sums(y)
+    sxx, sxy = sums(x * x), sums(x * y)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        den = n * sxx - sx**2
+        slope = np.where(n >= 2, (n * sxy - sx * sy) / den, np.nan)
+        intercept = (sy - slope * sx) / n
+        ss_tot = sums((y - (sy / n)[s])**2)
+        ss_res = sums((y - intercept[s] - slope[s] * x)**2)
+        r2 = np.where(ss_tot > 0, 1 - ss_res / ss_tot, np.nan)
+    T_ok = T[ok]
+    T_min, T_max = np.full(n_samples, np.nan), np.full(n_samples, np.nan)
+    if len(s):
+        np.fmin.at(T_min, s, T_ok)
+        np.fmax.at(T_max, s, T_ok)
+    return {'B': np.exp(intercept), 'ΔE (cm⁻¹)': -slope * K_B / (H * C), 'R²': r2, 'n': n.astype(int),
+            'T_min (K)': T_min, 'T_max (K)': T_max}
+
+
+def sensitivity_curves(fit_df, T_grid=None, n_points=SENSITIVITY_POINTS):
+    """
+    Curvas FIR(T), S_a (K⁻¹) y S_r (% K⁻¹) de cada muestra ajustada, en T_grid o
+    en n_points temperaturas entre su T mínima y máxima medidas.
+    """
+    from .constants import H, C, K_B
+    rows = []
+    for fit in fit_df.to_dict('records'):
+        if not np.isfinite(fit['ΔE (cm⁻¹)']):
+            continue
+        T = np.asarray(T_grid, dtype=float) if T_grid is not None else np.linspace(fit['T_min (K)'], fit['T_max (K)'], n_points)
+        x = fit['ΔE (cm⁻¹)'] * H * C / K_B            # ΔE/k_B en K
+        fir = fit['B'] * np.exp(-x / T)
+        rows.append(pd.DataFrame({'Sample': fit['Sample'], 'T (K)': T, 'FIR': fir,
+                                  'S_a (K⁻¹)': fir * x / T**2, 'S_r (% K⁻¹)': 100 * x / T**2}))
+    cols = ['Sample', 'T (K)', 'FIR', 'S_a (K⁻¹)', 'S_r (% K⁻¹)']
+    return pd.concat(rows, ignore_index=True) if rows else pd.DataFrame(columns=cols)
+
+
+def run_thermometry(manifest_path, upper=FIR_UPPER_BAND, lower=FIR_LOWER_BAND, T_grid=None, prefetch=None,
+                    chunk=THERMOMETRY_CHUNK):
+    """
+    Integra todos los espectros del manifiesto, ajusta la calibración de Boltzmann
+    de cada muestra y calcula sus curvas de sensibilidad.
+    Devuelve (puntos, ajustes, curvas): DataFrames con FIR por espectro, B/ΔE/R²/S_r,max
+    por muestra y S_a/S_r frente a T.
+    """
+    from .constants import H, C, K_B
+    from .pipeline import Prefetcher, read_spectrum, DEFAULT_PREFETCH
+    manifest = load_thermometry_manifest(manifest_path)
+    paths = manifest['File'].tolist()
+    fir = np.full(len(paths), np.nan)
+    I_up, I_low = fir.copy(), fir.copy()
+    chunk = max(int(chunk), 1)
+    # Lectura anticipada: se parsean varios archivos a la vez en segundo plano
+    with Prefetcher(paths, read_spectrum, DEFAULT_PREFETCH if prefetch is None else max(prefetch, 1)) as pf:
+        for start in range(0, len(paths), chunk):
+            loaded = [pf.get(p) for p in paths[start:start + chunk]]
+            rows = start + np.flatnonzero([sp is not None for sp in loaded])
+            if len(rows):
+                fir[rows], I_up[rows], I_low[rows] = fir_ratios([sp for sp in loaded if sp is not None], upper, lower)
+
+    samples = list(dict.fromkeys(manifest['Sample']))
+    index = {s: k for k, s in enumerate(samples)}
+    sample_idx = np.array([index[s] for s in manifest['Sample']], dtype=np.intp)
+    points = pd.DataFrame({'Sample': manifest['Sample'], 'T (K)': manifest['Temperature'],
+                           'I_upper': I_up, 'I_lower': I_low, 'FIR': fir, 'File': paths})
+
+    fit = fit_boltzmann(sample_idx, manifest['Temperature'].to_numpy(), fir, len(samples))
+    fits = pd.DataFrame({'Sample': samples, **fit})
+    curves = sensitivity_curves(fits, T_grid)
+    # S_r es máxima en la temperatura más baja del intervalo medido
+    fits['S_r,max (% K⁻¹)'] = 100 * fits['ΔE (cm⁻¹)'] * H * C / K_B / fits['T_min (K)']**2
+    return points, fits, curves
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calibración FIR (²H₁₁/₂/⁴S₃/₂) por lotes a partir de un manifiesto.")
+    parser.add_argument("manifest")
+    parser.add_argument("--upper", type=float, nargs=2, default=FIR_UPPER_BAND, metavar=("MIN", "MAX"))
+    parser.add_argument("--lower", type=float, nargs=2, default=FIR_LOWER_BAND, metavar=("MIN", "MAX"))
+    parser.add_argument("--out", help="Carpeta donde escribir FIR_Points.tsv, FIR_Calibration.tsv y FIR_Sensitivity.tsv")
+    args = parser.parse_args(argv)
+
+    points, fits, curves = run_thermometry(args.manifest, tuple(args.upper), tuple(args.lower))
+    print(fits.to_string(index=False))
+    if args.out:
+        os.makedirs(args.out, exist_ok=True)
+        for name, df in (("FIR_Points", points), ("FIR_Calibration", fits), ("FIR_Sensitivity", curves)):
+            df.to_csv(os.path.join(args.out, f"{name}.tsv"), sep="\t", index=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Propagación analítica de incertidumbres del ajuste Judd-Ofelt.
+
+La covarianza de Ω se obtiene de la matriz de información del ajuste por
+mínimos cuadrados, Cov(Ω) = s²·(UᵀU)⁻¹ con s² = rms_S², y se propaga de
+forma lineal (Jacobianos) a A_ed, A, β_R, A_T, τ_R y σₑ. La covarianza sale de
+los residuos y UᵀU del mismo ajuste (no se repite). A_ed es lineal en Ω, de modo
+que sus gradientes son A_ed en la base Ω = e_k, calculados con el mismo backend
+de núcleos que A_ed, sin muestreo.
+"""
+import numpy as np
+import pandas as pd
+from .physics_core import calculate_refractive_index, calculate_S_ed_exp, perform_jo_fit, _emission_rows
+from .ions import ion_for_sample
+
+# Columnas de error añadidas a las tablas
+RAD_ERROR_COLUMNS = ['δA_ed', 'δA', 'δβ_R (%)', 'δA_T (s⁻¹)', 'δτ_R (ms)']
+CS_ERROR_COLUMN = 'δσₑ (x10⁻²¹ cm²)'
+
+
+def covariance_from_fit(residuals, UtU):
+    """Cov(Ω) = s²·(UᵀU)⁻¹ a partir de los residuos S_ed y la matriz de información de un ajuste ya hecho."""
+    r = np.asarray(residuals, dtype=float)
+    dof = len(r) - UtU.shape[1]
+    if dof <= 0:
+        return np.full(UtU.shape, np.nan)
+    return (r @ r / dof) * np.linalg.pinv(UtU)
+
+
+def jo_covariance(abs_matrix_elements, S_ed_exp, omegas):
+    """Cov(Ω) (cm⁴) a partir de los residuos del ajuste y la matriz U² de absorción."""
+    U = np.asarray(abs_matrix_elements, dtype=float)
+    return covariance_from_fit(np.asarray(S_ed_exp, dtype=float) - U @ omegas, U.T @ U)
+
+
+def ed_gradients(coeffs, em_df, sm):
+    """
+    ∂A_ed/∂Ω (s⁻¹·cm⁻²) de cada transición nivel -> nivel. A_ed es lineal en Ω, así
+    que la columna k es A_ed evaluado en Ω = e_k con el backend de núcleos activo (el
+    mismo código que da A_ed), sumando todas las filas J -> J' de la matriz de emisión.
+    Devuelve un DataFrame indexado por (nivel inicial, nivel final) con columnas Ω2, Ω4, Ω6.
+    """
+    grad = np.column_stack([_emission_rows(e_k, coeffs, em_df, sm)[0] for e_k in np.eye(3)])
+    df = pd.DataFrame(grad, columns=['Ω2', 'Ω4', 'Ω6'])
+    df['initial'], df['final'] = em_df['Initial_Name_Slug'].to_numpy(), em_df['Final_Name_Slug'].to_numpy()
+    return df.groupby(['initial', 'final'], sort=False).sum()
+
+
+def _quad(g, cov):
+    """gᵀ·Σ·g para cada fila de g."""
+    return np.einsum('ri,ij,rj->r', g, cov, g)
+
+
+def propagate_radiative(rad_df, cov, grads):
+    """Añade δA_ed, δA, δβ_R, δA_T y δτ_R (desviaciones estándar) a una tabla radiativa."""
+    if rad_df is None or rad_df.empty:
+        return rad_df
+    df = rad_df.copy()
+    keys = pd.MultiIndex.from_arrays([df['SLJ'], df["S'L'J'"]])
+    g = grads.reindex(keys).fillna(0.0).to_numpy()
+    A = df['A'].to_numpy(dtype=float)
+    A_T = df['A_T (s⁻¹)'].to_numpy(dtype=float)
+    # El gradiente de A_T es la suma de los de todas las transiciones del mismo nivel
+    G_T = pd.DataFrame(g).groupby(df['SLJ'].to_numpy()).transform('sum').to_numpy()
+
+    dA = np.sqrt(_quad(g, cov))
+    dA_T = np.sqrt(_quad(G_T, cov))
+    df['δA_ed'] = dA
+    df['δA'] = dA   # A_md no depende de Ω
+    df['δβ_R (%)'] = 100*np.sqrt(_quad(g/A_T[:, None] - (A/A_T**2)[:, None]*G_T, cov))
+    df['δA_T (s⁻¹)'] = dA_T
+    df['δτ_R (ms)'] = 1000*dA_T/A_T**2
+    return df
+
+
+def propagate_cross_sections(cs_rows, cov_by_sample, grads_by_sample, rates_by_sample, user_bands):
+    """
+    Añade δσₑ a cada fila de cs_res: σₑ es proporcional a A_rad de la banda, así
+    que δσₑ/σₑ = δA/A. rates_by_sample: {muestra: [A_rad por banda]}.
+    """
+    band_of = {f"{b['initial']} → {b['final']}": k for k, b in enumerate(user_bands)}
+    for row in cs_rows:
+        s_name, b = row['Glass'], band_of.get(row['Level'])
+        if b is None or s_name not in cov_by_sample:
+            continue
+        band = user_bands[b]
+        key = (band['initial_slug'], band['final_slug'])
+        grads = grads_by_sample[s_name]
+        if key not in grads.index:
+            continue
+        g = grads.loc[key].to_numpy(dtype=float)[None, :]
+        A = rates_by_sample[s_name][b]
+        row[CS_ERROR_COLUMN] = row['σₑ (x10⁻²¹ cm²)']*np.sqrt(_quad(g, cov_by_sample[s_name]))[0]/A
+    return cs_rows
+
+
+def attach_uncertainties(samples, jo_res, rad_sum, cs_res, wl, f_exp, abs_mx, em_mx, sm, user_bands=None, cs_rates=None, ion=None):
+    """
+    Modo de incertidumbre analítica de run_full_analysis.
+    samples: lista de (columna en f_exp, nombre, coeficientes de Sellmeier), alineada con jo_res.
+    Añade δΩ y la covarianza 'cov_Ω' a jo_res, columnas δ a rad_sum y δσₑ a cs_res (en sitio).
+    Si la entrada ya trae 'cov_Ω' (analyze_sample con covariance=True) se reutiliza
+    la del ajuste original; si no, se repite el ajuste para obtenerla.
+    """
+    covs, grads = {}, {}
+    for (i, s_name, coeffs), jo in zip(samples, jo_res):
+        cov = jo.get('cov_Ω')
+        if cov is None:
+            J_ground = ion_for_sample(ion, s_name).ground_J
+            n_vals = calculate_refractive_index(wl, coeffs, sm)
+            s_ed = calculate_S_ed_exp(wl, f_exp[:, i], n_vals, J_ground)
+            _, _, _, fit_info = perform_jo_fit(s_ed, abs_mx, wl, n_vals, J_ground, full=True)
+            cov = covariance_from_fit(*fit_info)
+        covs[s_name] = cov
+        jo['cov_Ω'] = cov
+        jo['δΩ2'], jo['δΩ4'], jo['δΩ6'] = np.sqrt(np.diag(cov))*1e20
+        if em_mx is not None:
+            grads[s_name] = ed_gradients(coeffs, em_mx, sm)
+            if s_name in rad_sum:
+                rad_sum[s_name] = propagate_radiative(rad_sum[s_name], cov, grads[s_name])
+    if cs_res and user_bands and cs_rates:
+        propagate_cross_sections(cs_res, covs, grads, cs_rates, user_bands)
+    return jo_res, rad_sum, cs_res
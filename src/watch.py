@@ -0,0 +1,165 @@
+"""
+Modo de vigilancia de carpeta.
+
+Se sondea periódicamente una carpeta donde el espectrómetro va dejando
+espectros 'emision_<MUESTRA>.txt' (y, opcionalmente, el archivo de osciladores
+actualizado). Los archivos nuevos o modificados se vinculan a su muestra y se
+recalculan solo las muestras afectadas (ver project.run_project); sus resultados
+se añaden a una tabla acumulada, que puede volcarse a un .tsv a medida que crece.
+
+Uso:  python -m src.watch CARPETA --project proyecto.fropa.npz [--interval 5] [--out resultados.tsv]
+"""
+import argparse
+import fnmatch
+import os
+import time
+import pandas as pd
+from .project import file_signature, run_project, load_project, save_project
+from .registry import SampleRegistry, excitation_from_filename, merge_links
+
+DEFAULT_PATTERN = "emision_*.txt"
+DEFAULT_INTERVAL = 5.0
+
+
+def scan_folder(folder, pattern=DEFAULT_PATTERN):
+    """{ruta: firma} de los archivos de la carpeta que cumplen el patrón."""
+    return {os.path.join(folder, f): file_signature(os.path.join(folder, f))
+            for f in sorted(os.listdir(folder)) if fnmatch.fnmatch(f, pattern)}
+
+
+def summary_rows(results, samples, stamp):
+    """Filas de la tabla acumulada: Ω, rms y σₑ por banda de cada muestra recalculada."""
+    rs = results["set"].take([s for s in results["set"].samples if s in samples])
+    rows = []
+    cs_by = {}
+    cs = rs.cs_frame()
+    n_ex = cs.groupby("Glass")["λ_ex (nm)"].nunique().to_dict() if len(cs) else {}
+    for glass, level, lam, sigma in zip(cs["Glass"], cs["Level"], cs["λ_ex (nm)"], cs["σₑ (x10⁻²¹ cm²)"]):
+        # Con series de excitación se añade λ_ex al nombre de la columna
+        suffix = f" @ {lam:g} nm" if n_ex[glass] > 1 else ""
+        cs_by.setdefault(glass, {})[f"σₑ {level}{suffix}"] = sigma
+    for k, s_name in enumerate(rs.samples):
+        row = {"Hora": stamp, "Sample": s_name, "Ω2": rs.omega[k, 0], "Ω4": rs.omega[k, 1], "Ω6": rs.omega[k, 2],
+               "rms_S": rs.rms[k, 0]}
+        rad = rs.rad_frame(s_name)
+        if rad is not None and not rad.empty:
+            row.update({f"τ_R {lvl} (ms)": tau for lvl, tau in rad.groupby('SLJ', sort=False)['τ_R (ms)'].first().items()})
+        row.update(cs_by.get(s_name, {}))
+        rows.append(row)
+    return rows
+
+
+class FolderWatcher:
+    """
+    Vigila una carpeta y mantiene un proyecto al día recalculando solo lo nuevo.
+    project: proyecto ya calculado (su configuración define el análisis).
+    out_path: .tsv de la tabla acumulada; si ya existe se continúa, y se reescribe
+    entero cuando aparecen columnas nuevas (niveles τ_R o bandas σₑ).
+    """
+
+    def __init__(self, folder, project, pattern=DEFAULT_PATTERN, n_workers=None, out_path=None):
+        if not os.path.isdir(folder):
+            raise ValueError(f"La carpeta no existe: {folder}")
+        self.folder, self.pattern, self.n_workers, self.out_path = folder, pattern, n_workers, out_path
+        self.project = project
+        self.config = dict(project["config"], emission_dict=dict(project["config"].get("emission_dict") or {}))
+        self.seen, self.unmatched, self.rows = {}, set(), []
+        self._out_columns = None
+        if out_path and os.path.exists(out_path) and os.path.getsize(out_path) > 0:
+            # Se continúa la tabla acumulada de una vigilancia anterior
+            previous = pd.read_csv(out_path, sep="\t")
+            self.rows, self._out_columns = previous.to_dict("records"), list(previous.columns)
+
+    @property
+    def table(self):
+        """Tabla acumulada de resultados (una fila por muestra recalculada en cada sondeo)."""
+        return pd.DataFrame(self.rows)
+
+    def _inputs_signature(self):
+        return tuple(file_signature(self.config.get(k)) for k in ("p_abs", "p_sell", "p_em"))
+
+    def _write_rows(self, new_rows):
+        """Vuelca las filas nuevas al .tsv con el esquema de columnas de toda la tabla."""
+        table = self.table
+        columns = list(table.columns)
+        if columns == self._out_columns:
+            pd.DataFrame(new_rows, columns=columns).to_csv(self.out_path, sep="\t", mode="a", header=False, index=False)
+        else:
+            # Columnas nuevas (otro nivel τ_R, otra banda σₑ...): se reescribe la tabla completa
+            table.to_csv(self.out_path, sep="\t", index=False)
+            self._out_columns = columns
+
+    def poll(self):
+        """
+        Un sondeo: vincula archivos nuevos o modificados y recalcula las muestras afectadas.
+        Devuelve la lista de muestras recalculadas (vacía si no hubo cambios).
+        """
+        current = scan_folder(self.folder, self.pattern)
+        current["__osc__"] = file_signature(self.config["p_osc"])
+        current["__inputs__"] = self._inputs_signature()
+        changed = [p for p, sig in current.items() if self.seen.get(p) != sig]
+        if not changed:
+            return []
+        self.seen = current
+
+        pending = set(p for p in changed if p not in ("__osc__", "__inputs__"))
+        # Los archivos sin muestra solo se revinculan si cambia el archivo de osciladores
+        if "__osc__" in changed:
+            pending |= self.unmatched
+        links = {}
+        if pending:
+            registry = SampleRegistry.from_oscillator_file(self.config["p_osc"], self.config.get("sellmeier_aliases"))
+            # Los archivos con token '<número>nm' forman series de excitación por muestra
+            by_ex = any(excitation_from_filename(os.path.basename(p)) is not None for p in pending)
+            links, unmatched = registry.link_files(sorted(pending), by_ex, self.config["lambda_ex"])
+            self.config["emission_dict"] = merge_links(self.config["emission_dict"], links, self.config["lambda_ex"])
+            # Puede que la muestra aparezca más tarde en el archivo de osciladores
+            self.unmatched = (self.unmatched - pending) | set(unmatched)
+        if not links and not {"__osc__", "__inputs__"} & set(changed):
+            return []
+
+        self.project, recomputed = run_project(self.config, previous=self.project, n_workers=self.n_workers)
+        if recomputed:
+            new_rows = summary_rows(self.project["results"], set(recomputed), time.strftime("%Y-%m-%d %H:%M:%S"))
+            self.rows.extend(new_rows)
+            if self.out_path and new_rows:
+                self._write_rows(new_rows)
+        return recomputed
+
+    def run(self, interval=DEFAULT_INTERVAL, stop_event=None, callback=None):
+        """Sondea cada interval segundos hasta que se active stop_event. callback(recalculadas, watcher)."""
+        while stop_event is None or not stop_event.is_set():
+            recomputed = self.poll()
+            if recomputed and callback is not None:
+                callback(recomputed, self)
+            if stop_event is not None:
+                stop_event.wait(interval)
+            else:
+                time.sleep(interval)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Vigila una carpeta y recalcula solo las muestras nuevas o modificadas.")
+    parser.add_argument("folder")
+    parser.add_argument("--project", required=True, help="Proyecto .fropa.npz con la configuración del análisis (se actualiza en cada cambio)")
+    parser.add_argument("--pattern", default=DEFAULT_PATTERN)
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL)
+    parser.add_argument("--out", help="Tabla acumulada de resultados (.tsv)")
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args(argv)
+
+    watcher = FolderWatcher(args.folder, load_project(args.project), args.pattern, args.workers, args.out)
+
+    def report(recomputed, w):
+        save_project(args.project, w.project)
+        print(f"[{time.strftime('%H:%M:%S')}] Recalculadas: {', '.join(recomputed)}", flush=True)
+
+    print(f"Vigilando {args.folder} ({args.pattern}) cada {args.interval:g} s. Ctrl+C para salir.")
+    try:
+        watcher.run(args.interval, callback=report)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()